@@ -13,6 +13,7 @@ import traceback
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
 import threading
+from pathlib import Path
 
 # Pydantic models (moved from model_server.py)
 from pydantic import BaseModel, ConfigDict as PydanticConfigDict
@@ -26,7 +27,8 @@ print(f"System path: {sys.path}")
 
 try:
     print("Attempting to import from src.core.init_repo...")
-    from src.core.init_repo import init_repo, handle_zip_upload, get_cache
+    from src.core.init_repo import init_repo, handle_zip_upload, create_repository_cache
+    from src.core.cache_manager import cache_manager
     print("Successfully imported backend functions from src.core.init_repo")
 except Exception as general_e:
     print(f"An unexpected error occurred during import: {general_e}")
@@ -52,6 +54,9 @@ custom_doc_url = "http://localhost:8001/score"
 repository_sessions = {}
 session_lock = threading.Lock()
 
+# Extends the context caches of the repositories in use and recreates expired ones in the background
+cache_manager.start()
+
 def get_session_id():
     """Generate a simple session ID. In production, use proper session management."""
     # For simplicity, using a single global session. In production, implement proper session management.
@@ -62,8 +67,15 @@ def get_repositories_for_session(session_id):
     with session_lock:
         return repository_sessions.get(session_id, {})
 
-def add_repository_to_session(session_id, repo_name, cache_id, repo_link=None, is_local=False):
-    """Add a repository to the session."""
+def add_repository_to_session(session_id, repo_name, cache_id, repo_link=None, is_local=False, gemini_api_key=None):
+    """Add a repository to the session and hand its context cache to the cache manager."""
+    cache_manager.register(
+        repo_name,
+        cache_id,
+        gemini_api_key or "",
+        recreate=lambda: create_repository_cache(repo_name, gemini_api_key, Path(f"/app/repository_folder/{repo_name}")),
+        source_path=Path(f"/app/docstrings_json/{repo_name}.json"),
+    )
     with session_lock:
         if session_id not in repository_sessions:
             repository_sessions[session_id] = {}
@@ -80,6 +92,7 @@ def remove_repository_from_session(session_id, repo_name):
     with session_lock:
         if session_id in repository_sessions and repo_name in repository_sessions[session_id]:
             del repository_sessions[session_id][repo_name]
+            cache_manager.unregister(repo_name)
             return True
         return False
 
@@ -126,7 +139,7 @@ def initialize_repo():
             # Add to session
             session_id = get_session_id()
             if repo_params and repo_params.get('repo_name') and repo_params.get('cache_id'):
-                add_repository_to_session(session_id, repo_params['repo_name'], repo_params['cache_id'], repo_link=repo_link)
+                add_repository_to_session(session_id, repo_params['repo_name'], repo_params['cache_id'], repo_link=repo_link, gemini_api_key=gemini_api_key)
             
             # Get all repositories for this session
             all_repositories = get_repositories_for_session(session_id)
@@ -171,7 +184,7 @@ def add_repository():
             # Add to session
             session_id = get_session_id()
             if repo_params and repo_params.get('repo_name') and repo_params.get('cache_id'):
-                add_repository_to_session(session_id, repo_params['repo_name'], repo_params['cache_id'], repo_link=repo_link)
+                add_repository_to_session(session_id, repo_params['repo_name'], repo_params['cache_id'], repo_link=repo_link, gemini_api_key=gemini_api_key)
             
             # Get all repositories for this session
             all_repositories = get_repositories_for_session(session_id)
@@ -273,7 +286,7 @@ def upload_repo():
             # Add to session
             session_id = get_session_id()
             if repo_params and repo_params.get('repo_name') and repo_params.get('cache_id'):
-                add_repository_to_session(session_id, repo_params['repo_name'], repo_params['cache_id'], repo_link=repo_params.get('repo_path'), is_local=True)
+                add_repository_to_session(session_id, repo_params['repo_name'], repo_params['cache_id'], repo_link=repo_params.get('repo_path'), is_local=True, gemini_api_key=gemini_api_key)
             
             # Get all repositories for this session
             all_repositories = get_repositories_for_session(session_id)
@@ -334,9 +347,9 @@ def generate_response():
 
         controller_logger.info(f"Querying repositories: {target_repos}")
 
-        # Check and recreate cache for all target repositories
+        # Current cache of each target repository; the cache manager keeps them alive
         for repo_name in target_repos:
-            check_and_recreate_cache_if_expired(repo_name, gemini_api_key)
+            refresh_cache_id(session_id, repo_name)
 
         # --- Unified Model Processing ---
         # All models now route through the repo_chat service with dynamic model selection
@@ -466,45 +479,17 @@ def generate_response():
         controller_logger.error(f"Error generating response: {e}", exc_info=True)
         return jsonify({'error': f"Internal server error: {str(e)}"}), 500
 
-def check_and_recreate_cache_if_expired(repo_name, gemini_api_key):
-    """Check if a repository's cache is expired and recreate it if necessary."""
-    session_id = get_session_id()
+def refresh_cache_id(session_id, repo_name):
+    """Mark a repository as queried and store the name of its current context cache in the session."""
+    cache_id = cache_manager.touch(repo_name)
+    if not cache_id:
+        controller_logger.warning(f"Repository '{repo_name}' has no managed cache.")
+        return
     with session_lock:
-        repositories = repository_sessions.get(session_id, {})
-        repo_info = repositories.get(repo_name)
-
-        if not repo_info:
-            controller_logger.warning(f"Repository '{repo_name}' not found in session.")
-            return
-
-        cache_id = repo_info.get('cache_id')
-        repo_link = repo_info.get('repo_link')
-        is_local = repo_info.get('is_local', False)
-
-        if not cache_id or not repo_link:
-            controller_logger.warning(f"Cache ID or repo link missing for '{repo_name}'.")
-            return
-
-        # Check if the cache exists
-        cache = get_cache(cache_id, gemini_api_key)
-
-        if cache is None:
-            controller_logger.info(f"Cache for '{repo_name}' not found or expired. Recreating...")
-            try:
-                if is_local:
-                    new_repo_params, message = handle_zip_upload(repo_link, gemini_api_key)
-                else:
-                    new_repo_params, message = init_repo(repo_link, gemini_api_key)
-                
-                new_cache_id = new_repo_params.get('cache_id')
-                if new_cache_id:
-                    repository_sessions[session_id][repo_name]['cache_id'] = new_cache_id
-                    controller_logger.info(f"Successfully recreated cache for '{repo_name}'. New cache_id: {new_cache_id}")
-                else:
-                    controller_logger.error(f"Failed to get new cache_id for '{repo_name}'.")
-
-            except Exception as e:
-                controller_logger.error(f"Error recreating cache for '{repo_name}': {e}", exc_info=True)
+        repo_info = repository_sessions.get(session_id, {}).get(repo_name)
+        if repo_info and repo_info['cache_id'] != cache_id:
+            controller_logger.info(f"Cache of '{repo_name}' is now {cache_id}")
+            repo_info['cache_id'] = cache_id
 
 def _build_cors_preflight_response():
     response = jsonify({})
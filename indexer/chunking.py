@@ -0,0 +1,191 @@
+import ast
+import re
+from typing import List, Optional
+
+from src.utils.tokens import estimate_tokens
+
+
+def _python_segments(text: str, max_tokens: int) -> Optional[List[str]]:
+    """
+    Cut Python source at the boundaries of its top-level statements.
+
+    Classes larger than max_tokens are cut again between their methods, and every piece
+    but the first is prefixed with the class header so it keeps its context.
+
+    Returns:
+        The segments, or None if the source cannot be parsed
+    """
+    try:
+        tree = ast.parse(text)
+    except (SyntaxError, ValueError):
+        return None
+    lines = text.splitlines(keepends=True)
+
+    def start_line(node) -> int:
+        # Decorators belong to the definition they decorate
+        return min([node.lineno] + [decorator.lineno for decorator in getattr(node, "decorator_list", [])]) - 1
+
+    starts = [start_line(node) for node in tree.body]
+    if not starts:
+        return [text]
+    starts[0] = 0  # Leading comments and the module docstring go with the first statement
+    segments = []
+    for position, node in enumerate(tree.body):
+        end = starts[position + 1] if position + 1 < len(starts) else len(lines)
+        segment = "".join(lines[starts[position]:end])
+        if isinstance(node, ast.ClassDef) and node.body and estimate_tokens(segment) > max_tokens:
+            header = "".join(lines[start_line(node):node.body[0].lineno - 1]) or lines[node.lineno - 1]
+            body_starts = [start_line(child) for child in node.body]
+            body_starts[0] = starts[position]
+            for body_position, body_start in enumerate(body_starts):
+                body_end = body_starts[body_position + 1] if body_position + 1 < len(body_starts) else end
+                piece = "".join(lines[body_start:body_end])
+                segments.append(piece if body_position == 0 else header + piece)
+        else:
+            segments.append(segment)
+    return segments
+
+
+def _generic_segments(text: str) -> List[str]:
+    """Cut source of any language where a non-indented line follows a blank line."""
+    segments, current = [], []
+    previous_blank = False
+    for line in text.splitlines(keepends=True):
+        starts_block = previous_blank and line[:1] not in ("", " ", "\t", "\n", "\r", "}", ")", "]")
+        if starts_block and current:
+            segments.append("".join(current))
+            current = []
+        current.append(line)
+        previous_blank = not line.strip()
+    if current:
+        segments.append("".join(current))
+    return segments
+
+
+def _split_lines(segment: str, max_tokens: int) -> List[str]:
+    """Last resort for a segment with no usable boundary: cut it between lines."""
+    pieces, current, current_tokens = [], [], 0
+    for line in segment.splitlines(keepends=True):
+        line_tokens = estimate_tokens(line)
+        if current and current_tokens + line_tokens > max_tokens:
+            pieces.append("".join(current))
+            current, current_tokens = [], 0
+        current.append(line)
+        current_tokens += line_tokens
+    if current:
+        pieces.append("".join(current))
+    return pieces
+
+
+def split_source(text: str, max_tokens: int, is_python: bool = False) -> List[str]:
+    """
+    Split source code into chunks of at most max_tokens, at class and function boundaries.
+
+    Args:
+        text (str): The source code
+        max_tokens (int): Token budget of a chunk
+        is_python (bool): Use the Python AST to find the boundaries
+
+    Returns:
+        List[str]: The chunks, in source order
+    """
+    segments = (_python_segments(text, max_tokens) if is_python else None) or _generic_segments(text)
+
+    chunks, current, current_tokens = [], [], 0
+    for segment in segments:
+        segment_tokens = estimate_tokens(segment)
+        pieces = [segment] if segment_tokens <= max_tokens else _split_lines(segment, max_tokens)
+        for piece in pieces:
+            piece_tokens = segment_tokens if len(pieces) == 1 else estimate_tokens(piece)
+            if current and current_tokens + piece_tokens > max_tokens:
+                chunks.append("".join(current))
+                current, current_tokens = [], 0
+            current.append(piece)
+            current_tokens += piece_tokens
+    if current:
+        chunks.append("".join(current))
+    return chunks
+
+
+def merge_code_structures(structures: List[dict]) -> dict:
+    """
+    Merge the CodeStructures of the chunks of one file into a single CodeStructure.
+
+    Functions are concatenated in chunk order; a class cut across chunks is merged back,
+    keeping the first description of each of its attributes and methods.
+
+    Args:
+        structures (List[dict]): CodeStructures of the chunks, in source order
+
+    Returns:
+        dict: The CodeStructure of the whole file
+    """
+    descriptions = []
+    functions = {}
+    classes = {}
+    for structure in structures:
+        description = (structure.get("global_code_description") or "").strip()
+        if description and description not in descriptions:
+            descriptions.append(description)
+        for function in structure.get("functions_out_class") or []:
+            functions.setdefault(function["function_name"], function)
+        for class_info in structure.get("classes") or []:
+            merged = classes.setdefault(
+                class_info["class_name"],
+                {
+                    "class_name": class_info["class_name"],
+                    "class_description": class_info.get("class_description", ""),
+                    "attributes": {},
+                    "functions_in_class": {},
+                },
+            )
+            if not merged["class_description"]:
+                merged["class_description"] = class_info.get("class_description", "")
+            for attribute in class_info.get("attributes") or []:
+                merged["attributes"].setdefault(attribute["attribute_name"], attribute)
+            for method in class_info.get("functions_in_class") or []:
+                merged["functions_in_class"].setdefault(method["function_name"], method)
+
+    return {
+        "global_code_description": " ".join(descriptions),
+        "functions_out_class": list(functions.values()),
+        "classes": [
+            {
+                **class_info,
+                "attributes": list(class_info["attributes"].values()),
+                "functions_in_class": list(class_info["functions_in_class"].values()),
+            }
+            for class_info in classes.values()
+        ],
+    }
+
+
+def assign_keys_to_chunks(keys: List[str], chunks: List[str]) -> List[List[str]]:
+    """
+    Assign the keys of skeleton elements (see indexer.skeleton) to the chunk defining them.
+
+    Args:
+        keys (List[str]): Keys such as "method DataStore.load" or "attribute DataStore.data"
+        chunks (List[str]): Chunks returned by split_source
+
+    Returns:
+        List[List[str]]: The keys of each chunk; "module" and keys found nowhere go to the first
+    """
+    assigned = [[] for _ in chunks]
+    for key in keys:
+        kind, _, qualified_name = key.partition(" ")
+        name = re.escape(qualified_name.rsplit(".", 1)[-1])
+        if kind in ("function", "method"):
+            pattern = re.compile(rf"\bdef\s+{name}\b")
+        elif kind == "class":
+            pattern = re.compile(rf"\bclass\s+{name}\b")
+        elif kind == "attribute":
+            pattern = re.compile(rf"self\.{name}\b|^\s*{name}\s*[:=]", re.MULTILINE)
+        else:
+            pattern = None
+        position = next(
+            (position for position, chunk in enumerate(chunks) if pattern and pattern.search(chunk)),
+            0,
+        )
+        assigned[position].append(key)
+    return assigned
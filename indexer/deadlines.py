@@ -0,0 +1,76 @@
+import os
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from .health import ModelHealthRegistry
+
+DEFAULT_CALL_TIMEOUT_MIN = float(os.getenv("SUMMARY_CALL_TIMEOUT_MIN", 10))
+DEFAULT_CALL_TIMEOUT_MAX = float(os.getenv("SUMMARY_CALL_TIMEOUT_MAX", 120))
+# Fixed cost of a call (connection, queueing at the provider, first token)
+DEFAULT_CALL_OVERHEAD = float(os.getenv("SUMMARY_CALL_OVERHEAD", 3))
+# Multiple of the expected duration before a call is given up
+DEFAULT_CALL_TIMEOUT_FACTOR = float(os.getenv("SUMMARY_CALL_TIMEOUT_FACTOR", 3))
+# Prompt tokens processed per second by a model that has not been measured yet
+DEFAULT_TOKENS_PER_SECOND = float(os.getenv("SUMMARY_DEFAULT_TOKENS_PER_SECOND", 500))
+# Wall time budget of an indexing run, 0 for none
+DEFAULT_JOB_DEADLINE = float(os.getenv("INDEXING_JOB_DEADLINE_SECONDS", 0))
+
+# time.monotonic() at which the current indexing run must stop making calls; set by
+# ClassifierService.run_pipeline and inherited by every task the run creates
+job_deadline: ContextVar[Optional[float]] = ContextVar("job_deadline", default=None)
+
+
+class JobDeadlineExceeded(Exception):
+    """Raised instead of making a call once the deadline of the indexing run is reached."""
+
+
+def remaining_job_seconds() -> Optional[float]:
+    """Seconds left before the deadline of the current run, None if it has none."""
+    deadline = job_deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+class CallTimeouts:
+    """
+    Per-call deadlines sized from the prompt and the observed speed of the model.
+
+    A call is given overhead + factor * tokens / tokens_per_second seconds, clamped to
+    [min_seconds, max_seconds] and to what is left of the deadline of the run, where
+    tokens_per_second is the prompt throughput measured on the model's successful calls.
+    """
+
+    def __init__(
+        self,
+        health: ModelHealthRegistry,
+        min_seconds: float = DEFAULT_CALL_TIMEOUT_MIN,
+        max_seconds: float = DEFAULT_CALL_TIMEOUT_MAX,
+        overhead: float = DEFAULT_CALL_OVERHEAD,
+        factor: float = DEFAULT_CALL_TIMEOUT_FACTOR,
+        default_tokens_per_second: float = DEFAULT_TOKENS_PER_SECOND,
+    ):
+        self.health = health
+        self.min_seconds = min_seconds
+        self.max_seconds = max_seconds
+        self.overhead = overhead
+        self.factor = factor
+        self.default_tokens_per_second = default_tokens_per_second
+
+    def timeout(self, model_name: str, tokens: int) -> float:
+        """
+        Return the timeout of a call.
+
+        Args:
+            model_name (str): Model the call goes to
+            tokens (int): Estimated tokens of the prompt
+
+        Returns:
+            float: Seconds, 0 or less if the run is already past its deadline
+        """
+        tokens_per_second = self.health.get(model_name).tokens_per_second or self.default_tokens_per_second
+        seconds = self.overhead + self.factor * tokens / tokens_per_second
+        seconds = min(self.max_seconds, max(self.min_seconds, seconds))
+        remaining = remaining_job_seconds()
+        return seconds if remaining is None else min(seconds, remaining)
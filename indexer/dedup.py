@@ -0,0 +1,106 @@
+import hashlib
+import threading
+from typing import Dict, List, Optional, Tuple
+
+_READ_BLOCK_SIZE = 1024 * 1024
+
+
+def content_digest(file_path: str) -> Optional[str]:
+    """Return the SHA-256 of the bytes of a file, None if it cannot be read."""
+    digest = hashlib.sha256()
+    try:
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(_READ_BLOCK_SIZE), b""):
+                digest.update(block)
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+
+class DuplicateFiles:
+    """
+    Groups the files of an indexing run by content, so each content is summarized once.
+
+    The first file of a (category, content) group is its representative and is the only
+    one summarized; the copies arriving while it is in flight wait for it, the ones
+    arriving after it reuse its result. Either way each copy is recorded under its own
+    path and id. If the representative fails, its waiting copies fail with it and the
+    next copy to arrive becomes the representative of a new attempt.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._groups: Dict[tuple, dict] = {}  # (category, digest) -> {"waiting", "result"}
+        self._representatives: Dict[str, tuple] = {}  # path of a file in flight -> its group key
+        self.files = 0
+        self.duplicates = 0
+        self.reused_results = 0
+
+    def add(self, file: dict, category: str, digest: Optional[str] = None) -> Tuple[bool, Optional[dict]]:
+        """
+        Register a file about to be summarized.
+
+        Args:
+            file (dict): Classified file
+            category (str): Summary category of the file
+            digest (Optional[str]): content_digest of the file, computed here if not given;
+                callers on an event loop compute it in a thread
+
+        Returns:
+            Tuple[bool, Optional[dict]]: (True, None) if the file must be summarized,
+            (False, result) if it is a copy of a file already summarized, and
+            (False, None) if it is a copy of a file in flight, whose result settle()
+            hands out later
+        """
+        if digest is None:
+            digest = content_digest(file["file_paths"])
+        with self._lock:
+            self.files += 1
+            if digest is None:
+                return True, None
+            key = (category, digest)
+            group = self._groups.get(key)
+            if group is None:
+                self._groups[key] = {"waiting": [], "result": None}
+                self._representatives[file["file_paths"]] = key
+                return True, None
+            self.duplicates += 1
+            if group["result"] is not None:
+                self.reused_results += 1
+                return False, group["result"]
+            group["waiting"].append(file)
+            return False, None
+
+    def settle(self, file: dict, result: Optional[dict]) -> List[dict]:
+        """
+        Record the outcome of a file and return the copies that were waiting for it.
+
+        Args:
+            file (dict): Classified file that was summarized
+            result (Optional[dict]): Its summary, None if it failed
+
+        Returns:
+            List[dict]: Copies of the file, to record with the same result
+        """
+        with self._lock:
+            key = self._representatives.pop(file["file_paths"], None)
+            if key is None:
+                return []
+            group = self._groups[key]
+            waiting, group["waiting"] = group["waiting"], []
+            if result:
+                group["result"] = result
+                self.reused_results += len(waiting)
+            else:
+                del self._groups[key]
+            return waiting
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "files": self.files,
+                "unique_files": self.files - self.duplicates,
+                "duplicates": self.duplicates,
+                "duplicate_ratio": round(self.duplicates / self.files, 4) if self.files else 0.0,
+                "calls_saved": self.reused_results,
+            }
@@ -0,0 +1,213 @@
+import collections
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+DEFAULT_HEALTH_WINDOW = int(os.getenv("MODEL_HEALTH_WINDOW", 200))
+DEFAULT_CIRCUIT_ERROR_THRESHOLD = float(os.getenv("CIRCUIT_ERROR_THRESHOLD", 0.5))
+DEFAULT_CIRCUIT_MIN_CALLS = int(os.getenv("CIRCUIT_MIN_CALLS", 10))
+DEFAULT_CIRCUIT_CONSECUTIVE_FAILURES = int(os.getenv("CIRCUIT_CONSECUTIVE_FAILURES", 5))
+DEFAULT_CIRCUIT_OPEN_SECONDS = float(os.getenv("CIRCUIT_OPEN_SECONDS", 30))
+DEFAULT_CIRCUIT_MAX_OPEN_SECONDS = float(os.getenv("CIRCUIT_MAX_OPEN_SECONDS", 300))
+
+FAILURE_OUTCOMES = ("timeout", "rate_limited", "error")
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of making a call to a model whose circuit opened while the call was waiting."""
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    position = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[position]
+
+
+class ModelHealth:
+    """
+    Rolling health of one model and its circuit breaker.
+
+    The last `window` calls give the latency percentiles of the successful ones and the
+    error rate. The circuit opens after `consecutive_failures` failures in a row, or
+    when the error rate reaches `error_threshold` over at least `min_calls` calls; no
+    call is routed to the model while it is open. After `open_seconds` it turns
+    half-open and lets a single probe through: success closes it, failure opens it
+    again for twice as long, up to `max_open_seconds`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window: int = DEFAULT_HEALTH_WINDOW,
+        error_threshold: float = DEFAULT_CIRCUIT_ERROR_THRESHOLD,
+        min_calls: int = DEFAULT_CIRCUIT_MIN_CALLS,
+        consecutive_failures: int = DEFAULT_CIRCUIT_CONSECUTIVE_FAILURES,
+        open_seconds: float = DEFAULT_CIRCUIT_OPEN_SECONDS,
+        max_open_seconds: float = DEFAULT_CIRCUIT_MAX_OPEN_SECONDS,
+    ):
+        self.name = name
+        self.error_threshold = error_threshold
+        self.min_calls = min_calls
+        self.consecutive_failures = consecutive_failures
+        self.open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self._lock = threading.Lock()
+        self._calls = collections.deque(maxlen=window)  # (latency, succeeded)
+        self._sorted_latencies: Optional[List[float]] = None
+        self._state = "closed"
+        self._opened_at = 0.0
+        self._open_for = open_seconds
+        self._failures_in_a_row = 0
+        self._probes = 0
+        self.trips = 0
+        self.tokens_per_second: Optional[float] = None  # EWMA of the prompt throughput of successful calls
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == "open" and time.monotonic() - self._opened_at >= self._open_for:
+            self._state = "half_open"
+            self._probes = 0
+        return self._state
+
+    def available(self) -> bool:
+        """Return True if a call may be routed to the model now."""
+        with self._lock:
+            state = self._current_state()
+            return state == "closed" or (state == "half_open" and self._probes == 0)
+
+    def seconds_until_retry(self) -> float:
+        with self._lock:
+            if self._current_state() != "open":
+                return 0.0
+            return max(0.0, self._opened_at + self._open_for - time.monotonic())
+
+    def is_open(self) -> bool:
+        with self._lock:
+            return self._current_state() == "open"
+
+    def before_call(self):
+        """Register a call about to be made; in the half-open state it is the probe."""
+        with self._lock:
+            if self._current_state() == "half_open":
+                self._probes += 1
+
+    def record(self, latency: float, outcome: str):
+        """
+        Record the outcome of a call and move the circuit accordingly.
+
+        Args:
+            latency (float): Duration of the call in seconds
+            outcome (str): "ok", "timeout", "rate_limited", "error" or "cancelled"
+        """
+        with self._lock:
+            state = self._current_state()
+            if outcome == "cancelled":
+                if state == "half_open":
+                    self._probes = max(0, self._probes - 1)
+                return
+            succeeded = outcome not in FAILURE_OUTCOMES
+            self._calls.append((latency, succeeded))
+            if succeeded:
+                self._sorted_latencies = None
+
+            if state == "half_open":
+                self._probes = max(0, self._probes - 1)
+                if succeeded:
+                    self._close()
+                else:
+                    self._open(min(self.max_open_seconds, self._open_for * 2))
+            elif state == "closed":
+                self._failures_in_a_row = 0 if succeeded else self._failures_in_a_row + 1
+                if self._failures_in_a_row >= self.consecutive_failures or (
+                    len(self._calls) >= self.min_calls and self._error_rate() >= self.error_threshold
+                ):
+                    self._open(self.open_seconds)
+            # Calls started before the circuit opened do not move it while it is open
+
+    def record_throughput(self, tokens: int, latency: float):
+        """Record the prompt size and the duration of a successful call."""
+        if tokens <= 0 or latency <= 0:
+            return
+        with self._lock:
+            throughput = tokens / latency
+            if self.tokens_per_second is None:
+                self.tokens_per_second = throughput
+            else:
+                self.tokens_per_second = 0.8 * self.tokens_per_second + 0.2 * throughput
+
+    def _open(self, duration: float):
+        self._state = "open"
+        self._opened_at = time.monotonic()
+        self._open_for = duration
+        self.trips += 1
+
+    def _close(self):
+        self._state = "closed"
+        self._open_for = self.open_seconds
+        self._failures_in_a_row = 0
+        # Failures from before the outage must not trip the circuit again right away
+        self._calls.clear()
+        self._sorted_latencies = None
+
+    def _error_rate(self) -> float:
+        if not self._calls:
+            return 0.0
+        return sum(1 for _, succeeded in self._calls if not succeeded) / len(self._calls)
+
+    def _latencies(self) -> List[float]:
+        if self._sorted_latencies is None:
+            self._sorted_latencies = sorted(latency for latency, succeeded in self._calls if succeeded)
+        return self._sorted_latencies
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """Latency percentile of the successful calls of the window, None before the first one."""
+        with self._lock:
+            return _percentile(self._latencies(), fraction)
+
+    def latency_samples(self) -> int:
+        """Number of successful calls in the window, which the percentiles are computed from."""
+        with self._lock:
+            return len(self._latencies())
+
+    def error_rate(self) -> float:
+        with self._lock:
+            return self._error_rate()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            latencies = self._latencies()
+            return {
+                "state": self._current_state(),
+                "calls": len(self._calls),
+                "error_rate": round(self._error_rate(), 3),
+                "p50": round(_percentile(latencies, 0.5), 3) if latencies else None,
+                "p95": round(_percentile(latencies, 0.95), 3) if latencies else None,
+                "p99": round(_percentile(latencies, 0.99), 3) if latencies else None,
+                "trips": self.trips,
+                "tokens_per_second": round(self.tokens_per_second, 1) if self.tokens_per_second else None,
+            }
+
+
+class ModelHealthRegistry:
+    """Process-wide ModelHealth of each model."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._models: Dict[str, ModelHealth] = {}
+
+    def get(self, model_name: str) -> ModelHealth:
+        with self._lock:
+            if model_name not in self._models:
+                self._models[model_name] = ModelHealth(model_name)
+            return self._models[model_name]
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            models = dict(self._models)
+        return {model_name: health.snapshot() for model_name, health in models.items()}
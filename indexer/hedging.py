@@ -0,0 +1,118 @@
+import os
+import threading
+import time
+from typing import Optional
+
+from .health import ModelHealthRegistry
+
+# "off" disables hedging
+DEFAULT_SUMMARY_HEDGING = os.getenv("SUMMARY_HEDGING", "on")
+# Hedges allowed per call made, on top of a small initial allowance
+DEFAULT_HEDGE_BUDGET_RATIO = float(os.getenv("SUMMARY_HEDGE_BUDGET_RATIO", 0.05))
+DEFAULT_HEDGE_BURST = int(os.getenv("SUMMARY_HEDGE_BURST", 5))
+# Successful calls a model needs before its p95 is trusted as a hedging delay
+DEFAULT_HEDGE_MIN_SAMPLES = int(os.getenv("SUMMARY_HEDGE_MIN_SAMPLES", 20))
+# Never hedge earlier, so jitter around a low p95 does not spend the budget
+DEFAULT_HEDGE_MIN_DELAY = float(os.getenv("SUMMARY_HEDGE_MIN_DELAY", 1.0))
+
+
+class HedgingPolicy:
+    """
+    Decides when a slow summarization call gets a duplicate on another model.
+
+    A call still running after the p95 latency of its model is hedged, as long as the
+    budget allows: at most budget_ratio hedges per call made, plus burst. Only the
+    tail of the calls is hedged, so the extra load stays around the budget.
+    """
+
+    def __init__(
+        self,
+        health: ModelHealthRegistry,
+        enabled: Optional[bool] = None,
+        budget_ratio: float = DEFAULT_HEDGE_BUDGET_RATIO,
+        burst: int = DEFAULT_HEDGE_BURST,
+        min_samples: int = DEFAULT_HEDGE_MIN_SAMPLES,
+        min_delay: float = DEFAULT_HEDGE_MIN_DELAY,
+    ):
+        self.health = health
+        self.enabled = DEFAULT_SUMMARY_HEDGING.lower() != "off" if enabled is None else enabled
+        self.budget_ratio = budget_ratio
+        self.burst = burst
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.saved_seconds = 0.0
+        self.max_saved_seconds = 0.0
+
+    def delay(self, model_name: str) -> Optional[float]:
+        """Seconds after which a call to the model should be hedged, None to never hedge it."""
+        with self._lock:
+            self.calls += 1
+        if not self.enabled:
+            return None
+        health = self.health.get(model_name)
+        if health.latency_samples() < self.min_samples:
+            return None
+        return max(self.min_delay, health.percentile(0.95))
+
+    def try_hedge(self) -> bool:
+        """Take a hedge from the budget, False if it is spent."""
+        with self._lock:
+            if self.hedges >= self.budget_ratio * self.calls + self.burst:
+                return False
+            self.hedges += 1
+            return True
+
+    def record_win(self, hedge_finished: float, primary_future):
+        """
+        Record a hedge that finished first.
+
+        The primary call keeps running in its executor thread after it is abandoned, so
+        the latency saved is measured for real once it completes.
+
+        Args:
+            hedge_finished (float): time.monotonic() when the hedge returned
+            primary_future: concurrent.futures.Future of the abandoned primary call
+        """
+        with self._lock:
+            self.hedge_wins += 1
+
+        def on_primary_done(_):
+            saved = time.monotonic() - hedge_finished
+            with self._lock:
+                self.saved_seconds += saved
+                self.max_saved_seconds = max(self.max_saved_seconds, saved)
+
+        if primary_future is not None:
+            primary_future.add_done_callback(on_primary_done)
+
+    def snapshot(self, since: Optional[dict] = None) -> dict:
+        """
+        Return the hedging counters.
+
+        Args:
+            since (Optional[dict]): Earlier snapshot() of this policy; the counters are then
+                those of the calls made since, e.g. by one indexing run, and the
+                process-wide max_saved_seconds is left out
+
+        Returns:
+            dict: Calls, hedges, wins and latency saved
+        """
+        baseline = since or {}
+        with self._lock:
+            calls = self.calls - baseline.get("calls", 0)
+            hedges = self.hedges - baseline.get("hedges", 0)
+            stats = {
+                "enabled": self.enabled,
+                "calls": calls,
+                "hedges": hedges,
+                "hedge_rate": round(hedges / calls, 4) if calls else 0.0,
+                "hedge_wins": self.hedge_wins - baseline.get("hedge_wins", 0),
+                "saved_seconds": round(self.saved_seconds - baseline.get("saved_seconds", 0.0), 3),
+            }
+            if since is None:
+                stats["max_saved_seconds"] = round(self.max_saved_seconds, 3)
+            return stats
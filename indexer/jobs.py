@@ -0,0 +1,284 @@
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import traceback
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .pipeline import PipelineProgress
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOBS_DIR = "indexer_jobs"
+# Repositories indexed at the same time; the calls of all of them share the model limiters
+DEFAULT_MAX_CONCURRENT_JOBS = 4
+
+UNFINISHED_STATUSES = ("queued", "running")
+
+
+def _write_json(path: Path, data: dict):
+    """Write then rename, so a crash never leaves a partial file behind."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+class JobCheckpoint:
+    """
+    Append-only log of the files an indexing job has summarized.
+
+    Each line holds one (classified file, category, result) entry, written as soon as
+    the file is summarized, so a job restarted after a crash only processes the rest.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def load(self) -> List[tuple]:
+        """Return the recorded entries, ignoring a last line cut short by a crash."""
+        entries = []
+        try:
+            with open(self.path, "r") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    entries.append((entry["file"], entry["category"], entry["result"]))
+        except OSError:
+            pass
+        return entries
+
+    def record(self, file: dict, category: str, result: dict):
+        line = json.dumps({"file": file, "category": category, "result": result})
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write(line + "\n")
+
+    def count(self) -> int:
+        return len(self.load())
+
+
+class IndexingJob:
+    """
+    One repository indexing request run in the background.
+
+    Only the request parameters are persisted; the API keys stay in memory, so a job
+    interrupted by a restart must be resumed with its keys.
+    """
+
+    def __init__(self, job_id: str, job_dir: Path, params: dict):
+        self.job_id = job_id
+        self.job_dir = job_dir
+        self.params = params
+        self.status = "queued"
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.progress: Optional[PipelineProgress] = None
+        self.last_progress: Optional[dict] = None  # Snapshot persisted when the job last changed status
+        self.checkpoint = JobCheckpoint(job_dir / "summaries.jsonl")
+        self.task: Optional[asyncio.Task] = None
+        self.partial_tiers: List[str] = []  # Tiers complete in the last partial index published
+
+    @property
+    def result_path(self) -> Path:
+        return self.job_dir / "result.json"
+
+    @property
+    def partial_path(self) -> Path:
+        return self.job_dir / "partial.json"
+
+    def publish_partial(self, index: dict):
+        """Persist a partial index of the running job, replacing the previous one."""
+        _write_json(self.partial_path, index)
+        self.partial_tiers = index.get("partial", {}).get("tiers_completed", [])
+        self.save()
+
+    def to_record(self) -> dict:
+        return {
+            "job_id": self.job_id,
+            "params": self.params,
+            "status": self.status,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "progress": self.progress.snapshot() if self.progress else self.last_progress,
+            "partial_tiers": self.partial_tiers,
+        }
+
+    @classmethod
+    def from_record(cls, job_dir: Path, record: dict) -> "IndexingJob":
+        job = cls(record["job_id"], job_dir, record["params"])
+        job.status = record["status"]
+        job.error = record.get("error")
+        job.created_at = record.get("created_at", job.created_at)
+        job.started_at = record.get("started_at")
+        job.finished_at = record.get("finished_at")
+        job.last_progress = record.get("progress")
+        job.partial_tiers = record.get("partial_tiers", [])
+        return job
+
+    def save(self):
+        _write_json(self.job_dir / "job.json", self.to_record())
+
+    def status_report(self) -> dict:
+        report = self.to_record()
+        report["folder_path"] = self.params.get("folder_path")
+        if self.status == "interrupted":
+            report["checkpointed_files"] = self.checkpoint.count()
+        return report
+
+
+class JobManager:
+    """
+    Runs indexing jobs in the background and keeps their state on disk.
+
+    At most max_concurrent_jobs repositories are indexed at once, the others wait in
+    submission order. All running jobs draw their LLM calls from the same process-wide
+    model limiters and global budget, so the number of concurrent calls does not grow
+    with the number of jobs.
+    """
+
+    def __init__(self, service, jobs_dir: Optional[str] = None, max_concurrent_jobs: Optional[int] = None):
+        self.service = service
+        self.jobs_dir = Path(jobs_dir or os.getenv("INDEXER_JOBS_DIR", DEFAULT_JOBS_DIR))
+        self.max_concurrent_jobs = int(
+            max_concurrent_jobs or os.getenv("INDEXER_MAX_CONCURRENT_JOBS", DEFAULT_MAX_CONCURRENT_JOBS)
+        )
+        self._job_slots: Optional[asyncio.Semaphore] = None
+        self.jobs: Dict[str, IndexingJob] = {}
+        self._load_jobs()
+
+    def _load_jobs(self):
+        """Reload the jobs of a previous process; the unfinished ones become interrupted."""
+        if not self.jobs_dir.exists():
+            return
+        for record_path in self.jobs_dir.glob("*/job.json"):
+            try:
+                with open(record_path, "r") as f:
+                    job = IndexingJob.from_record(record_path.parent, json.load(f))
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Skipping unreadable job record {record_path}: {e}")
+                continue
+            if job.status in UNFINISHED_STATUSES:
+                job.status = "interrupted"
+                job.save()
+            self.jobs[job.job_id] = job
+        logger.info(f"Loaded {len(self.jobs)} indexing jobs from {self.jobs_dir}")
+
+    def get(self, job_id: str) -> Optional[IndexingJob]:
+        return self.jobs.get(job_id)
+
+    def submit(self, params: dict, api_keys: dict) -> IndexingJob:
+        """
+        Register a job and start it in the background.
+
+        Args:
+            params (dict): Keyword arguments of ClassifierService.run_pipeline, without the API keys
+            api_keys (dict): GEMINI_API_KEY, ANTHROPIC_API_KEY and OPENAI_API_KEY
+
+        Returns:
+            IndexingJob: The queued job
+        """
+        job_id = uuid.uuid4().hex
+        job = IndexingJob(job_id, self.jobs_dir / job_id, params)
+        job.save()
+        self.jobs[job_id] = job
+        self._start(job, api_keys)
+        return job
+
+    def resume(self, job_id: str, api_keys: dict) -> IndexingJob:
+        """
+        Restart an interrupted or failed job; the files it already summarized are reused.
+
+        Raises:
+            KeyError: If the job does not exist
+            ValueError: If the job is still running or already completed
+        """
+        job = self.jobs[job_id]
+        if job.status not in ("interrupted", "failed"):
+            raise ValueError(f"Job {job_id} is {job.status}, only interrupted or failed jobs can be resumed")
+        job.status = "queued"
+        job.error = None
+        job.finished_at = None
+        job.save()
+        self._start(job, api_keys)
+        return job
+
+    def _start(self, job: IndexingJob, api_keys: dict):
+        if self._job_slots is None:
+            self._job_slots = asyncio.Semaphore(self.max_concurrent_jobs)
+        job.task = asyncio.create_task(self._run(job, api_keys))
+
+    async def _run(self, job: IndexingJob, api_keys: dict):
+        async with self._job_slots:
+            job.status = "running"
+            job.started_at = time.time()
+            job.progress = PipelineProgress()
+            job.save()
+            logger.info(f"Indexing job {job.job_id} started for {job.params.get('folder_path')}")
+            try:
+                result = await self.service.run_pipeline(
+                    **job.params,
+                    **api_keys,
+                    progress=job.progress,
+                    checkpoint=job.checkpoint,
+                    on_partial=job.publish_partial,
+                )
+                await asyncio.to_thread(_write_json, job.result_path, result)
+                job.status = "completed"
+            except asyncio.CancelledError:
+                job.status = "interrupted"
+                raise
+            except Exception as e:
+                logger.error(f"Indexing job {job.job_id} failed: {e}")
+                logger.error(traceback.format_exc())
+                job.status = "failed"
+                job.error = str(e)
+            finally:
+                job.finished_at = time.time()
+                job.last_progress = job.progress.snapshot()
+                job.progress = None
+                job.save()
+            # The result supersedes the per-file checkpoint and the partial index
+            if job.status == "completed":
+                for path in (job.checkpoint.path, job.partial_path):
+                    try:
+                        path.unlink()
+                    except OSError:
+                        pass
+            logger.info(f"Indexing job {job.job_id} {job.status}")
+
+    def load_partial(self, job_id: str) -> Optional[dict]:
+        """Return the last partial index of an unfinished job, None if it has none."""
+        job = self.jobs.get(job_id)
+        if not job or job.status == "completed" or not job.partial_tiers:
+            return None
+        try:
+            with open(job.partial_path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def load_result(self, job_id: str) -> Optional[dict]:
+        """Return the result of a completed job, None if it has none."""
+        job = self.jobs.get(job_id)
+        if not job or job.status != "completed":
+            return None
+        try:
+            with open(job.result_path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
@@ -0,0 +1,326 @@
+import asyncio
+import collections
+import concurrent.futures
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Iterable, List, Sequence
+
+from .deadlines import JobDeadlineExceeded
+from .health import CircuitOpenError, ModelHealthRegistry
+
+DEFAULT_INITIAL_CONCURRENCY = int(os.getenv("LLM_INITIAL_CONCURRENCY", 4))
+DEFAULT_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY_PER_MODEL", 32))
+# Calls in flight across all models and all indexing jobs of the process
+DEFAULT_GLOBAL_CONCURRENCY = int(os.getenv("LLM_GLOBAL_CONCURRENCY", 64))
+
+RATE_LIMIT_MARKERS = ("429", "resource_exhausted", "resource exhausted", "rate limit", "quota")
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """Return True if an exception looks like provider throttling (HTTP 429 / quota exhausted)."""
+    if type(error).__name__ in ("ResourceExhausted", "TooManyRequests", "RateLimitError"):
+        return True
+    message = str(error).lower()
+    return any(marker in message for marker in RATE_LIMIT_MARKERS)
+
+
+def call_outcome(error: BaseException) -> str:
+    """Classify the exception that ended a call as "timeout", "cancelled", "rate_limited" or "error"."""
+    if isinstance(error, asyncio.TimeoutError):
+        return "timeout"
+    if isinstance(error, (asyncio.CancelledError, JobDeadlineExceeded)):
+        # Given up by the caller, or by the deadline of its run before being sent
+        return "cancelled"
+    return "rate_limited" if is_rate_limit_error(error) else "error"
+
+
+class CallSlot:
+    """
+    Handle on the slot of one call, yielded by slot().
+
+    A call whose blocking work runs in a thread can hold_until() the executor future:
+    if the call is cancelled or times out, the thread keeps running, so the slot is
+    only given back once the future is done.
+    """
+
+    def __init__(self, *parents: "CallSlot"):
+        self.work = None
+        self._parents = parents
+
+    def hold_until(self, future: concurrent.futures.Future):
+        self.work = future
+        for parent in self._parents:
+            parent.hold_until(future)
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limiter for the calls made to one model.
+
+    Every healthy call grows the window additively (about +1 per window of successful
+    calls). Throttling and timeouts shrink it multiplicatively, at most once per
+    cooldown so a burst of 429s from the same window only backs off once. A call whose
+    latency inflates well above the best observed latency shrinks it slightly, before
+    the provider starts rejecting calls.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial_limit: int = DEFAULT_INITIAL_CONCURRENCY,
+        min_limit: int = 1,
+        max_limit: int = DEFAULT_MAX_CONCURRENCY,
+        backoff: float = 0.5,
+        latency_tolerance: float = 3.0,
+    ):
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = float(min(max(initial_limit, min_limit), max_limit))
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.in_flight = 0
+        self.successes = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self.timeouts = 0
+        self.baseline_latency = None
+        self.latency_ewma = None
+        self._last_decrease = 0.0
+        self._waiters = collections.deque()
+
+    @property
+    def window(self) -> int:
+        return max(self.min_limit, int(self.limit))
+
+    def has_free_slot(self) -> bool:
+        """Return True if a call would get a slot without waiting."""
+        return self.in_flight < self.window and not self._waiters
+
+    async def acquire(self):
+        if self.in_flight < self.window and not self._waiters:
+            self.in_flight += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was granted just before the cancellation, hand it over
+                self.in_flight -= 1
+                self._wake()
+            else:
+                self._waiters.remove(waiter)
+            raise
+
+    def release(self, latency: float, outcome: str, keep_slot: bool = False):
+        """
+        Release a slot and adapt the window.
+
+        Args:
+            latency (float): Duration of the call in seconds
+            outcome (str): One of "ok", "rate_limited", "timeout", "error" or "cancelled"
+            keep_slot (bool): Only adapt the window, the slot being given back later with free_slot()
+        """
+        if not keep_slot:
+            self.in_flight -= 1
+        if outcome == "cancelled":
+            # Abandoned by its caller (lost hedge, cancelled job, deadline): says nothing about the model
+            pass
+        elif outcome == "ok":
+            self._on_success(latency)
+        elif outcome == "rate_limited":
+            self.rate_limited += 1
+            self._decrease(self.backoff)
+        elif outcome == "timeout":
+            self.timeouts += 1
+            self._decrease(self.backoff)
+        else:
+            # Validation or client errors say nothing about provider load
+            self.errors += 1
+        self._wake()
+
+    def _on_success(self, latency: float):
+        self.successes += 1
+        self.latency_ewma = latency if self.latency_ewma is None else 0.8 * self.latency_ewma + 0.2 * latency
+        if self.baseline_latency is None or latency < self.baseline_latency:
+            self.baseline_latency = latency
+        else:
+            # Let the baseline drift up slowly so one lucky call does not pin it forever
+            self.baseline_latency += (latency - self.baseline_latency) * 0.01
+
+        if self.successes > self.window and self.latency_ewma > self.baseline_latency * self.latency_tolerance:
+            self._decrease(0.9)
+        else:
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+
+    def _decrease(self, factor: float):
+        now = time.monotonic()
+        cooldown = max(1.0, self.latency_ewma or 0.0)
+        if now - self._last_decrease < cooldown:
+            return
+        self._last_decrease = now
+        self.limit = max(float(self.min_limit), self.limit * factor)
+
+    def free_slot(self):
+        """Give back a slot kept past release() by work still running."""
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self):
+        while self._waiters and self.in_flight < self.window:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self):
+        """
+        Hold a slot for the duration of one call; the outcome is derived from the exception raised, if any.
+
+        Yields a CallSlot: work passed to its hold_until() keeps the slot until it is done.
+        """
+        await self.acquire()
+        call = CallSlot()
+        started = time.monotonic()
+        outcome = "error"
+        try:
+            yield call
+            outcome = "ok"
+        except BaseException as e:
+            outcome = call_outcome(e)
+            raise
+        finally:
+            held = call.work is not None and not call.work.done()
+            self.release(time.monotonic() - started, outcome, keep_slot=held)
+            if held:
+                loop = asyncio.get_running_loop()
+                call.work.add_done_callback(lambda _: loop.call_soon_threadsafe(self.free_slot))
+
+    def snapshot(self) -> dict:
+        return {
+            "window": self.window,
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "waiting": len(self._waiters),
+            "successes": self.successes,
+            "errors": self.errors,
+            "rate_limited": self.rate_limited,
+            "timeouts": self.timeouts,
+            "latency_ewma": round(self.latency_ewma, 3) if self.latency_ewma is not None else None,
+            "baseline_latency": round(self.baseline_latency, 3) if self.baseline_latency is not None else None,
+        }
+
+
+class ModelLimiters:
+    """
+    Process-wide registry of one AdaptiveLimiter per model, so what is learned carries across
+    requests, plus a fixed global budget shared by every model and every indexing job.
+
+    Every call made through slot() also feeds the model's health (latency percentiles,
+    error rate and circuit breaker, see indexer.health), which rank() uses to route
+    calls to the fastest healthy model.
+    """
+
+    def __init__(self, global_limit: int = DEFAULT_GLOBAL_CONCURRENCY):
+        self._limiters: Dict[str, AdaptiveLimiter] = {}
+        self.global_budget = AdaptiveLimiter("global", global_limit, min_limit=global_limit, max_limit=global_limit)
+        self.health = ModelHealthRegistry()
+
+    def get(self, model_name: str) -> AdaptiveLimiter:
+        if model_name not in self._limiters:
+            self._limiters[model_name] = AdaptiveLimiter(model_name)
+        return self._limiters[model_name]
+
+    @asynccontextmanager
+    async def slot(self, model_name: str):
+        """
+        Hold a slot of the model's window, then of the global budget, for the duration of one call.
+
+        Yields a CallSlot whose hold_until() keeps both slots until the work of the call is done.
+        """
+        health = self.health.get(model_name)
+        health.before_call()
+        started = None
+        outcome = "cancelled"
+        try:
+            async with self.get(model_name).slot() as model_call:
+                if health.is_open():
+                    # The circuit opened while this call was queued, let the caller fall back at once
+                    raise CircuitOpenError(f"Circuit of {model_name} is open")
+                async with self.global_budget.slot() as global_call:
+                    started = time.monotonic()
+                    try:
+                        yield CallSlot(model_call, global_call)
+                        outcome = "ok"
+                    except BaseException as e:
+                        outcome = call_outcome(e)
+                        raise
+        finally:
+            health.record(time.monotonic() - started if started is not None else 0.0, outcome)
+
+    def expected_cost(self, model_name: str) -> float:
+        """
+        Expected time for a new call to the model to complete: its median latency, inflated
+        by its error rate and by how full its concurrency window already is.
+        """
+        health = self.health.get(model_name)
+        limiter = self.get(model_name)
+        median = health.percentile(0.5)
+        if median is None:
+            # Not measured yet: as fast as the fastest model, so it gets explored
+            known = [self.health.get(name).percentile(0.5) for name in self._limiters]
+            median = min([latency for latency in known if latency is not None], default=0.0)
+        load = (limiter.in_flight + len(limiter._waiters) + 1) / limiter.window
+        return median / max(0.05, 1.0 - health.error_rate()) * load
+
+    def rank(self, model_names: Sequence[str]) -> List[int]:
+        """
+        Order models from the one a call should go to first.
+
+        Models whose circuit lets calls through come first, by expected cost; models with
+        an open circuit come last, the one closest to its retry first, so work still
+        proceeds, slowly, when every model is down.
+
+        Args:
+            model_names (Sequence[str]): Candidate models
+
+        Returns:
+            List[int]: Positions in model_names, best first
+        """
+        positions = range(len(model_names))
+        available = [position for position in positions if self.health.get(model_names[position]).available()]
+        unavailable = [position for position in positions if position not in available]
+        available.sort(key=lambda position: self.expected_cost(model_names[position]))
+        unavailable.sort(key=lambda position: self.health.get(model_names[position]).seconds_until_retry())
+        return available + unavailable
+
+    def healthy_first(self, candidates: list) -> list:
+        """
+        Filter (client, model name) candidates down to the models whose circuit lets calls
+        through, keeping their order; all of them are kept if none does.
+        """
+        healthy = [candidate for candidate in candidates if self.health.get(candidate[1]).available()]
+        return healthy or candidates
+
+    def capacity(self, model_names: Iterable[str]) -> int:
+        """Maximum number of calls the given models may ever have in flight together."""
+        return min(
+            self.global_budget.max_limit,
+            sum(self.get(model_name).max_limit for model_name in set(model_names)),
+        )
+
+    def snapshot(self) -> dict:
+        health = self.health.snapshot()
+        snapshot = {
+            model_name: {**limiter.snapshot(), "health": health.get(model_name)}
+            for model_name, limiter in self._limiters.items()
+        }
+        snapshot["global"] = {"limit": self.global_budget.window, "in_flight": self.global_budget.in_flight}
+        return snapshot
+
+
+model_limiters = ModelLimiters()
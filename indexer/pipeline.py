@@ -0,0 +1,142 @@
+import asyncio
+import itertools
+import logging
+import math
+import threading
+import time
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Marker put on a stage queue once its producer is done
+END_OF_STREAM = object()
+
+PIPELINE_STAGES = ("classification", "summarization")
+
+
+class TieredQueue(asyncio.PriorityQueue):
+    """
+    Stage queue handing out items by priority tier, then in arrival order.
+
+    Items are put and got as on an asyncio.Queue; tier_of gives the tier of an item
+    (lowest first) and END_OF_STREAM always comes out last.
+    """
+
+    def __init__(self, maxsize: int = 0, tier_of=None):
+        super().__init__(maxsize)
+        self.tier_of = tier_of or (lambda item: 0)
+        self._arrivals = itertools.count()
+
+    def _put(self, item):
+        tier = math.inf if item is END_OF_STREAM else self.tier_of(item)
+        super()._put((tier, next(self._arrivals), item))
+
+    def _get(self):
+        return super()._get()[2]
+
+
+class BackgroundWriter:
+    """
+    Runs the blocking writes of a pipeline (checkpoint lines, partial indexes) in a
+    thread, so they never stall the event loop.
+
+    Writes run one at a time in submission order, so a later partial index is never
+    overwritten by an earlier one. A failed write is logged and does not stop the next.
+    """
+
+    def __init__(self):
+        self._tail: Optional[asyncio.Task] = None
+
+    def submit(self, write: Callable, *args, description: str = "write"):
+        previous = self._tail
+
+        async def run():
+            if previous is not None:
+                await previous
+            try:
+                await asyncio.to_thread(write, *args)
+            except Exception as e:
+                logger.warning(f"Background {description} failed: {e}")
+
+        self._tail = asyncio.create_task(run())
+
+    async def flush(self):
+        """Wait for every submitted write."""
+        if self._tail is not None:
+            await self._tail
+
+
+class PipelineProgress:
+    """
+    Per-stage counters of a streaming indexing run.
+
+    For each stage it tracks how many items are waiting (the queue depth), in flight,
+    done and failed, plus the deepest the queue got during the run. Per-file counts
+    (listed, classified, resumed from a checkpoint) feed the estimated time to completion.
+    """
+
+    def __init__(self, stages=PIPELINE_STAGES):
+        self._lock = threading.Lock()
+        self.started_at = time.monotonic()
+        self.stages = {
+            stage: {"queued": 0, "in_flight": 0, "done": 0, "failed": 0, "max_queue_depth": 0}
+            for stage in stages
+        }
+        self.files = {"listed": 0, "classified": 0, "resumed": 0}
+
+    def count(self, name: str, count: int = 1):
+        with self._lock:
+            self.files[name] += count
+
+    def queued(self, stage: str, count: int = 1):
+        with self._lock:
+            counters = self.stages[stage]
+            counters["queued"] += count
+            counters["max_queue_depth"] = max(counters["max_queue_depth"], counters["queued"])
+
+    def started(self, stage: str):
+        with self._lock:
+            counters = self.stages[stage]
+            counters["queued"] -= 1
+            counters["in_flight"] += 1
+
+    def finished(self, stage: str, success: bool = True):
+        with self._lock:
+            counters = self.stages[stage]
+            counters["in_flight"] -= 1
+            counters["done" if success else "failed"] += 1
+
+    def _eta_seconds(self, elapsed: float):
+        """
+        Extrapolate the remaining time from the summarization throughput so far.
+
+        Files not classified yet are expected to need a summary in the same proportion
+        as the ones already classified. None until a first file is summarized.
+        """
+        summarization = self.stages.get("summarization")
+        if not summarization:
+            return None
+        finished = summarization["done"] + summarization["failed"]
+        if not finished or elapsed <= 0:
+            return None
+        classified = self.files["classified"]
+        summarizable_ratio = (summarization["queued"] + summarization["in_flight"] + finished) / classified if classified else 1.0
+        unclassified = max(0, self.files["listed"] - self.files["resumed"] - classified)
+        remaining = summarization["queued"] + summarization["in_flight"] + unclassified * summarizable_ratio
+        return round(remaining * elapsed / finished, 1)
+
+    def snapshot(self) -> dict:
+        """Return a copy of the counters, the elapsed time of the run and its ETA."""
+        with self._lock:
+            elapsed = time.monotonic() - self.started_at
+            summarization = self.stages.get("summarization", {})
+            return {
+                "elapsed_seconds": round(elapsed, 3),
+                "eta_seconds": self._eta_seconds(elapsed),
+                "files": {
+                    **self.files,
+                    "summarized": summarization.get("done", 0),
+                    "failed": summarization.get("failed", 0),
+                },
+                "stages": {stage: dict(counters) for stage, counters in self.stages.items()},
+            }
@@ -0,0 +1,173 @@
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+
+# "off" indexes files in listing order and publishes no partial index
+DEFAULT_PRIORITY_TIERS = os.getenv("INDEXING_PRIORITY_TIERS", "on")
+# Packages whose files make up the "core" tier, the most imported first
+DEFAULT_CORE_PACKAGES = int(os.getenv("INDEXING_CORE_PACKAGES", 5))
+# Importing files, from other packages, a package needs to be part of the core tier
+CORE_MIN_IMPORTERS = 2
+
+# Indexed in this order; an index is published once each one but the last is complete
+TIER_NAMES = ("overview", "core", "other", "tests")
+OVERVIEW_TIER, CORE_TIER, OTHER_TIER, TESTS_TIER = range(len(TIER_NAMES))
+
+ENTRY_POINT_NAMES = frozenset({
+    "main.py", "__main__.py", "app.py", "server.py", "cli.py", "manage.py", "wsgi.py", "asgi.py",
+    "setup.py", "index.js", "index.ts", "main.js", "main.ts", "app.js", "app.ts", "server.js",
+    "server.ts", "main.go", "main.rs", "lib.rs",
+})
+TEST_DIRECTORY_NAMES = frozenset({
+    "test", "tests", "testing", "__tests__", "spec", "specs", "example", "examples", "sample",
+    "samples", "demo", "demos", "benchmark", "benchmarks",
+})
+TEST_FILE_PATTERN = re.compile(r"^(test_.*|.*_test\.\w+|.*\.(test|spec)\.\w+|conftest\.py)$")
+DOCUMENTATION_EXTENSIONS = (".md", ".rst", ".txt", ".adoc")
+_IMPORT_PATTERN = re.compile(r"^\s*(?:from\s+([\w.]+)\s+import|import\s+([\w.]+(?:\s*,\s*[\w.]+)*))", re.MULTILINE)
+
+
+def _python_modules(relative_paths: List[str]) -> Dict[str, str]:
+    """Map the dotted names a file can be imported under to its directory."""
+    modules = {}
+    for relative_path in relative_paths:
+        if not relative_path.endswith(".py"):
+            continue
+        parts = relative_path[: -len(".py")].split("/")
+        if parts[-1] == "__init__":
+            parts = parts[:-1]
+        directory = os.path.dirname(relative_path)
+        if parts:
+            modules.setdefault(".".join(parts), directory)
+        # src/ layouts are imported without their first directory
+        if len(parts) > 1 and parts[0] == "src":
+            modules.setdefault(".".join(parts[1:]), directory)
+    return modules
+
+
+def package_importers(folder_path: str, relative_paths: List[str]) -> Counter:
+    """
+    Count, for each directory of Python files, the files of other directories importing it.
+
+    Only absolute imports resolving to files of the listing are counted.
+
+    Args:
+        folder_path (str): Repository root
+        relative_paths (List[str]): Listed files, relative to folder_path
+
+    Returns:
+        Counter: Directory (relative to folder_path) -> number of importing files
+    """
+    modules = _python_modules(relative_paths)
+    importers = defaultdict(set)
+    for relative_path in relative_paths:
+        if not relative_path.endswith(".py"):
+            continue
+        try:
+            with open(os.path.join(folder_path, relative_path), "r", errors="replace") as f:
+                source = f.read()
+        except OSError:
+            continue
+        own_directory = os.path.dirname(relative_path)
+        for from_name, import_names in _IMPORT_PATTERN.findall(source):
+            for name in [from_name] if from_name else [name.strip() for name in import_names.split(",")]:
+                parts = name.split(".")
+                # The longest prefix naming a listed module
+                for end in range(len(parts), 0, -1):
+                    directory = modules.get(".".join(parts[:end]))
+                    if directory is not None:
+                        if directory != own_directory:
+                            importers[directory].add(relative_path)
+                        break
+    return Counter({directory: len(files) for directory, files in importers.items()})
+
+
+class PriorityTiers:
+    """
+    Priority tier of each listed file of an indexing run, and which tiers are complete.
+
+    Tiers, in indexing order:
+    - overview: READMEs, top-level documentation and entry points
+    - core: files of the packages most imported by the other packages
+    - other: everything else
+    - tests: tests, examples, samples and benchmarks
+
+    A tier is complete once every one of its files is summarized, failed or found to
+    need no summary, and so are the files of the tiers before it.
+    """
+
+    def __init__(self, folder_path: str, full_paths: List[str], core_packages: int = DEFAULT_CORE_PACKAGES):
+        self._lock = threading.Lock()
+        relative_paths = {
+            full_path: os.path.relpath(full_path, folder_path).replace(os.sep, "/") for full_path in full_paths
+        }
+        self.core_directories = {
+            directory
+            for directory, count in package_importers(folder_path, list(relative_paths.values())).most_common(core_packages)
+            if count >= CORE_MIN_IMPORTERS
+        }
+        self.tiers = {full_path: self._tier(relative_path) for full_path, relative_path in relative_paths.items()}
+        self.sizes = Counter(self.tiers.values())
+        self.remaining = Counter(self.tiers.values())
+        self._pending = set(self.tiers)
+        self.published_tiers = 0
+
+    def _tier(self, relative_path: str) -> int:
+        parts = relative_path.split("/")
+        name = parts[-1]
+        if TEST_FILE_PATTERN.match(name.lower()) or any(part.lower() in TEST_DIRECTORY_NAMES for part in parts[:-1]):
+            return TESTS_TIER
+        if name.lower().startswith("readme"):
+            return OVERVIEW_TIER
+        if name.lower().endswith(DOCUMENTATION_EXTENSIONS) and (len(parts) == 1 or (len(parts) == 2 and parts[0].lower() == "docs")):
+            return OVERVIEW_TIER
+        if name in ENTRY_POINT_NAMES and len(parts) <= 2:
+            return OVERVIEW_TIER
+        if os.path.dirname(relative_path) in self.core_directories:
+            return CORE_TIER
+        return OTHER_TIER
+
+    def tier(self, full_path: str) -> int:
+        """Tier of a listed file, the last one for a file that was not listed."""
+        return self.tiers.get(full_path, TESTS_TIER)
+
+    def done(self, full_path: str):
+        """Record that a file needs no more work."""
+        with self._lock:
+            if full_path in self._pending:
+                self._pending.discard(full_path)
+                self.remaining[self.tiers[full_path]] -= 1
+
+    def completed_tiers(self) -> int:
+        """Number of leading tiers that are complete."""
+        with self._lock:
+            for tier in range(len(TIER_NAMES)):
+                if self.remaining[tier] > 0:
+                    return tier
+            return len(TIER_NAMES)
+
+    def take_publication(self) -> Optional[int]:
+        """
+        Return the number of complete tiers if a partial index is due, None otherwise.
+
+        A partial index is due when tiers holding files completed since the last one,
+        unless all of them are: the complete index is the result of the run.
+        """
+        completed = self.completed_tiers()
+        with self._lock:
+            if completed >= len(TIER_NAMES) or completed <= self.published_tiers:
+                return None
+            new_files = sum(self.sizes[tier] for tier in range(self.published_tiers, completed))
+            self.published_tiers = completed
+            return completed if new_files else None
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "sizes": {TIER_NAMES[tier]: self.sizes[tier] for tier in range(len(TIER_NAMES))},
+                "remaining": {TIER_NAMES[tier]: self.remaining[tier] for tier in range(len(TIER_NAMES))},
+                "core_directories": sorted(self.core_directories),
+                "published_tiers": self.published_tiers,
+            }
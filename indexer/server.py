@@ -1,7 +1,11 @@
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
+from typing import List, Optional
 import logging
 from .service import ClassifierService
+from .limiter import model_limiters
+from .jobs import JobManager
+from .deadlines import DEFAULT_JOB_DEADLINE
 import traceback
 
 app = FastAPI(title="Indexer Service", description="File classification and summarization service")
@@ -12,6 +16,9 @@ logger = logging.getLogger(__name__)
 
 # Initialize the classifier service
 classifier_service = ClassifierService()
+job_manager = JobManager(classifier_service)
+
+API_KEY_FIELDS = {"GEMINI_API_KEY", "ANTHROPIC_API_KEY", "OPENAI_API_KEY"}
 
 class ClassificationRequest(BaseModel):
     folder_path: str
@@ -20,10 +27,26 @@ class ClassificationRequest(BaseModel):
     GEMINI_API_KEY: str = ""
     ANTHROPIC_API_KEY: str = ""
     OPENAI_API_KEY: str = ""
+    # Optional delta manifest: only these paths (relative to folder_path) are indexed
+    files: Optional[List[str]] = None
+    # Extra glob patterns to ignore, on top of the default rules of the file listing
+    ignore_patterns: Optional[List[str]] = None
+    respect_gitignore: bool = False
+    # Wall time budget of the summarization calls in seconds, 0 for none
+    deadline_seconds: float = DEFAULT_JOB_DEADLINE
 
 class ClassificationResponse(BaseModel):
     result: dict
 
+class ApiKeys(BaseModel):
+    GEMINI_API_KEY: str = ""
+    ANTHROPIC_API_KEY: str = ""
+    OPENAI_API_KEY: str = ""
+
+class JobResponse(BaseModel):
+    job_id: str
+    status: str
+
 @app.post("/score", response_model=ClassificationResponse)
 async def classify_files(request: ClassificationRequest):
     """
@@ -32,6 +55,8 @@ async def classify_files(request: ClassificationRequest):
     """
     try:
         logger.info(f"Received classification request for folder: {request.folder_path}")
+        if request.files is not None:
+            logger.info(f"Incremental request restricted to {len(request.files)} files")
         
         result = await classifier_service.run_pipeline(
             folder_path=request.folder_path,
@@ -39,7 +64,11 @@ async def classify_files(request: ClassificationRequest):
             max_workers=request.max_workers,
             GEMINI_API_KEY=request.GEMINI_API_KEY,
             ANTHROPIC_API_KEY=request.ANTHROPIC_API_KEY,
-            OPENAI_API_KEY=request.OPENAI_API_KEY
+            OPENAI_API_KEY=request.OPENAI_API_KEY,
+            files=request.files,
+            ignore_patterns=request.ignore_patterns,
+            respect_gitignore=request.respect_gitignore,
+            deadline_seconds=request.deadline_seconds,
         )
         
         logger.info("Classification completed successfully")
@@ -50,6 +79,69 @@ async def classify_files(request: ClassificationRequest):
         logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Classification failed: {str(e)}")
 
+@app.post("/jobs", response_model=JobResponse, status_code=202)
+async def submit_job(request: ClassificationRequest):
+    """
+    Start indexing a folder in the background and return the ID of the job.
+    Poll GET /jobs/{job_id} for its progress and fetch GET /jobs/{job_id}/result once completed.
+    """
+    logger.info(f"Received indexing job for folder: {request.folder_path}")
+    job = job_manager.submit(
+        params=request.model_dump(exclude=API_KEY_FIELDS),
+        api_keys=request.model_dump(include=API_KEY_FIELDS),
+    )
+    return JobResponse(job_id=job.job_id, status=job.status)
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    """Status of a job, with per-stage file counts and the estimated time to completion"""
+    job = job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Unknown job {job_id}")
+    return job.status_report()
+
+@app.get("/jobs/{job_id}/result", response_model=ClassificationResponse)
+async def job_result(job_id: str):
+    """Result of a completed job, in the format returned by /score"""
+    job = job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Unknown job {job_id}")
+    if job.status != "completed":
+        raise HTTPException(status_code=409, detail=f"Job {job_id} is {job.status}")
+    result = job_manager.load_result(job_id)
+    if result is None:
+        raise HTTPException(status_code=410, detail=f"Result of job {job_id} is no longer available")
+    return ClassificationResponse(result=result)
+
+@app.get("/jobs/{job_id}/partial", response_model=ClassificationResponse)
+async def job_partial_result(job_id: str):
+    """Index of the priority tiers a running job has completed, usable before its result"""
+    job = job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Unknown job {job_id}")
+    if job.status == "completed":
+        raise HTTPException(status_code=409, detail=f"Job {job_id} is completed, get its result instead")
+    result = job_manager.load_partial(job_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} has no partial index yet")
+    return ClassificationResponse(result=result)
+
+@app.post("/jobs/{job_id}/resume", response_model=JobResponse, status_code=202)
+async def resume_job(job_id: str, api_keys: ApiKeys):
+    """Restart an interrupted or failed job, skipping the files it already summarized"""
+    try:
+        job = job_manager.resume(job_id, api_keys.model_dump())
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown job {job_id}")
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return JobResponse(job_id=job.job_id, status=job.status)
+
+@app.get("/limits")
+async def concurrency_limits():
+    """Current adaptive concurrency window and call outcomes of each model"""
+    return {"models": model_limiters.snapshot()}
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
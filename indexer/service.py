@@ -9,17 +9,41 @@ from src.schemas.description import (
     generate_code_structure_model_consize,
     DocumentCompression,
     YamlBrief,
+    MissingDescriptions,
+    create_packed_summaries_model,
 )
 from src.schemas.classif import create_file_classification
-from .utils import list_all_files, SAFE
+from src.core.llm_clients import llm_client_pool
+from src.utils.tokens import estimate_tokens, estimate_file_tokens
+from .utils import list_all_files, classify_file_locally, FileFilterConfig, SAFE
+from .chunking import split_source, merge_code_structures, assign_keys_to_chunks
+from .summary_cache import SummaryCache, build_cache_namespace
+from .pipeline import BackgroundWriter, PipelineProgress, TieredQueue, END_OF_STREAM
+from .priority import DEFAULT_PRIORITY_TIERS, TIER_NAMES, PriorityTiers
+from .limiter import model_limiters, is_rate_limit_error
+from .health import CircuitOpenError
+from .hedging import HedgingPolicy
+from .dedup import DuplicateFiles, content_digest
+from .sniffer import DEFAULT_CONTENT_SNIFFER, SKIPPED_CONTENT_KINDS, placeholder_structure, sniff_file
+from .deadlines import CallTimeouts, JobDeadlineExceeded, job_deadline, DEFAULT_JOB_DEADLINE
+from .skeleton import (
+    get_skeleton_pool,
+    extract_python_skeleton,
+    iter_skeleton_elements,
+    missing_description_keys,
+    fill_descriptions,
+)
 import instructor
 import os
 import dotenv
 import traceback
 import asyncio
-import google.generativeai as genai
+import time
+from concurrent.futures import ThreadPoolExecutor
+from collections import Counter
 import logging
 import traceback
+import json
 from src.monitor.langfuse import get_langfuse_context,trace,generate_trace_id
 from pathlib import Path
 
@@ -27,6 +51,40 @@ logger = logging.getLogger(__name__)
 
 dotenv.load_dotenv()
 
+# Blocking SDK calls run here: the default executor (min(32, cpu + 4) threads) would silently
+# cap the adaptive concurrency windows of the models
+llm_executor = ThreadPoolExecutor(max_workers=int(os.getenv("LLM_EXECUTOR_THREADS", 128)))
+# Throttled classification batches are retried once their model's window has shrunk
+RATE_LIMIT_RETRIES = int(os.getenv("LLM_RATE_LIMIT_RETRIES", 5))
+# A classification batch failing validation this many times is split in two instead of retried further
+CLASSIFICATION_VALIDATION_RETRIES = int(os.getenv("CLASSIFICATION_VALIDATION_RETRIES", 2))
+# Budgets are below max_output_tokens (8000) to leave room for the whitespace of the JSON answer
+DEFAULT_CLASSIFICATION_OUTPUT_TOKEN_BUDGET = 4000
+DEFAULT_CLASSIFICATION_INPUT_TOKEN_BUDGET = 32000
+# Files up to SUMMARY_PACK_MAX_FILE_TOKENS are packed together, up to a budget and a number of files per request
+SUMMARY_PACK_MAX_FILE_TOKENS = int(os.getenv("SUMMARY_PACK_MAX_FILE_TOKENS", 1000))
+SUMMARY_PACK_TOKEN_BUDGET = int(os.getenv("SUMMARY_PACK_TOKEN_BUDGET", 4000))
+SUMMARY_PACK_MAX_FILES = int(os.getenv("SUMMARY_PACK_MAX_FILES", 8))
+# Code files above SUMMARY_CHUNK_THRESHOLD_TOKENS are summarized in chunks of SUMMARY_CHUNK_TOKENS, then merged
+SUMMARY_CHUNK_THRESHOLD_TOKENS = int(os.getenv("SUMMARY_CHUNK_THRESHOLD_TOKENS", 12000))
+SUMMARY_CHUNK_TOKENS = int(os.getenv("SUMMARY_CHUNK_TOKENS", 6000))
+# Smallest chunks a file that timed out whole is split into
+SUMMARY_MIN_CHUNK_TOKENS = int(os.getenv("SUMMARY_MIN_CHUNK_TOKENS", 1000))
+
+
+def rotate_candidates(client_gemini, model_name, fallback_clients, fallback_model_names, position: int):
+    """Rotate the (client, model) fallback chain so concurrent chunks of one file start on different models."""
+    candidates = [(client_gemini, model_name)] + list(zip(fallback_clients or [], fallback_model_names or []))
+    shift = position % len(candidates)
+    rotated = candidates[shift:] + candidates[:shift]
+    return rotated[0][0], rotated[0][1], [client for client, _ in rotated[1:]], [name for _, name in rotated[1:]]
+
+
+def is_validation_error(error: BaseException) -> bool:
+    """Return True if an LLM call failed because its answer did not validate against the response model."""
+    message = str(error)
+    return any(marker in message for marker in ("ValidationError", "validation error", "InstructorRetryException"))
+
 
 class ClassifierConfig:
     def __init__(self):
@@ -38,10 +96,13 @@ class ClassifierConfig:
             "user_classification": self.template_manager.render_template("prompts/user_prompt_classification.jinja2"),
             "system_docstring": self.template_manager.render_template("prompts/prompt_docstrings/system_prompt_classification.jinja2"),
             "user_docstring": self.template_manager.render_template("prompts/prompt_docstrings/user_prompt_classification.jinja2"),
+            "system_descriptions": self.template_manager.render_template("prompts/prompt_docstrings/system_prompt_descriptions.jinja2"),
+            "user_descriptions": self.template_manager.render_template("prompts/prompt_docstrings/user_prompt_descriptions.jinja2"),
             "system_configuration": self.template_manager.render_template("prompts/prompt_configurations/system_prompt_configuration.jinja2"),
             "user_configuration": self.template_manager.render_template("prompts/prompt_configurations/user_prompt_configuration.jinja2"),
             "system_documentation": self.template_manager.render_template("prompts/prompt_documentations/system_prompt_documentation.jinja2"),
             "user_documentation": self.template_manager.render_template("prompts/prompt_documentations/user_prompt_documentation.jinja2"),
+            "system_packed": self.template_manager.render_template("prompts/system_prompt_packed.jinja2"),
         }
         self.file_class_model_0 = os.getenv("FILE_CLASSICATION_MODEL_0")
         self.file_class_model_1 = os.getenv("FILE_CLASSICATION_MODEL_1")
@@ -53,6 +114,50 @@ class ClassifierConfig:
 class ClassifierNode(ClassifierConfig):
     def __init__(self):
         super().__init__()
+        # Output token budget of a classification batch, per model like FILE_CLASSICATION_MODEL_<i>
+        self.classification_token_budgets = {
+            index: int(os.getenv(f"FILE_CLASSICATION_TOKEN_BUDGET_{index}", DEFAULT_CLASSIFICATION_OUTPUT_TOKEN_BUDGET))
+            for index in range(3)
+        }
+        self.classification_input_token_budget = int(
+            os.getenv("FILE_CLASSICATION_INPUT_TOKEN_BUDGET", DEFAULT_CLASSIFICATION_INPUT_TOKEN_BUDGET)
+        )
+
+    def pack_batches(self, files: list[dict]) -> list[tuple[int, list[dict]]]:
+        """
+        Pack files into classification batches against the token budgets of the models.
+
+        Batches are assigned to the models round-robin, and each batch is filled until the
+        estimated size of its answer reaches the output budget of its model, or the size
+        of the prompt reaches the input budget.
+
+        Args:
+            files (list[dict]): Files to classify, with their file_id and file_name
+
+        Returns:
+            list[tuple[int, list[dict]]]: (model index, batch) pairs
+        """
+        batches = []
+        batch, input_tokens, output_tokens = [], 0, 0
+        for file in files:
+            file_input_tokens = estimate_tokens(str(file))
+            # The answer repeats the id and name, plus the longest label
+            file_output_tokens = estimate_tokens(
+                json.dumps({"file_id": file["file_id"], "file_name": file["file_name"], "classification": "configuration_file"})
+            )
+            output_budget = self.classification_token_budgets[len(batches) % 3]
+            if batch and (
+                output_tokens + file_output_tokens > output_budget
+                or input_tokens + file_input_tokens > self.classification_input_token_budget
+            ):
+                batches.append((len(batches) % 3, batch))
+                batch, input_tokens, output_tokens = [], 0, 0
+            batch.append(file)
+            input_tokens += file_input_tokens
+            output_tokens += file_output_tokens
+        if batch:
+            batches.append((len(batches) % 3, batch))
+        return batches
 
     async def process_batch(
         self,
@@ -63,6 +168,7 @@ class ClassifierNode(ClassifierConfig):
         user_prompt: str,
         scores: list[int],
         span=None,
+        max_retries: int = 10,
     ) -> dict:
         """Process a batch of files using Gemini API"""
         batch_prompt = user_prompt + "\n" + f"{file_batch}"
@@ -83,7 +189,7 @@ class ClassifierNode(ClassifierConfig):
         try:
             # Run the blocking call in a thread pool to avoid blocking the event loop
             completion, raw = await asyncio.get_event_loop().run_in_executor(
-                None,
+                llm_executor,
                 lambda: client_gemini.chat.create_with_completion(
                     messages=messages,
                     response_model=create_file_classification(file_batch, scores),
@@ -93,7 +199,7 @@ class ClassifierNode(ClassifierConfig):
                         "candidate_count": 1,
                         "max_output_tokens": 8000,
                     },
-                    max_retries=10,
+                    max_retries=max_retries,
                 )
             )
             result = completion.model_dump()
@@ -122,11 +228,16 @@ class ClassifierNode(ClassifierConfig):
     async def llmclassifier(
         self,
         folder_path: str,
-        batch_size: int = 50,  # Number of files to process in each batch
-        max_workers: int = 10,  # Number of parallel workers
+        batch_size: int = 50,  # Baseline of llm_calls_avoided; batches are packed against token budgets
         GEMINI_API_KEY: str = "",
         ANTHROPIC_API_KEY: str = "",
         OPENAI_API_KEY: str = "",
+        files: list[str] = None,  # Only classify these paths, relative to folder_path
+        file_filter: FileFilterConfig = None,  # Rules deciding which files are listed
+        on_batch=None,  # Awaited with the classifications of each batch as soon as it returns
+        progress: PipelineProgress = None,
+        skip_files: set = None,  # Full paths already summarized by a previous run, listed but not classified
+        prioritize=None,  # Awaited with the full paths to classify, returns the priority tier of a path
         trace_id: str = ""
     ) -> str:
         span = get_langfuse_context().get("span")
@@ -136,31 +247,10 @@ class ClassifierNode(ClassifierConfig):
         # Configure safety settings
         safe = SAFE
 
-        # Configure Gemini with API key from request if provided
-        if GEMINI_API_KEY:
-            genai.configure(api_key=GEMINI_API_KEY)
-        else:
-            # Use default API key from environment
-            genai.configure()
-            
-        client_gemini_0 = instructor.from_gemini(
-            client=genai.GenerativeModel(
-                model_name=self.file_class_model_0, safety_settings=safe
-            ),
-            mode=instructor.Mode.GEMINI_JSON,
-        )
-        client_gemini_1 = instructor.from_gemini(
-            client=genai.GenerativeModel(
-                model_name=self.file_class_model_1, safety_settings=safe
-            ),
-            mode=instructor.Mode.GEMINI_JSON,
-        )
-        client_gemini_2 = instructor.from_gemini(
-            client=genai.GenerativeModel(
-                model_name=self.file_class_model_2, safety_settings=safe
-            ),
-            mode=instructor.Mode.GEMINI_JSON,
-        )
+        # Pooled clients scoped to the API key of the request (the environment's if empty)
+        client_gemini_0 = llm_client_pool.gemini_instructor(GEMINI_API_KEY, self.file_class_model_0, safe)
+        client_gemini_1 = llm_client_pool.gemini_instructor(GEMINI_API_KEY, self.file_class_model_1, safe)
+        client_gemini_2 = llm_client_pool.gemini_instructor(GEMINI_API_KEY, self.file_class_model_2, safe)
 
         clients = {
             0: client_gemini_0,
@@ -175,40 +265,133 @@ class ClassifierNode(ClassifierConfig):
         }
         
         # Get file names
-        files_structure = list_all_files(folder_path, include_md=True)
+        files_structure = list_all_files(folder_path, include_md=True, only_files=files, config=file_filter)
 
         file_names = files_structure["all_files_no_path"]
         files_paths = files_structure["all_files_with_path"]
+        if progress:
+            progress.count("listed", len(file_names))
+        if skip_files:
+            # Filtered after the listing, so the remaining files keep the file_id of a full run
+            file_names = [file for file in file_names if files_paths[file["file_id"]] not in skip_files]
+            if progress:
+                progress.count("resumed", len(files_paths) - len(file_names))
+        if prioritize:
+            # Classified, hence handed downstream, from the first tier to the last
+            tier_of = await prioritize([files_paths[file["file_id"]] for file in file_names])
+            file_names = sorted(file_names, key=lambda file: tier_of(files_paths[file["file_id"]]))
+
+        # Rule-based first pass: only names the extension table cannot decide go to the LLM
+        local_classifications = []
+        ambiguous_files = []
+        for file in file_names:
+            classification = classify_file_locally(file["file_name"])
+            if classification:
+                local_classifications.append(
+                    {
+                        "file_id": file["file_id"],
+                        "file_name": file["file_name"],
+                        "classification": classification,
+                        "file_paths": files_paths[file["file_id"]],
+                    }
+                )
+            else:
+                ambiguous_files.append(file)
+
+        # Pack the ambiguous files into token-budgeted batches, they keep their original file_id
+        batches = self.pack_batches(ambiguous_files)
+
+        llm_calls_without_prefilter = (len(file_names) + batch_size - 1) // batch_size
+        classification_stats = {
+            "files": len(file_names),
+            "classified_locally": len(local_classifications),
+            "classified_by_llm": len(ambiguous_files),
+            "llm_calls": len(batches),
+            "llm_calls_avoided": llm_calls_without_prefilter - len(batches),
+            "split_batches": 0,
+        }
 
-        # Split files into batches
-        batches = [
-            file_names[i : i + batch_size] for i in range(0, len(file_names), batch_size)
-        ]
-
-        all_results = {"file_classifications": []}
-
-        # Process batches in parallel using asyncio
-        tasks = []
-        for index, batch in enumerate(batches):
-            task = self.process_batch(
-                batch,
-                clients[index % 3],
-                model_names[index % 3],
-                self.prompts_config["system_classification"],
-                self.prompts_config["user_classification"],
-                scores,
-                span,
+        all_results = {"file_classifications": [], "stats": classification_stats}
+
+        async def classify(batch, model_index):
+            """Classify a batch, splitting it in two when the answer keeps failing validation."""
+            for attempt in range(RATE_LIMIT_RETRIES + 1):
+                if not model_limiters.health.get(model_names[model_index]).available():
+                    # The circuit of the assigned model is open, use the fastest healthy one instead
+                    model_index = model_limiters.rank([model_names[i] for i in range(3)])[0]
+                model_name = model_names[model_index]
+                limiter = model_limiters.get(model_name)
+                try:
+                    async with model_limiters.slot(model_name):
+                        return await self.process_batch(
+                            batch,
+                            clients[model_index],
+                            model_name,
+                            self.prompts_config["system_classification"],
+                            self.prompts_config["user_classification"],
+                            scores,
+                            span,
+                            max_retries=CLASSIFICATION_VALIDATION_RETRIES,
+                        )
+                except Exception as e:
+                    if attempt < RATE_LIMIT_RETRIES and isinstance(e, CircuitOpenError):
+                        continue
+                    if attempt < RATE_LIMIT_RETRIES and is_rate_limit_error(e):
+                        logger.warning(f"Classification batch throttled on {model_name}, retrying (window {limiter.window})")
+                        await asyncio.sleep(2 ** attempt)
+                        continue
+                    if len(batch) > 1 and is_validation_error(e):
+                        break
+                    raise
+
+            # Smaller answers validate more easily; the halves go to the next models
+            middle = len(batch) // 2
+            classification_stats["split_batches"] += 1
+            classification_stats["llm_calls"] += 2
+            logger.warning(f"Splitting a classification batch of {len(batch)} files that failed validation on {model_name}")
+            halves = await asyncio.gather(
+                classify(batch[:middle], (model_index + 1) % 3),
+                classify(batch[middle:], (model_index + 2) % 3),
             )
-            tasks.append(task)
-
-        # Use asyncio.gather with semaphore to limit concurrency
-        semaphore = asyncio.Semaphore(max_workers)
+            return {
+                "file_classifications": [
+                    classification for half in halves for classification in half.get("file_classifications", [])
+                ]
+            }
+
+        # Concurrency is bounded per model by its adaptive limiter instead of a fixed semaphore
+        if progress:
+            progress.queued("classification", len(batches))
         
-        async def bounded_task(task):
-            async with semaphore:
-                return await task
-
-        bounded_tasks = [bounded_task(task) for task in tasks]
+        async def bounded_task(model_index, batch):
+            if progress:
+                progress.started("classification")
+            try:
+                result = await classify(batch, model_index)
+            except Exception:
+                if progress:
+                    progress.finished("classification", success=False)
+                raise
+            if progress:
+                progress.finished("classification")
+                progress.count("classified", len(batch))
+            # replace file_name by file_path
+            for classification in result.get("file_classifications", []):
+                classification["file_paths"] = files_paths[classification["file_id"]]
+            # Hand the batch downstream outside the slot, so backpressure does not hold it
+            if on_batch:
+                await on_batch(result.get("file_classifications", []))
+            return result
+
+        async def local_task():
+            if progress:
+                progress.count("classified", len(local_classifications))
+            # Handed downstream alongside the LLM batches, not before them
+            if on_batch and local_classifications:
+                await on_batch(local_classifications)
+            return {"file_classifications": local_classifications}
+
+        bounded_tasks = [local_task()] + [bounded_task(model_index, batch) for model_index, batch in batches]
         
         try:
             results = await asyncio.gather(*bounded_tasks)
@@ -219,16 +402,52 @@ class ClassifierNode(ClassifierConfig):
         except Exception as e:
             raise Exception(f"Batch processing failed: {str(e)}, {traceback.format_exc()}")
 
-        # replace file_name by fileç_path
-        for classification in all_results["file_classifications"]:
-            classification["file_paths"] = files_paths[classification["file_id"]]
-
+        logger.info(f"Classification stats: {classification_stats}")
         return all_results
 
 
 class InformationCompressorNode(ClassifierConfig):
     def __init__(self):
         super().__init__()
+        # "hybrid": Python skeletons come from ast and the LLM only describes what has no docstring
+        # "llm": the LLM produces the whole CodeStructure
+        self.docstring_mode = os.getenv("DOCSTRING_SUMMARY_MODE", "hybrid")
+        self.summary_cache = SummaryCache()
+        # Everything but the file content that shapes a summary: prompts, response schema and models
+        models = "|".join(
+            str(model)
+            for model in (
+                self.file_class_model_0,
+                self.file_class_model_1,
+                self.file_class_model_2,
+                self.file_class_model_3,
+            )
+        )
+        self.cache_namespaces = {
+            log_name: build_cache_namespace(
+                log_name,
+                self.prompts_config[f"system_{prompt_key}"],
+                self.prompts_config[f"user_{prompt_key}"],
+                json.dumps(schema.model_json_schema(), sort_keys=True),
+                models,
+            )
+            for log_name, prompt_key, schema in (
+                ("docstring", "docstring", generate_code_structure_model_consize("")),
+                ("documentation", "documentation", DocumentCompression),
+                ("config", "configuration", YamlBrief),
+                ("descriptions", "descriptions", MissingDescriptions),
+            )
+        }
+        # Packed answers come from another prompt than single-file ones, so they are cached apart
+        self.packed_cache_namespaces = {
+            category: build_cache_namespace("packed", self.cache_namespaces[category], self.prompts_config["system_packed"])
+            for category in ("docstring", "documentation", "config")
+        }
+        # Duplicates summarization calls stuck past the p95 latency of their model
+        self.hedging = HedgingPolicy(model_limiters.health)
+        self.call_timeouts = CallTimeouts(model_limiters.health)
+        # Binary, encoded, minified, generated and oversized files are kept from the LLM
+        self.content_sniffer = DEFAULT_CONTENT_SNIFFER.lower() != "off"
     
     async def process_batch(
         self,
@@ -243,22 +462,45 @@ class InformationCompressorNode(ClassifierConfig):
         log_name=None,
         fallback_clients: list[instructor.Instructor] = None,
         fallback_model_names: list[str] = None,
+        pydantic_model=None,
+        extra_prompt: str = "",
+        content: str = None,
+        failures: list = None,  # Appended with "timeout", "error" or "deadline" for each failed attempt
+        answered_by: list = None,  # Appended with the name of the model whose answer is returned
     ) -> dict:
         """Process a batch of files using Gemini API with timeout and retries."""
         batch_prompt = ""
         try:
-            with open(file_batch, "r") as f:
-                batch_prompt = user_prompt + "\n" + f.read()
+            if content is None:
+                with open(file_batch, "r") as f:
+                    file_content = f.read()
+            else:
+                file_content = content
+            batch_prompt = user_prompt + "\n" + extra_prompt + file_content
         except Exception as e:
             print(f"Error reading file {file_batch}: {e}") # Log file reading error
             return None, None
 
+        # Identical content was already summarized with the same prompt/schema/models
+        cache_key = None
+        if log_name in self.cache_namespaces:
+            # The extra prompt (keys to describe, part label) changes the expected answer
+            namespace = self.cache_namespaces[log_name]
+            if extra_prompt:
+                namespace = build_cache_namespace(namespace, extra_prompt)
+            cache_key = self.summary_cache.make_key(file_content, namespace)
+            cached_result = await asyncio.to_thread(self.summary_cache.get, cache_key)
+            if cached_result is not None:
+                return cached_result, index
+
         messages = [
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": batch_prompt},
         ]
 
-        if log_name == "docstring":
+        if pydantic_model is not None:
+            pass
+        elif log_name == "docstring":
             pydantic_model = generate_code_structure_model_consize(batch_prompt)
         elif log_name == "documentation":
             pydantic_model = DocumentCompression
@@ -279,65 +521,142 @@ class InformationCompressorNode(ClassifierConfig):
         # --- Retry Logic ---
         max_attempts = 4 # 1 initial + 3 retries
         clients_to_try = [(client_gemini, model_name)] + list(zip(fallback_clients or [], fallback_model_names or []))
+        # Models with an open circuit would only burn the timeout, skip them while others are healthy
+        clients_to_try = model_limiters.healthy_first(clients_to_try)
         # Ensure we don't try more clients than available or exceed max_attempts
         clients_to_try = clients_to_try[:max_attempts]
 
         last_exception = None
         last_status_message = ""
 
-        for attempt, (current_client, current_model_name) in enumerate(clients_to_try):
-            print(f"Attempt {attempt + 1}/{len(clients_to_try)} for file {file_batch} using model {current_model_name}...")
-            try:
-                # Use asyncio.wait_for for timeout instead of ThreadPoolExecutor
-                async def api_call_task():
-                    return await asyncio.get_event_loop().run_in_executor(
-                        None,
-                        lambda: current_client.chat.create_with_completion(
-                            messages=messages,
-                            response_model=pydantic_model,
-                            generation_config={
-                                "temperature": 0.0,
-                                "top_p": 1,
-                                "candidate_count": 1,
-                                "max_output_tokens": 8000,
-                            },
-                            max_retries=1, # Reduced internal retries as we have our own loop
-                        )
-                    )
-
-                completion, raw = await asyncio.wait_for(api_call_task(), timeout=15.0)
-
-                # --- Success ---
-                result = completion.model_dump()
-                print(f"Success on attempt {attempt + 1} for file {file_batch}")
-                if generation:
-                    # Update generation details for the successful attempt
-                    generation.model = current_model_name
-                    generation.end(
-                        output=result,
-                        usage={
-                            "input": raw.usage_metadata.prompt_token_count,
-                            "output": raw.usage_metadata.candidates_token_count,
+        executor_futures = {}  # model name -> executor future of its call, kept to measure hedging
+        timeouts = {}  # model name -> timeout of its call
+        prompt_tokens = estimate_tokens(system_prompt) + estimate_tokens(batch_prompt)
+        if failures is None:
+            failures = []
+
+        async def call_model(current_client, current_model_name, issued: asyncio.Event = None):
+            # Sized from the prompt and the speed of the model, within the deadline of the run
+            timeout = self.call_timeouts.timeout(current_model_name, prompt_tokens)
+            timeouts[current_model_name] = timeout
+            if timeout <= 0:
+                raise JobDeadlineExceeded("The deadline of the indexing run is reached")
+            # The timeout only covers the call itself, but the wait for a slot of the model
+            # came out of the deadline of the run: size it again once the slot is held
+            async with model_limiters.slot(current_model_name) as call_slot:
+                timeout = self.call_timeouts.timeout(current_model_name, prompt_tokens)
+                timeouts[current_model_name] = timeout
+                if timeout <= 0:
+                    raise JobDeadlineExceeded("The deadline of the indexing run was reached while waiting for a slot")
+                started = time.monotonic()
+                future = llm_executor.submit(
+                    lambda: current_client.chat.create_with_completion(
+                        messages=messages,
+                        response_model=pydantic_model,
+                        generation_config={
+                            "temperature": 0.0,
+                            "top_p": 1,
+                            "candidate_count": 1,
+                            "max_output_tokens": 8000,
                         },
-                        level="DEFAULT", # Explicitly set level to DEFAULT for success
-                        status_message=f"Success on attempt {attempt + 1}"
+                        max_retries=1, # Reduced internal retries as we have our own loop
                     )
-                return result, index
-
-            except asyncio.TimeoutError:
-                last_status_message = f"Attempt {attempt + 1} timed out after 15s (Model: {current_model_name})"
-                print(last_status_message)
-                last_exception = asyncio.TimeoutError(last_status_message) # Store exception type
-
-            except Exception as e:
-                last_status_message = f"Attempt {attempt + 1} failed (Model: {current_model_name}): {str(e)}, {traceback.format_exc()}"
-                print(last_status_message)
-                last_exception = e # Store the exception
-
-            # Update generation span for failed attempt if it exists
+                )
+                executor_futures[current_model_name] = future
+                # Abandoned or timed out, the call keeps running in its thread: keep its slots until it ends
+                call_slot.hold_until(future)
+                if issued is not None:
+                    issued.set()
+                answer = await asyncio.wait_for(asyncio.wrap_future(future), timeout=timeout)
+                model_limiters.health.get(current_model_name).record_throughput(prompt_tokens, time.monotonic() - started)
+                return answer
+
+        attempt = 0
+        position = 0
+        while position < len(clients_to_try):
+            current_client, current_model_name = clients_to_try[position]
+            attempt += 1
+            print(f"Attempt {attempt}/{len(clients_to_try)} for file {file_batch} using model {current_model_name}...")
+            primary_issued = asyncio.Event()
+            primary = asyncio.create_task(call_model(current_client, current_model_name, primary_issued))
+            calls = {primary: current_model_name}
+            position += 1
+
+            # Hedging: past the p95 latency of the model, race a duplicate on the next model
+            hedge_delay = self.hedging.delay(current_model_name) if position < len(clients_to_try) else None
+            if hedge_delay is not None and clients_to_try[position][1] != current_model_name:
+                # The delay runs from when the call is sent, not while it waits for a slot
+                issued_wait = asyncio.create_task(primary_issued.wait())
+                await asyncio.wait({primary, issued_wait}, return_when=asyncio.FIRST_COMPLETED)
+                issued_wait.cancel()
+                if not primary.done():
+                    await asyncio.wait({primary}, timeout=hedge_delay)
+                # A hedge queued behind a full window would not finish first
+                hedge_model_free = model_limiters.get(clients_to_try[position][1]).has_free_slot()
+                if not primary.done() and hedge_model_free and self.hedging.try_hedge():
+                    hedge_client, hedge_model_name = clients_to_try[position]
+                    logger.info(f"Hedging {file_batch} on model {hedge_model_name} after {hedge_delay:.2f}s on {current_model_name}")
+                    calls[asyncio.create_task(call_model(hedge_client, hedge_model_name))] = hedge_model_name
+                    position += 1
+
+            completion, winner = None, None
+            pending = set(calls)
+            while pending and completion is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    try:
+                        completion, raw = task.result()
+                        winner = task
+                        break
+                    except asyncio.TimeoutError:
+                        failures.append("timeout")
+                        last_status_message = f"Attempt {attempt} timed out after {timeouts[calls[task]]:.1f}s (Model: {calls[task]})"
+                        print(last_status_message)
+                        last_exception = asyncio.TimeoutError(last_status_message) # Store exception type
+                    except JobDeadlineExceeded as e:
+                        failures.append("deadline")
+                        last_status_message = f"Attempt {attempt} not made (Model: {calls[task]}): {str(e)}"
+                        print(last_status_message)
+                        last_exception = e
+                    except Exception as e:
+                        failures.append("error")
+                        last_status_message = f"Attempt {attempt} failed (Model: {calls[task]}): {str(e)}, {traceback.format_exc()}"
+                        print(last_status_message)
+                        last_exception = e # Store the exception
+
+                    # Update generation span for failed attempt if it exists
+                    if generation:
+                        generation.status_message=last_status_message # Keep updating status message on failures
+                        generation.model = calls[task] # Ensure model name reflects the failed attempt
+            # The slower call is abandoned; its executor thread finishes on its own, holding its slots until then
+            for task in pending:
+                task.cancel()
+            if completion is None:
+                continue
+
+            # --- Success ---
+            current_model_name = calls[winner]
+            if winner is not primary:
+                self.hedging.record_win(time.monotonic(), executor_futures.get(calls[primary]))
+            result = completion.model_dump()
+            print(f"Success on attempt {attempt} for file {file_batch}")
+            if cache_key:
+                await asyncio.to_thread(self.summary_cache.put, cache_key, result, current_model_name)
+            if answered_by is not None:
+                answered_by.append(current_model_name)
             if generation:
-                generation.status_message=last_status_message # Keep updating status message on failures
-                generation.model = current_model_name # Ensure model name reflects the failed attempt
+                # Update generation details for the successful attempt
+                generation.model = current_model_name
+                generation.end(
+                    output=result,
+                    usage={
+                        "input": raw.usage_metadata.prompt_token_count,
+                        "output": raw.usage_metadata.candidates_token_count,
+                    },
+                    level="DEFAULT", # Explicitly set level to DEFAULT for success
+                    status_message=f"Success on attempt {attempt}"
+                )
+            return result, index
 
         # --- All attempts failed ---
         print(f"All {len(clients_to_try)} attempts failed for file {file_batch}. Last error: {last_status_message}")
@@ -349,60 +668,299 @@ class InformationCompressorNode(ClassifierConfig):
             )
         return None, None
 
-    @trace
-    async def summerizer(
+    def is_packable(self, file: dict, category: str, tokens: int) -> bool:
+        """Return True if a file is small enough to be summarized in a pack with others."""
+        if SUMMARY_PACK_MAX_FILES < 2 or tokens > SUMMARY_PACK_MAX_FILE_TOKENS:
+            return False
+        # Python files of the hybrid mode are described from their AST skeleton instead
+        if category == "docstring" and self.docstring_mode == "hybrid" and file["file_paths"].endswith(".py"):
+            return False
+        return True
+
+    def summary_model(self, category: str, text: str):
+        """Return the response model of a single file summary of the given category."""
+        if category == "docstring":
+            return generate_code_structure_model_consize(text)
+        if category == "documentation":
+            return DocumentCompression
+        return YamlBrief
+
+    async def process_pack(
         self,
-        classified_files: dict,
-        batch_size: int = 50,  # Number of files to process in each batch
-        max_workers: int = 30,  # Number of parallel workers
-        GEMINI_API_KEY: str = "",
-        ANTHROPIC_API_KEY: str = "",
-        OPENAI_API_KEY: str = "",
-        trace_id: str = ""
-    ) -> str:
-        span = get_langfuse_context().get("span")
-        scores = [0]
-
-        # Configure safety settings
-        safe = SAFE
-
-        # Configure Gemini with API key from request if provided
-        if GEMINI_API_KEY:
-            genai.configure(api_key=GEMINI_API_KEY)
-        else:
-            # Use default API key from environment
-            genai.configure()
-        client_gemini_0 = instructor.from_gemini(
-            client=genai.GenerativeModel(
-                model_name=self.file_class_model_0, safety_settings=safe
-            ),
-            mode=instructor.Mode.GEMINI_JSON,
-        )
-        client_gemini_1 = instructor.from_gemini(
-            client=genai.GenerativeModel(
-                model_name=self.file_class_model_1, safety_settings=safe
-            ),
-            mode=instructor.Mode.GEMINI_JSON,
+        pack: list,
+        client_gemini,
+        model_name,
+        scores: list[int],
+        span=None,
+        fallback_clients: list[instructor.Instructor] = None,
+        fallback_model_names: list[str] = None,
+    ) -> dict:
+        """
+        Summarize several small files of the same category in a single request.
+
+        Files already in the summary cache are answered from it, the others are sent
+        together, each delimited and keyed, and the per-file summaries of the answer are
+        cached under the packed prompt and the model that wrote them, apart from the
+        single-file summaries.
+
+        Args:
+            pack (list): (classified file, category) pairs, all of the same category
+            client_gemini: Client of the first model to try
+            model_name (str): Name of the first model to try
+            scores (list[int]): Shared validation counter
+            span: Langfuse span of the run
+            fallback_clients (list): Clients tried when the first model fails
+            fallback_model_names (list[str]): Names of the fallback models
+
+        Returns:
+            dict: Summary of each answered file, keyed by file path. Files missing from it
+                have to be summarized on their own.
+        """
+        category = pack[0][1]
+        namespace = self.packed_cache_namespaces[category]
+        # Packed summaries are keyed by the model that wrote them, any model of the chain may answer
+        model_names = [model_name] + list(fallback_model_names or [])
+        results = {}
+        pending = []  # (file path, content)
+        for file, _ in pack:
+            file_path = file["file_paths"]
+            try:
+                with open(file_path, "r") as f:
+                    file_content = f.read()
+            except Exception as e:
+                print(f"Error reading file {file_path}: {e}")
+                continue
+            for candidate_model in model_names:
+                cached_result = await asyncio.to_thread(
+                    self.summary_cache.get, self.summary_cache.make_key(file_content, f"{namespace}|{candidate_model}")
+                )
+                if cached_result is not None:
+                    results[file_path] = cached_result
+                    break
+            else:
+                pending.append((file_path, file_content))
+        if len(pending) < 2:
+            # Nothing worth packing left, the single-file path handles the rest
+            return results
+
+        packed_content = "\n".join(
+            f'<file key="{key}" name="{os.path.basename(file_path)}">\n{file_content}\n</file>'
+            for key, (file_path, file_content) in enumerate(pending)
         )
-        client_gemini_2 = instructor.from_gemini(
-            client=genai.GenerativeModel(
-                model_name=self.file_class_model_2, safety_settings=safe
-            ),
-            mode=instructor.Mode.GEMINI_JSON,
+        # Names of a CodeStructure are checked against its own file, not the whole pack
+        file_summary_models = None
+        if category == "docstring":
+            file_summary_models = {
+                str(key): self.summary_model(category, file_content) for key, (_, file_content) in enumerate(pending)
+            }
+        prompt_key = "configuration" if category == "config" else category
+        label = f"pack of {len(pending)} {category} files"
+        answered_by = []
+        result, _ = await self.process_batch(
+            label,
+            client_gemini,
+            model_name,
+            self.prompts_config[f"system_{prompt_key}"] + self.prompts_config["system_packed"],
+            self.prompts_config[f"user_{prompt_key}"],
+            scores,
+            span,
+            label,
+            log_name=f"packed_{category}",
+            fallback_clients=fallback_clients,
+            fallback_model_names=fallback_model_names,
+            pydantic_model=create_packed_summaries_model(self.summary_model(category, packed_content), file_summary_models),
+            content=packed_content,
+            answered_by=answered_by,
         )
-        client_gemini_3 = instructor.from_gemini(
-            client=genai.GenerativeModel(
-                model_name=self.file_class_model_3, safety_settings=safe
-            ),
-            mode=instructor.Mode.GEMINI_JSON,
+        if not result:
+            return results
+
+        winning_model = answered_by[0] if answered_by else model_name
+        for item in result.get("summaries", []):
+            try:
+                file_path, file_content = pending[int(item["file_key"])]
+            except (ValueError, IndexError):
+                continue
+            results[file_path] = item["summary"]
+            await asyncio.to_thread(
+                self.summary_cache.put,
+                self.summary_cache.make_key(file_content, f"{namespace}|{winning_model}"),
+                item["summary"],
+                winning_model,
+            )
+        return results
+
+    async def process_python_file(
+        self,
+        file_path: str,
+        client_gemini,
+        model_name,
+        scores: list[int],
+        span=None,
+        fallback_clients: list[instructor.Instructor] = None,
+        fallback_model_names: list[str] = None,
+        skeleton_stats: dict = None,
+    ):
+        """
+        Build the CodeStructure of a Python file from its AST, asking the LLM only for the missing descriptions.
+
+        Names come from the code itself, so they need no validation, and descriptions come
+        from the docstrings when there is one.
+
+        Args:
+            file_path (str): Path of the Python file
+            client_gemini: Client of the first model to try
+            model_name (str): Name of the first model to try
+            scores (list[int]): Shared validation counter
+            span: Langfuse span of the run
+            fallback_clients (list): Clients tried when the first model fails
+            fallback_model_names (list[str]): Names of the fallback models
+            skeleton_stats (dict): Counters updated with the outcome
+
+        Returns:
+            Optional[dict]: The CodeStructure, or None if the file cannot be parsed
+        """
+        skeleton = await asyncio.get_running_loop().run_in_executor(
+            get_skeleton_pool(), extract_python_skeleton, file_path
         )
+        if skeleton is None:
+            return None
+
+        missing_keys = missing_description_keys(skeleton)
+        element_count = sum(1 for _ in iter_skeleton_elements(skeleton))
+        if skeleton_stats is not None:
+            skeleton_stats["files"] += 1
+            skeleton_stats["descriptions_from_docstrings"] += element_count - len(missing_keys)
+            skeleton_stats["descriptions_requested"] += len(missing_keys)
+        if not missing_keys:
+            if skeleton_stats is not None:
+                skeleton_stats["files_without_llm_call"] += 1
+            return skeleton
+
+        # Oversized files are described chunk by chunk, each chunk with the keys it defines
+        requests = [(missing_keys, None)]
+        if estimate_file_tokens(file_path) > SUMMARY_CHUNK_THRESHOLD_TOKENS:
+            with open(file_path, "r") as f:
+                chunks = split_source(f.read(), SUMMARY_CHUNK_TOKENS, is_python=True)
+            if len(chunks) > 1:
+                requests = [
+                    (keys, chunk)
+                    for keys, chunk in zip(assign_keys_to_chunks(missing_keys, chunks), chunks)
+                    if keys
+                ]
+
+        async def request_descriptions(position, keys, chunk):
+            label = file_path if chunk is None else f"{file_path} [chunk {position + 1}/{len(requests)}]"
+            chunk_client, chunk_model_name, chunk_fallback_clients, chunk_fallback_model_names = rotate_candidates(
+                client_gemini, model_name, fallback_clients, fallback_model_names, position
+            )
+            return await self.process_batch(
+                label,
+                chunk_client,
+                chunk_model_name,
+                self.prompts_config["system_descriptions"],
+                self.prompts_config["user_descriptions"],
+                scores,
+                span,
+                label,
+                log_name="descriptions",
+                fallback_clients=chunk_fallback_clients,
+                fallback_model_names=chunk_fallback_model_names,
+                pydantic_model=MissingDescriptions,
+                extra_prompt="\n".join(keys) + "\n\n",
+                content=chunk,
+            )
 
-        clients = {
-            0: client_gemini_0,
-            1: client_gemini_1,
-            2: client_gemini_2,
-            3: client_gemini_3,
-        }
+        results = await asyncio.gather(
+            *(request_descriptions(position, keys, chunk) for position, (keys, chunk) in enumerate(requests))
+        )
+        descriptions = {}
+        for result, _ in results:
+            if result is None:
+                # The structure is still exact, only some descriptions stay empty
+                if skeleton_stats is not None:
+                    skeleton_stats["llm_failures"] += 1
+                continue
+            descriptions.update({item["key"]: item["description"] for item in result.get("descriptions", [])})
+        return fill_descriptions(skeleton, descriptions)
+
+    async def process_chunked_file(
+        self,
+        file_path: str,
+        client_gemini,
+        model_name,
+        scores: list[int],
+        span=None,
+        fallback_clients: list[instructor.Instructor] = None,
+        fallback_model_names: list[str] = None,
+        chunk_stats: dict = None,
+        chunk_tokens: int = SUMMARY_CHUNK_TOKENS,
+    ):
+        """
+        Summarize an oversized code file with map-reduce.
+
+        The file is split at class and function boundaries, the chunks are summarized in
+        parallel (each one cached on its own content, so an edit only re-summarizes the
+        chunks it touches), and their CodeStructures are merged into one.
+
+        Args:
+            file_path (str): Path of the code file
+            client_gemini: Client of the first model to try
+            model_name (str): Name of the first model to try
+            scores (list[int]): Shared validation counter
+            span: Langfuse span of the run
+            fallback_clients (list): Clients tried when the first model fails
+            fallback_model_names (list[str]): Names of the fallback models
+            chunk_stats (dict): Counters updated with the outcome
+            chunk_tokens (int): Target size of the chunks
+
+        Returns:
+            Optional[dict]: The merged CodeStructure, or None if no chunk could be summarized
+        """
+        try:
+            with open(file_path, "r") as f:
+                file_content = f.read()
+        except Exception as e:
+            print(f"Error reading file {file_path}: {e}")
+            return None
+        chunks = split_source(file_content, chunk_tokens, is_python=file_path.endswith(".py"))
+
+        async def summarize_chunk(position, chunk):
+            label = f"{file_path} [chunk {position + 1}/{len(chunks)}]"
+            chunk_client, chunk_model_name, chunk_fallback_clients, chunk_fallback_model_names = rotate_candidates(
+                client_gemini, model_name, fallback_clients, fallback_model_names, position
+            )
+            result, _ = await self.process_batch(
+                label,
+                chunk_client,
+                chunk_model_name,
+                self.prompts_config["system_docstring"],
+                self.prompts_config["user_docstring"],
+                scores,
+                span,
+                label,
+                log_name="docstring",
+                fallback_clients=chunk_fallback_clients,
+                fallback_model_names=chunk_fallback_model_names,
+                extra_prompt=f"(Part {position + 1} of {len(chunks)} of {os.path.basename(file_path)})\n",
+                content=chunk,
+            )
+            return result
+
+        results = await asyncio.gather(*(summarize_chunk(position, chunk) for position, chunk in enumerate(chunks)))
+        structures = [result for result in results if result]
+        if chunk_stats is not None:
+            chunk_stats["files"] += 1
+            chunk_stats["chunks"] += len(chunks)
+            chunk_stats["failed_chunks"] += len(chunks) - len(structures)
+        if not structures:
+            return None
+        return merge_code_structures(structures)
+
+    def build_clients(self, GEMINI_API_KEY: str = ""):
+        """Return the pooled instructor clients of the four summarization models for an API key."""
+        # Configure safety settings
+        safe = SAFE
 
         model_names = {
             0: self.file_class_model_0,
@@ -410,149 +968,370 @@ class InformationCompressorNode(ClassifierConfig):
             2: self.file_class_model_2,
             3: self.file_class_model_3,
         }
+        clients = {
+            index: llm_client_pool.gemini_instructor(GEMINI_API_KEY, model_name, safe)
+            for index, model_name in model_names.items()
+        }
+        return clients, model_names
+
+    @staticmethod
+    def build_index(summarized_files: list) -> dict:
+        """
+        Structure (classified file, category, result) entries into the three index lists.
+
+        Entries are in classification order whatever the completion order, and get new
+        sequential ids within their list.
+        """
+        outputs = {"docstring": [], "documentation": [], "config": []}
+        for file, category, result in sorted(summarized_files, key=lambda item: item[0]["file_id"]):
+            file_data = file.copy()
+            if category == "config":
+                file_data["documentation_config"] = result # Add result under 'documentation_config' key
+            else:
+                file_data["documentation"] = result
+            file_data["file_id"] = len(outputs[category]) # Assign new sequential ID
+            outputs[category].append(file_data)
+        return {
+            "documentation": outputs["docstring"],
+            "documentation_md": outputs["documentation"],
+            "config": outputs["config"],
+        }
 
-        # Prepare file lists for each category
-        files_structure_docstring = []
-        files_structure_documentation = []
-        files_structure_config = []
-
-        # Keep track of original indices to update the main dict later if needed
-        # or to handle categorization after processing
-        original_indices = {}
+    @staticmethod
+    def summary_category(file: dict):
+        """Return the summary category (docstring, documentation or config) of a classified file, or None."""
+        file_path = file["file_paths"]
+        file_name = file.get("file_name", "").lower() # Handle potential missing key
+
+        if "code" in file["classification"].lower() and "ipynb" not in file_path and "__init__.py" not in file_path:
+            return "docstring"
+        elif ".md" in file_path.lower():
+            return "documentation"
+        elif ".yaml" in file_path.lower() or ".yml" in file_path.lower() or ".yml" in file_name:
+            return "config"
+        return None
+
+    async def summarize_queue(
+        self,
+        queue: asyncio.Queue,
+        clients: dict,
+        model_names: dict,
+        max_workers: int = 30,
+        span=None,
+        progress: PipelineProgress = None,
+        completed: list = None,
+        on_result=None,
+        on_finished=None,
+    ) -> dict:
+        """
+        Summarize (file, category) items from a queue until END_OF_STREAM is received.
+
+        Workers consume the queue concurrently, so summarization can start while the
+        producer (the classifier) is still running. There are enough workers to fill the
+        largest windows of the models' adaptive limiters, which decide how many calls are
+        actually in flight; max_workers is only a lower bound. While a backlog builds up,
+        small files of the same category are packed into a single request. Each unit goes
+        to the currently fastest healthy model, the others being its fallbacks in order.
+
+        completed holds (file, category, result) entries of a previous run, which are
+        part of the output without being summarized again; on_result is called with the
+        same triple as soon as a file is summarized, so callers can checkpoint it.
+        on_finished is called with every file once it needs no more work, whether it was
+        summarized, failed or skipped.
+
+        Byte-identical files of a category are summarized once (see DuplicateFiles), the
+        result being recorded for every copy under its own path.
+
+        Files whose content is not worth a summary (see sniff_file) never reach the LLM:
+        code files that are minified, generated or oversized are indexed with a
+        placeholder description, the other ones are listed under "skipped". Either way
+        the entry carries the content_kind that was detected.
+        """
+        scores = [0]
+        summarized_files = list(completed or [])  # (classified file, category, result)
+        skipped_files = []
+        content_stats = Counter()
+        duplicates = DuplicateFiles()
+        # The cache and the hedging policy outlive the run, their counters are reported as a difference
+        cache_stats_at_start = self.summary_cache.stats()
+        hedging_stats_at_start = self.hedging.snapshot()
+
+        def route() -> list:
+            """Indexes of the models, from the currently fastest healthy one."""
+            return model_limiters.rank([model_names[j] for j in range(4)])
+
+        def record(file, category, result):
+            summarized_files.append((file, category, result))
+            if on_result:
+                try:
+                    on_result(file, category, result)
+                except Exception as e:
+                    logger.warning(f"Could not checkpoint {file['file_paths']}: {e}")
+
+        def finished(file, success=True):
+            if progress:
+                progress.finished("summarization", success=success)
+            if on_finished:
+                on_finished(file)
+
+        def settle(file, category, result):
+            """Record the outcome of a file for the copies of it waiting on its summary."""
+            for duplicate in duplicates.settle(file, result):
+                if progress:
+                    progress.started("summarization")
+                if result:
+                    record(duplicate, category, result)
+                finished(duplicate, success=bool(result))
+        skeleton_stats = {
+            "files": 0,
+            "files_without_llm_call": 0,
+            "descriptions_from_docstrings": 0,
+            "descriptions_requested": 0,
+            "llm_failures": 0,
+        }
 
-        for index, file in enumerate(classified_files["file_classifications"]):
+        pack_stats = {"packs": 0, "packed_files": 0, "files_answered_in_packs": 0}
+        chunk_stats = {"files": 0, "chunks": 0, "failed_chunks": 0, "timeout_retries": 0}
+        worker_count = max(max_workers, model_limiters.capacity(model_names.values()))
+        # Work units are lists of (file, category): a single file or a pack of small files
+        work_queue = asyncio.Queue(maxsize=worker_count)
+
+        def inspect_file(file_path: str, is_code: bool) -> tuple:
+            """(content kind, content digest) of a file, the digest only if it is to be summarized."""
+            content_kind = sniff_file(file_path, is_code=is_code) if self.content_sniffer else None
+            return content_kind, None if content_kind else content_digest(file_path)
+
+        async def packer():
+            """
+            Group small files of the same category into packs while a backlog builds up.
+
+            Whenever the input queue runs dry the open packs are flushed, so packing never
+            makes a worker wait for files that are not there yet.
+            """
+            open_packs = {}  # category -> ([(file, category)], estimated tokens)
+
+            async def flush(category):
+                pack, _ = open_packs.pop(category)
+                await work_queue.put(pack)
+
+            while True:
+                try:
+                    item = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    for category in list(open_packs):
+                        await flush(category)
+                    item = await queue.get()
+                if item is END_OF_STREAM:
+                    for category in list(open_packs):
+                        await flush(category)
+                    await work_queue.put(END_OF_STREAM)
+                    return
+
+                file, category = item
+                # Both read the file, which would stall the calls in flight on the loop
+                content_kind, digest = await asyncio.to_thread(inspect_file, file["file_paths"], category == "docstring")
+                if content_kind:
+                    content_stats[content_kind] += 1
+                    file = {**file, "content_kind": content_kind}
+                    if progress:
+                        progress.started("summarization")
+                    if category == "docstring" and content_kind not in SKIPPED_CONTENT_KINDS:
+                        record(file, category, placeholder_structure(content_kind))
+                    else:
+                        skipped_files.append(file)
+                    finished(file)
+                    continue
+                summarize, result = duplicates.add(file, category, digest)
+                if not summarize:
+                    # A copy: recorded now if its content is already summarized, else when it is
+                    if result:
+                        if progress:
+                            progress.started("summarization")
+                        record(file, category, result)
+                        finished(file)
+                    continue
+                tokens = estimate_file_tokens(file["file_paths"])
+                if not self.is_packable(file, category, tokens):
+                    await work_queue.put([item])
+                    continue
+                pack, pack_tokens = open_packs.get(category, ([], 0))
+                if pack and pack_tokens + tokens > SUMMARY_PACK_TOKEN_BUDGET:
+                    await flush(category)
+                    pack, pack_tokens = [], 0
+                pack.append(item)
+                open_packs[category] = (pack, pack_tokens + tokens)
+                if len(pack) >= SUMMARY_PACK_MAX_FILES:
+                    await flush(category)
+
+        async def summarize_file(file, category, order):
             file_path = file["file_paths"]
-            file_name = file.get("file_name", "").lower() # Handle potential missing key
-            original_indices[file_path] = index # Store index by file_path
-
-            if "code" in file["classification"].lower() and "ipynb" not in file_path and "__init__.py" not in file_path:
-                files_structure_docstring.append([file_path, "docstring"])
-            elif ".md" in file_path.lower():
-                files_structure_documentation.append([file_path, "documentation"])
-            elif ".yaml" in file_path.lower() or ".yml" in file_path.lower() or ".yml" in file_name:
-                files_structure_config.append([file_path, "config"])
-
-        # Combine all files to process
-        all_files_to_process = files_structure_docstring + files_structure_documentation + files_structure_config
-
-        # Temporary storage for results
-        results_docstring = {}
-        results_documentation = {}
-        results_config = {}
-
-        # Create tasks for all files
-        tasks = []
-        file_to_category = {}
-        
-        for i, (file_path, category) in enumerate(all_files_to_process):
-            client_index = i % 4
-            model_name = model_names[client_index]
-            client = clients[client_index]
-            fallback_clients = [clients[j] for j in range(4) if j != client_index]
-            fallback_model_names = [model_names[j] for j in range(4) if j != client_index]
-            
-            if category == "docstring":
-                system_prompt = self.prompts_config["system_docstring"]
-                user_prompt = self.prompts_config["user_docstring"]
-                log_name = "docstring"
-            elif category == "documentation":
-                system_prompt = self.prompts_config["system_documentation"]
-                user_prompt = self.prompts_config["user_documentation"]
-                log_name = "documentation"
-            else: # category == "config"
-                system_prompt = self.prompts_config["system_configuration"]
-                user_prompt = self.prompts_config["user_configuration"]
-                log_name = "config"
-
-            task = self.process_batch(
-                file_path,
-                client,
-                model_name,
-                system_prompt,
-                user_prompt,
-                scores,
-                span,
-                file_path, # Pass file_path as identifier instead of original index
-                log_name=log_name,
-                fallback_clients=fallback_clients,
-                fallback_model_names=fallback_model_names,
-            )
-            tasks.append(task)
-            file_to_category[i] = (file_path, category)
-
-        # Use asyncio.gather with semaphore to limit concurrency
-        semaphore = asyncio.Semaphore(max_workers)
-        
-        async def bounded_task(task):
-            async with semaphore:
-                return await task
+            client_index = order[0]
+            fallback_clients = [clients[j] for j in order[1:]]
+            fallback_model_names = [model_names[j] for j in order[1:]]
+            prompt_key = "configuration" if category == "config" else category
 
-        bounded_tasks = [bounded_task(task) for task in tasks]
-        
-        try:
-            results = await asyncio.gather(*bounded_tasks, return_exceptions=True)
-            
-            for i, result in enumerate(results):
-                file_path, category = file_to_category[i]
-                if isinstance(result, Exception):
-                    print(f"Batch processing failed for {file_path} ({category}): {str(result)}")
+            try:
+                processed_result, identifier = None, None
+                if category == "docstring" and self.docstring_mode == "hybrid" and file_path.endswith(".py"):
+                    processed_result = await self.process_python_file(
+                        file_path,
+                        clients[client_index],
+                        model_names[client_index],
+                        scores,
+                        span,
+                        fallback_clients,
+                        fallback_model_names,
+                        skeleton_stats,
+                    )
+                    identifier = file_path
+                # A whole-file request of an oversized file would only time out, so it is never made
+                oversized = category == "docstring" and estimate_file_tokens(file_path) > SUMMARY_CHUNK_THRESHOLD_TOKENS
+                if processed_result is None and oversized:
+                    processed_result = await self.process_chunked_file(
+                        file_path,
+                        clients[client_index],
+                        model_names[client_index],
+                        scores,
+                        span,
+                        fallback_clients,
+                        fallback_model_names,
+                        chunk_stats,
+                    )
+                    identifier = file_path
+                failures = []
+                if processed_result is None and not oversized:
+                    processed_result, identifier = await self.process_batch(
+                        file_path,
+                        clients[client_index],
+                        model_names[client_index],
+                        self.prompts_config[f"system_{prompt_key}"],
+                        self.prompts_config[f"user_{prompt_key}"],
+                        scores,
+                        span,
+                        file_path, # Pass file_path as identifier instead of original index
+                        log_name=category,
+                        fallback_clients=fallback_clients,
+                        fallback_model_names=fallback_model_names,
+                        failures=failures,
+                    )
+                # A code file every model timed out on is retried in chunks small enough to fit the timeouts
+                if processed_result is None and category == "docstring" and failures and set(failures) == {"timeout"}:
+                    chunk_stats["timeout_retries"] += 1
+                    processed_result = await self.process_chunked_file(
+                        file_path,
+                        clients[client_index],
+                        model_names[client_index],
+                        scores,
+                        span,
+                        fallback_clients,
+                        fallback_model_names,
+                        chunk_stats,
+                        chunk_tokens=min(SUMMARY_CHUNK_TOKENS, max(SUMMARY_MIN_CHUNK_TOKENS, estimate_file_tokens(file_path) // 2)),
+                    )
+                    identifier = file_path
+            except Exception as e:
+                print(f"Batch processing failed for {file_path} ({category}): {str(e)}")
+                processed_result, identifier = None, None
+
+            success = bool(processed_result) and identifier == file_path
+            if success:
+                record(file, category, processed_result)
+            settle(file, category, processed_result if success else None)
+            finished(file, success=success)
+
+        async def worker():
+            while True:
+                unit = await work_queue.get()
+                if unit is END_OF_STREAM:
+                    # Leave the marker for the other workers
+                    work_queue.put_nowait(END_OF_STREAM)
+                    return
+                if progress:
+                    for _ in unit:
+                        progress.started("summarization")
+
+                order = route()
+                if len(unit) == 1:
+                    await summarize_file(*unit[0], order)
                     continue
-                    
-                processed_result, identifier = result
-                if processed_result and identifier == file_path: # Check if result is valid and matches the file path
-                    if category == "docstring":
-                        results_docstring[file_path] = processed_result
-                    elif category == "documentation":
-                        results_documentation[file_path] = processed_result
-                    elif category == "config":
-                        results_config[file_path] = processed_result
-                        
-        except Exception as e:
-            print(f"Error in asyncio.gather: {str(e)}, {traceback.format_exc()}")
-
-        # Structure the final output
-        output_documentation = []
-        output_documentation_md = []
-        output_config = []
 
-        processed_indices = set()
-
-        # Populate docstring results
-        for file_path, result in results_docstring.items():
-            original_index = original_indices.get(file_path)
-            if original_index is not None:
-                file_data = classified_files["file_classifications"][original_index].copy()
-                file_data["documentation"] = result
-                file_data["file_id"] = len(output_documentation) # Assign new sequential ID
-                output_documentation.append(file_data)
-                processed_indices.add(original_index)
-
-        # Populate documentation (.md) results
-        for file_path, result in results_documentation.items():
-            original_index = original_indices.get(file_path)
-            if original_index is not None:
-                file_data = classified_files["file_classifications"][original_index].copy()
-                file_data["documentation"] = result # Add result under 'documentation' key
-                file_data["file_id"] = len(output_documentation_md)
-                output_documentation_md.append(file_data)
-                processed_indices.add(original_index)
-
-        # Populate config results
-        for file_path, result in results_config.items():
-            original_index = original_indices.get(file_path)
-            if original_index is not None:
-                file_data = classified_files["file_classifications"][original_index].copy()
-                file_data["documentation_config"] = result # Add result under 'documentation_config' key
-                file_data["file_id"] = len(output_config)
-                output_config.append(file_data)
-                processed_indices.add(original_index)
+                pack_stats["packs"] += 1
+                pack_stats["packed_files"] += len(unit)
+                try:
+                    pack_results = await self.process_pack(
+                        unit,
+                        clients[order[0]],
+                        model_names[order[0]],
+                        scores,
+                        span,
+                        [clients[j] for j in order[1:]],
+                        [model_names[j] for j in order[1:]],
+                    )
+                except Exception as e:
+                    print(f"Pack processing failed for {len(unit)} files: {str(e)}")
+                    pack_results = {}
+                for file, category in unit:
+                    result = pack_results.get(file["file_paths"])
+                    if result:
+                        pack_stats["files_answered_in_packs"] += 1
+                        record(file, category, result)
+                        settle(file, category, result)
+                        finished(file)
+                    else:
+                        # Missing or invalid in the packed answer, summarize it on its own
+                        await summarize_file(file, category, route())
+
+        await asyncio.gather(packer(), *(worker() for _ in range(worker_count)))
+
+
+        cache_stats = self.summary_cache.stats(since=cache_stats_at_start)
+        logger.info(f"Summary cache stats: {cache_stats}")
+        concurrency_stats = model_limiters.snapshot()
+        logger.info(f"Model concurrency windows: {concurrency_stats}")
+        hedging_stats = self.hedging.snapshot(since=hedging_stats_at_start)
+        logger.info(f"Hedging stats: {hedging_stats}")
+        duplicate_stats = duplicates.stats()
+        logger.info(f"Duplicate files: {duplicate_stats}")
+        logger.info(f"Files kept from the LLM by content: {dict(content_stats)}")
 
         return {
-            "documentation": output_documentation,
-            "documentation_md": output_documentation_md,
-            "config": output_config,
+            **self.build_index(summarized_files),
+            "skipped": sorted(skipped_files, key=lambda file: file["file_id"]),
+            "stats": {
+                "summary_cache": cache_stats,
+                "concurrency": concurrency_stats,
+                "skeleton": skeleton_stats,
+                "packing": pack_stats,
+                "chunking": chunk_stats,
+                "hedging": hedging_stats,
+                "duplicates": duplicate_stats,
+                "content": dict(content_stats),
+            },
         }
 
+    @trace
+    async def summerizer(
+        self,
+        classified_files: dict,
+        batch_size: int = 50,  # Number of files to process in each batch
+        max_workers: int = 30,  # Number of parallel workers
+        GEMINI_API_KEY: str = "",
+        ANTHROPIC_API_KEY: str = "",
+        OPENAI_API_KEY: str = "",
+        trace_id: str = ""
+    ) -> str:
+        span = get_langfuse_context().get("span")
+        clients, model_names = self.build_clients(GEMINI_API_KEY)
+
+        queue = asyncio.Queue()
+        for file in classified_files["file_classifications"]:
+            category = self.summary_category(file)
+            if category:
+                queue.put_nowait((file, category))
+        queue.put_nowait(END_OF_STREAM)
+
+        return await self.summarize_queue(queue, clients, model_names, max_workers, span)
+
 
 class ClassifierService:
     def __init__(self):
@@ -561,28 +1340,141 @@ class ClassifierService:
         self.information_compressor_node = InformationCompressorNode()
         self.trace_id = generate_trace_id()
         
-    async def run_pipeline(self, folder_path: str, batch_size: int = 50, max_workers: int = 10, GEMINI_API_KEY: str = "", ANTHROPIC_API_KEY: str = "", OPENAI_API_KEY: str = ""):
+    async def run_pipeline(self, folder_path: str, batch_size: int = 50, max_workers: int = 10, GEMINI_API_KEY: str = "", ANTHROPIC_API_KEY: str = "", OPENAI_API_KEY: str = "", files: list[str] = None, ignore_patterns: list[str] = None, respect_gitignore: bool = False, progress: PipelineProgress = None, checkpoint=None, deadline_seconds: float = DEFAULT_JOB_DEADLINE, on_partial=None):
+        """
+        Classify and summarize the files of a folder.
+
+        The two stages are streamed: each classification batch is pushed onto a bounded
+        queue as soon as it returns, and summarization workers consume it concurrently,
+        so the wall time is close to the slowest stage instead of the sum of both.
+
+        When `files` is given (paths relative to folder_path), only those files are
+        processed, which lets callers re-index just the delta of a repository.
+
+        ignore_patterns (extra glob patterns) and respect_gitignore adjust the rules of
+        the file listing for this request only.
+
+        A caller-owned progress can be polled while the pipeline runs. With a checkpoint
+        (see indexer.jobs.JobCheckpoint), every summarized file is recorded as it completes
+        and the files recorded by an interrupted run are neither classified nor
+        summarized again.
+
+        With deadline_seconds > 0, no summarization call is started past that wall time
+        and the calls in flight are cut at it; the files left over are missing from the
+        result, as failed ones are.
+
+        Files are classified and summarized by priority tier (see PriorityTiers): the
+        overview of the repository first, tests and examples last. Each time tiers
+        complete before the end of the run, on_partial is called with the index of the
+        files summarized so far, which is usable before the run finishes.
+        """
         trace_id = generate_trace_id()
-        # Classifier Node
-        classifier_result = await self.classifier_node.llmclassifier(
-            folder_path, 
-            batch_size, 
-            max_workers, 
-            GEMINI_API_KEY, 
-            ANTHROPIC_API_KEY, 
-            OPENAI_API_KEY, 
-            trace_id=trace_id 
+        progress = progress or PipelineProgress()
+        completed = checkpoint.load() if checkpoint else []
+        compressor = self.information_compressor_node
+        clients, model_names = compressor.build_clients(GEMINI_API_KEY)
+        tiers = None
+        summarized_files = list(completed)
+
+        async def prioritize(full_paths):
+            nonlocal tiers
+            tiers = await asyncio.to_thread(PriorityTiers, folder_path, full_paths)
+            logger.info(f"Priority tiers: {tiers.snapshot()}")
+            return tiers.tier
+
+        # Room for a full classification batch, so one batch rarely blocks on the queue
+        queue = TieredQueue(
+            maxsize=max(batch_size, 2 * max_workers),
+            tier_of=lambda item: tiers.tier(item[0]["file_paths"]) if tiers else 0,
         )
-        # Information Compressor Node
-        information_compressor_result = await self.information_compressor_node.summerizer(
-            classifier_result, 
-            batch_size, 
-            max_workers, 
-            GEMINI_API_KEY, 
-            ANTHROPIC_API_KEY, 
-            OPENAI_API_KEY, 
-            trace_id=trace_id  # Pass trace_id explicitly
+
+        # Checkpoint lines and partial indexes are written off the event loop, in order
+        writer = BackgroundWriter()
+
+        def on_result(file, category, result):
+            summarized_files.append((file, category, result))
+            if checkpoint:
+                writer.submit(checkpoint.record, file, category, result, description="checkpoint")
+
+        def publish_partial(summarized, tiers_completed):
+            index = compressor.build_index(summarized)
+            index["partial"] = {"tiers_completed": tiers_completed}
+            on_partial(index)
+
+        def on_finished(file):
+            if not tiers:
+                return
+            tiers.done(file["file_paths"])
+            completed_tiers = tiers.take_publication()
+            if completed_tiers is not None and on_partial:
+                logger.info(f"Publishing a partial index of {len(summarized_files)} files ({TIER_NAMES[:completed_tiers]} complete)")
+                writer.submit(
+                    publish_partial,
+                    list(summarized_files),
+                    list(TIER_NAMES[:completed_tiers]),
+                    description="partial index publication",
+                )
+
+        async def enqueue_batch(classifications):
+            for file in classifications:
+                category = compressor.summary_category(file)
+                if category:
+                    await queue.put((file, category))
+                    progress.queued("summarization")
+                else:
+                    on_finished(file)
+
+        if deadline_seconds and deadline_seconds > 0:
+            # Tasks copy the context when created, so every call of the run sees the deadline
+            job_deadline.set(time.monotonic() + deadline_seconds)
+
+        # Information Compressor Node, consuming while the classifier produces
+        summarization = asyncio.create_task(
+            compressor.summarize_queue(
+                queue,
+                clients,
+                model_names,
+                max_workers,
+                get_langfuse_context().get("span"),
+                progress,
+                completed=completed,
+                on_result=on_result,
+                on_finished=on_finished,
+            )
         )
+        try:
+            # Classifier Node
+            classifier_result = await self.classifier_node.llmclassifier(
+                folder_path, 
+                batch_size, 
+                GEMINI_API_KEY, 
+                ANTHROPIC_API_KEY, 
+                OPENAI_API_KEY, 
+                files=files,
+                file_filter=FileFilterConfig.for_request(
+                    include_md=True,
+                    ignore_patterns=ignore_patterns,
+                    respect_gitignore=respect_gitignore,
+                ),
+                on_batch=enqueue_batch,
+                progress=progress,
+                skip_files={file["file_paths"] for file, _, _ in completed},
+                prioritize=prioritize if DEFAULT_PRIORITY_TIERS.lower() != "off" else None,
+                trace_id=trace_id 
+            )
+            await queue.put(END_OF_STREAM)
+            information_compressor_result = await summarization
+        except Exception:
+            summarization.cancel()
+            raise
+        finally:
+            # Whatever happens to the run, the files it summarized stay checkpointed
+            await writer.flush()
+
+        pipeline_stats = progress.snapshot()
+        logger.info(f"Pipeline stats: {pipeline_stats}")
+        information_compressor_result["stats"]["pipeline"] = pipeline_stats
+        information_compressor_result["stats"]["classification"] = classifier_result.get("stats", {})
         return information_compressor_result
 
 
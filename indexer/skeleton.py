@@ -0,0 +1,163 @@
+import ast
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+from src.utils.utils import FunctionVisitor
+
+logger = logging.getLogger(__name__)
+
+_skeleton_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_skeleton_pool() -> ProcessPoolExecutor:
+    """Return the process pool parsing Python files, created on first use."""
+    global _skeleton_pool
+    if _skeleton_pool is None:
+        workers = int(os.getenv("SKELETON_WORKERS", os.cpu_count() or 1))
+        _skeleton_pool = ProcessPoolExecutor(max_workers=workers)
+    return _skeleton_pool
+
+
+def _first_paragraph(docstring: Optional[str]) -> str:
+    """Keep the summary paragraph of a docstring, not its Args/Returns sections."""
+    if not docstring:
+        return ""
+    return docstring.strip().split("\n\n", 1)[0].strip()
+
+
+class SkeletonVisitor(FunctionVisitor):
+    """
+    AST visitor collecting the elements of a CodeStructure: module-level functions and
+    classes with their attributes and methods. Descriptions come from the docstrings and
+    are left empty when there is none.
+
+    FunctionVisitor describes each function; this visitor keeps it, but walks the module
+    body itself instead of every FunctionDef, since a CodeStructure separates module-level
+    functions from methods and needs the classes and their attributes.
+    """
+
+    missing_description = ""
+
+    def __init__(self):
+        super().__init__()
+        self.classes: List[dict] = []
+
+    def function_info(self, node) -> Dict[str, str]:
+        info = super().function_info(node)
+        info["function_description"] = _first_paragraph(info["function_description"])
+        return info
+
+    def visit_Module(self, node: ast.Module):
+        for child in node.body:
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                self.functions.append(self.function_info(child))
+            elif isinstance(child, ast.ClassDef):
+                self.classes.append(self._class(child))
+
+    def _class(self, node: ast.ClassDef) -> dict:
+        attributes = {}
+        methods = []
+        for child in node.body:
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                methods.append(self.function_info(child))
+                # Instance attributes assigned in the methods: self.<name> = ...
+                for statement in ast.walk(child):
+                    targets = []
+                    if isinstance(statement, ast.Assign):
+                        targets = statement.targets
+                    elif isinstance(statement, (ast.AnnAssign, ast.AugAssign)):
+                        targets = [statement.target]
+                    for target in targets:
+                        if (
+                            isinstance(target, ast.Attribute)
+                            and isinstance(target.value, ast.Name)
+                            and target.value.id == "self"
+                        ):
+                            attributes.setdefault(target.attr, "")
+            elif isinstance(child, ast.Assign):
+                for target in child.targets:
+                    if isinstance(target, ast.Name):
+                        attributes.setdefault(target.id, "")
+            elif isinstance(child, ast.AnnAssign) and isinstance(child.target, ast.Name):
+                attributes.setdefault(child.target.id, "")
+
+        return {
+            "class_name": node.name,
+            "class_description": _first_paragraph(ast.get_docstring(node)),
+            "attributes": [
+                {"attribute_name": name, "attribute_description": description}
+                for name, description in attributes.items()
+            ],
+            "functions_in_class": methods,
+        }
+
+
+def extract_python_skeleton(file_path: str) -> Optional[dict]:
+    """
+    Extract the CodeStructure of a Python file with ast.
+
+    Args:
+        file_path (str): Path of the Python file
+
+    Returns:
+        Optional[dict]: The skeleton, shaped like a CodeStructure, with empty descriptions
+            where the code has no docstring. None if the file cannot be parsed.
+    """
+    try:
+        with open(file_path, "r", encoding="utf-8") as f:
+            tree = ast.parse(f.read())
+    except (OSError, SyntaxError, ValueError) as e:
+        logger.info(f"No skeleton for {file_path}: {e}")
+        return None
+
+    visitor = SkeletonVisitor()
+    visitor.visit(tree)
+    return {
+        "global_code_description": _first_paragraph(ast.get_docstring(tree)),
+        "functions_out_class": visitor.functions,
+        "classes": visitor.classes,
+    }
+
+
+def iter_skeleton_elements(skeleton: dict):
+    """
+    Yield (key, element, description field) for every element of a skeleton.
+
+    The keys are the ones the LLM is asked to describe, e.g. "method DataStore.load".
+    """
+    yield "module", skeleton, "global_code_description"
+    for function in skeleton["functions_out_class"]:
+        yield f"function {function['function_name']}", function, "function_description"
+    for class_info in skeleton["classes"]:
+        class_name = class_info["class_name"]
+        yield f"class {class_name}", class_info, "class_description"
+        for attribute in class_info["attributes"]:
+            yield f"attribute {class_name}.{attribute['attribute_name']}", attribute, "attribute_description"
+        for method in class_info["functions_in_class"]:
+            yield f"method {class_name}.{method['function_name']}", method, "function_description"
+
+
+def missing_description_keys(skeleton: dict) -> List[str]:
+    """Return the keys of the skeleton elements that have no description yet."""
+    return list(
+        dict.fromkeys(key for key, element, field in iter_skeleton_elements(skeleton) if not element[field])
+    )
+
+
+def fill_descriptions(skeleton: dict, descriptions: Dict[str, str]) -> dict:
+    """
+    Fill the empty descriptions of a skeleton in place.
+
+    Args:
+        skeleton (dict): Skeleton returned by extract_python_skeleton
+        descriptions (Dict[str, str]): Descriptions keyed like missing_description_keys
+
+    Returns:
+        dict: The completed skeleton
+    """
+    for key, element, field in iter_skeleton_elements(skeleton):
+        if not element[field]:
+            element[field] = descriptions.get(key, "")
+    return skeleton
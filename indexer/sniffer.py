@@ -0,0 +1,95 @@
+import math
+import os
+import re
+from collections import Counter
+from typing import Optional
+
+# "off" sends every listed file to the LLM
+DEFAULT_CONTENT_SNIFFER = os.getenv("CONTENT_SNIFFER", "on")
+# Bytes read from the start of a file to judge it
+DEFAULT_SNIFF_SAMPLE_BYTES = int(os.getenv("SNIFF_SAMPLE_BYTES", 8192))
+# Files above this size are data or bundles, whatever their extension
+DEFAULT_SNIFF_MAX_FILE_BYTES = int(os.getenv("SNIFF_MAX_FILE_BYTES", 1024 * 1024))
+
+# Lines longer than this are not written by hand
+LONG_LINE_CHARACTERS = 500
+# Shannon entropy of the bytes, in bits: source code and prose stay under it, base64 goes above
+ENCODED_ENTROPY_BITS = 5.5
+# Lines of the header searched for a generated-file marker
+MARKER_LINES = 10
+GENERATED_MARKERS = re.compile(
+    r"@generated|do not edit|auto-?generated|automatically generated|code generated by"
+    r"|generated by the protocol buffer compiler|this file (?:is|was) generated",
+    re.IGNORECASE,
+)
+
+# Kinds of content that are neither summarized nor part of the index
+SKIPPED_CONTENT_KINDS = ("binary", "encoded")
+# Kinds of content indexed with a placeholder description instead of an LLM summary
+DOWNGRADED_CONTENT_KINDS = ("minified", "generated", "oversized")
+
+
+def _entropy(sample: bytes) -> float:
+    counts = Counter(sample)
+    return -sum(count / len(sample) * math.log2(count / len(sample)) for count in counts.values())
+
+
+def sniff_file(
+    file_path: str,
+    is_code: bool = True,
+    sample_bytes: int = DEFAULT_SNIFF_SAMPLE_BYTES,
+    max_file_bytes: int = DEFAULT_SNIFF_MAX_FILE_BYTES,
+) -> Optional[str]:
+    """
+    Tell from the first few KB of a file whether it is worth an LLM summary.
+
+    Args:
+        file_path (str): Path of the file
+        is_code (bool): Whether the file is code; the generated-file markers only apply to
+            code, since generated docs and configs (changelogs, API references, rendered
+            YAML) are still what a reader wants summarized
+        sample_bytes (int): Bytes read from the start of the file
+        max_file_bytes (int): Size above which a file is oversized
+
+    Returns:
+        Optional[str]: "binary" (NUL bytes or not text), "encoded" (base64 or similar
+        blobs), "minified", "generated" (code marked as such in its header), "oversized",
+        or None for a file written by hand
+    """
+    try:
+        size = os.path.getsize(file_path)
+        with open(file_path, "rb") as f:
+            sample = f.read(sample_bytes)
+    except OSError:
+        return None
+    if not sample:
+        return None
+
+    if b"\x00" in sample:
+        return "binary"
+    text = sample.decode("utf-8", errors="replace")
+    if text.count("�") > 0.1 * len(text):
+        return "binary"
+
+    lines = text.splitlines()
+    if is_code and GENERATED_MARKERS.search("\n".join(lines[:MARKER_LINES])):
+        return "generated"
+
+    if len(lines) > 1 and len(sample) < size:
+        lines = lines[:-1]  # Cut by the sample
+    long_line_characters = sum(len(line) for line in lines if len(line) > LONG_LINE_CHARACTERS)
+    if long_line_characters > 0.5 * sum(len(line) for line in lines):
+        return "encoded" if _entropy(sample) > ENCODED_ENTROPY_BITS else "minified"
+
+    if size > max_file_bytes:
+        return "oversized"
+    return None
+
+
+def placeholder_structure(content_kind: str) -> dict:
+    """Return the CodeStructure indexed for a downgraded file instead of its summary."""
+    return {
+        "global_code_description": f"{content_kind.capitalize()} file, not summarized.",
+        "functions_out_class": [],
+        "classes": [],
+    }
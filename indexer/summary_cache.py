@@ -0,0 +1,188 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Bump when the shape of cached summaries changes in a way the JSON schema does not capture
+SUMMARY_CACHE_FORMAT_VERSION = "1"
+
+DEFAULT_SUMMARY_CACHE_DIR = "summary_cache"
+DEFAULT_SUMMARY_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+
+def build_cache_namespace(*parts: str) -> str:
+    """
+    Build a namespace digest from everything, other than the file content, that influences a summary.
+
+    Args:
+        *parts (str): Prompts, serialized response schema, model names...
+
+    Returns:
+        str: A hex digest identifying the prompt/schema/model version
+    """
+    digest = hashlib.sha256(SUMMARY_CACHE_FORMAT_VERSION.encode())
+    for part in parts:
+        digest.update(b"\x00")
+        digest.update((part or "").encode("utf-8"))
+    return digest.hexdigest()
+
+
+class SummaryCache:
+    """
+    Persistent, content-addressed cache of file summaries.
+
+    Entries are keyed by the hash of the file content and of the namespace
+    (prompt, schema and model version), so identical files are only summarized
+    once whatever repository or path they come from. The cache directory is
+    bounded in size and evicts the least recently used entries first.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: Optional[int] = None):
+        self.cache_dir = Path(cache_dir or os.getenv("SUMMARY_CACHE_DIR", DEFAULT_SUMMARY_CACHE_DIR))
+        self.max_bytes = int(max_bytes or os.getenv("SUMMARY_CACHE_MAX_BYTES", DEFAULT_SUMMARY_CACHE_MAX_BYTES))
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        # key -> (size in bytes, last access time), built lazily from the directory
+        self._index: Optional[Dict[str, list]] = None
+        self._total_bytes = 0
+
+    @staticmethod
+    def make_key(content: str, namespace: str) -> str:
+        """Return the cache key of a file content within a namespace."""
+        digest = hashlib.sha256(namespace.encode())
+        digest.update(b"\x00")
+        digest.update(content.encode("utf-8", errors="surrogateescape"))
+        return digest.hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def _load_index(self):
+        if self._index is not None:
+            return
+        self._index = {}
+        self._total_bytes = 0
+        if not self.cache_dir.exists():
+            return
+        for entry in self.cache_dir.glob("*/*.json"):
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            self._index[entry.stem] = [stat.st_size, stat.st_mtime]
+            self._total_bytes += stat.st_size
+
+    def get(self, key: str) -> Optional[dict]:
+        """
+        Look up a cached summary.
+
+        Args:
+            key (str): Key returned by make_key
+
+        Returns:
+            Optional[dict]: The cached summary, or None on a miss
+        """
+        path = self._entry_path(key)
+        with self._lock:
+            self._load_index()
+            if key not in self._index:
+                self.misses += 1
+                return None
+            try:
+                with open(path, "r") as f:
+                    value = json.load(f)["result"]
+                # Refresh the access time so eviction stays LRU
+                os.utime(path)
+                self._index[key][1] = path.stat().st_mtime
+                self.hits += 1
+                return value
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Dropping unreadable summary cache entry {path}: {e}")
+                self._forget(key)
+                self.misses += 1
+                return None
+
+    def put(self, key: str, value: dict, model_name: str = ""):
+        """
+        Store a summary, evicting old entries if the cache grows over its size limit.
+
+        Args:
+            key (str): Key returned by make_key
+            value (dict): The summary to store
+            model_name (str): Model that produced the summary, kept for debugging
+        """
+        path = self._entry_path(key)
+        payload = json.dumps({"model": model_name, "result": value})
+        with self._lock:
+            self._load_index()
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                # Write then rename so concurrent readers never see a partial entry
+                fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+                with os.fdopen(fd, "w") as f:
+                    f.write(payload)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                logger.warning(f"Failed to write summary cache entry {path}: {e}")
+                return
+            if key in self._index:
+                self._total_bytes -= self._index[key][0]
+            size = len(payload.encode())
+            self._index[key] = [size, path.stat().st_mtime]
+            self._total_bytes += size
+            self.writes += 1
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _forget(self, key: str):
+        size, _ = self._index.pop(key, (0, 0))
+        self._total_bytes -= size
+        try:
+            self._entry_path(key).unlink()
+        except OSError:
+            pass
+
+    def _evict(self):
+        # Evict down to 90% of the limit to avoid evicting on every write
+        target = int(self.max_bytes * 0.9)
+        for key, _ in sorted(self._index.items(), key=lambda item: item[1][1]):
+            if self._total_bytes <= target:
+                break
+            self._forget(key)
+            self.evictions += 1
+
+    def stats(self, since: Optional[dict] = None) -> dict:
+        """
+        Return hit/miss counters and the current size of the cache.
+
+        Args:
+            since (Optional[dict]): Earlier stats() of this cache; the counters are then
+                those of the lookups and writes made since, e.g. by one indexing run
+
+        Returns:
+            dict: Counters, hit rate, entries and size
+        """
+        baseline = since or {}
+        with self._lock:
+            hits = self.hits - baseline.get("hits", 0)
+            misses = self.misses - baseline.get("misses", 0)
+            lookups = hits + misses
+            return {
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "writes": self.writes - baseline.get("writes", 0),
+                "evictions": self.evictions - baseline.get("evictions", 0),
+                "entries": len(self._index or {}),
+                "size_bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
@@ -1,8 +1,13 @@
 import os
 import ast
-from typing import List, Dict
+import re
+import fnmatch
+from dataclasses import dataclass, field
+from typing import List, Dict, Optional, Pattern, Set
 import uuid
 
+from src.utils.utils import EXTENSION_CLASSIFICATIONS
+
 import os
 
 SAFE = [
@@ -12,166 +17,42 @@ SAFE = [
             {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
             {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"},
         ]
-# List of patterns to ignore
-ignore_list = [
-    "pycache",
-    ".gitignore",
-    ".md",
-    ".ipynb",
-    "venv",
-    ".git",
-    ".idea",
-    "node_modules",
-    "build",
-    "dist",
-    "target",
-    ".vscode",
-    ".DS_Store",
-    ".mypy_cache",
-    ".pytest_cache",
-    "__init__.py",  # Corrected from "init.py"
-    ".txt",
-    ".log",
-    ".aux",
-    ".bbl",
-    ".blg",
-    ".fdb_latexmk",
-    ".fls",
-    ".lof",
-    ".lot",
-    ".out",
-    ".toc",
-    ".synctex.gz",
-    ".egg-info",
-    ".coverage",
-    ".pytest_cache",
-    ".ropeproject",
-    ".ipynb_checkpoints",
-    ".env",
-    ".venv",
-    "npm-debug.log",
-    "yarn-error.log",
-    ".pylintrc",
-    ".cache",
-    ".settings",
-    ".classpath",
-    ".project",
-    ".metadata",
-    "tags",
-    "release",
-    "debug",
-    "bin",
-    "obj",
-    ".swp",  # Vim swap files
-    "~",  # Emacs backup files
-    ".swo",  # Vim undo files
-    ".swn",  # Vim swap files (alternative)
-    ".bak",  # Backup files
-    ".tmp",  # Temporary files
-    ".orig",  # Original files (often backups)
-    ".rej",  # Patch rejection files
-    ".lock",  # Lock files (various uses)
-    ".log",  # Log files
-    ".pdf",  # PDF documents
-    ".doc",  # Word documents
-    ".docx",  # Word documents (newer format)
-    ".xls",  # Excel spreadsheets
-    ".xlsx",  # Excel spreadsheets (newer format)
-    ".ppt",  # PowerPoint presentations
-    ".pptx",  # PowerPoint presentations (newer format)
-    ".zip",  # Compressed archives
-    ".tar",  # Tape archives
-    ".gz",  # Gzip compressed files
-    ".rar",  # RAR archives
-    ".7z",  # 7-Zip archives
-    ".dmg",  # macOS disk images
-    ".iso",  # Disk image files
-    ".exe",  # Executable files (Windows)
-    ".dll",  # Dynamic link libraries (Windows)
-    ".app",  # macOS application bundles
-    ".pkg",  # macOS installer packages
-    ".db",  # Database files (various types)
-    ".sqlite",  # SQLite database files
-    ".csv",  # Comma-separated value files
-    ".json",  # JSON data files
-    ".xml",  # XML data files
-    ".yaml",  # YAML data files
-    ".yml",  # YAML data files (alternative extension)
-    ".cfg",  # Configuration files
-    ".conf",  # Configuration files (alternative extension)
-    ".ini",  # Initialization files
-    ".pem",  # Privacy-enhanced mail files (often keys)
-    ".crt",  # Certificate files
-    ".key",  # Key files
-    ".pfx",  # Personal Information Exchange files
-    ".jks",  # Java KeyStore files
-    ".dat",  # Data files (generic)
-    ".bin",  # Binary files (generic)
-    ".dump",  # Database or memory dumps
-    ".sql",  # SQL scripts
-    ".bak",  # Backup files (various types)
-    ".old",  # Old versions of files
-    ".draft",  # Draft documents
-    ".media",  # Media files (generic)
-    ".assets",  # Assets files (generic)
-    ".resources",  # Resource files (generic)
-    ".snap",  # Snapshots (various uses)
-    ".image",  # Image files (generic)
-    ".backup",  # Backup files (explicit)
-    ".temp",  # Temporary files (alternative)
-    ".download",  # Downloaded files (incomplete)
-    ".part",  # Partially downloaded files
-    ".crdownload",  # Chrome download files (incomplete)
-    ".unconfirmed",  # Unconfirmed download files
-    ".incomplete",  # Incomplete files
-    ".journal",  # Journal files (various uses)
-    ".fuse_hidden",  # Hidden files related to FUSE mounts
-    ".png",
-    ".jpg",
-    ".jpeg",
-    ".gif",
-    ".bmp",
-    ".tiff",
-    ".svg",
-    ".mp3",
-    ".wav",
-    ".srt",
-    ".flac",
-    ".aac",
-    ".ogg",
-    ".wma",
-    ".mp4",
-    ".avi",
-    ".mkv",
-    ".mov",
-    ".wmv",
-    ".flv",
-    ".m4v",
-    ".webm",
-    ".m2ts",
-    ".mts",
-    ".3gp",
-    ".m4a",
-    ".aif",
-    ".aiff",
-    ".raw",
-    ".psd",
-    ".ai",
-    ".eps",
-    ".indd",
-    ".blend",
-    ".max",
-    ".ma",
-    ".mb",
-    ".3ds",
-    ".obj",
-    ".fbx",
-    ".dae",
-    ".stl",
-    ".wrl",
-    ".x3d",
-    ".ttf",
-]
+# Names of files and directories that are never listed; ignored directories are not walked into
+DEFAULT_IGNORED_NAMES = frozenset({
+    ".git", ".idea", ".vscode", "node_modules", "venv", ".venv", "env_arxflix", "__pycache__",
+    ".mypy_cache", ".pytest_cache", ".ipynb_checkpoints", ".ropeproject", ".cache", ".settings",
+    ".metadata", "build", "dist", "target", "release", "debug", "bin", "obj", "tags",
+    ".DS_Store", ".gitignore", ".env", ".coverage", ".pylintrc", ".classpath", ".project",
+    "__init__.py", "npm-debug.log", "yarn-error.log",
+})
+
+# File suffixes that are never listed
+DEFAULT_IGNORED_EXTENSIONS = frozenset({
+    # Documents, data and notebooks
+    ".md", ".txt", ".pdf", ".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx", ".csv", ".json",
+    ".xml", ".yaml", ".yml", ".cfg", ".conf", ".ini", ".env", ".ipynb", ".sql", ".db", ".sqlite",
+    ".dat", ".dump", ".log", ".lock", ".journal",
+    # LaTeX build products
+    ".aux", ".bbl", ".blg", ".fdb_latexmk", ".fls", ".lof", ".lot", ".out", ".toc", ".synctex.gz",
+    # Backups, temporary and partial files
+    "~", ".swp", ".swo", ".swn", ".bak", ".backup", ".tmp", ".temp", ".orig", ".rej", ".old",
+    ".draft", ".download", ".part", ".crdownload", ".unconfirmed", ".incomplete", ".snap",
+    # Archives, binaries and keys
+    ".zip", ".tar", ".gz", ".rar", ".7z", ".dmg", ".iso", ".exe", ".dll", ".app", ".pkg", ".bin",
+    ".pem", ".crt", ".key", ".pfx", ".jks",
+    # Media and 3D assets
+    ".media", ".assets", ".resources", ".image", ".png", ".jpg", ".jpeg", ".gif", ".bmp", ".tiff",
+    ".svg", ".mp3", ".wav", ".srt", ".flac", ".aac", ".ogg", ".wma", ".mp4", ".avi", ".mkv",
+    ".mov", ".wmv", ".flv", ".m4v", ".webm", ".m2ts", ".mts", ".3gp", ".m4a", ".aif", ".aiff",
+    ".raw", ".psd", ".ai", ".eps", ".indd", ".blend", ".max", ".ma", ".mb", ".3ds", ".obj", ".fbx",
+    ".dae", ".stl", ".wrl", ".x3d", ".ttf",
+})
+
+# Glob patterns matched against the names of files and directories
+DEFAULT_IGNORED_GLOBS = ("*.egg-info", "*pycache*", ".fuse_hidden*")
+
+# Documentation and configuration files, listed when include_md is True
+MARKDOWN_AND_YAML_EXTENSIONS = frozenset({".md", ".yaml", ".yml"})
 
 
 def has_file_extension(filename):
@@ -187,35 +68,269 @@ def has_file_extension(filename):
     return "." in filename and filename.rsplit(".", 1)[1].strip() != ""
 
 
-def should_process_file(filepath):
+@dataclass
+class FileFilterConfig:
     """
-    Determine if a file should be processed based on ignore list and extension presence.
+    Per-request rules deciding which files of a repository are listed.
+
+    Globs without a "/" are matched against names, the others against paths relative
+    to the listed folder.
+    """
+
+    ignored_names: Set[str] = field(default_factory=lambda: set(DEFAULT_IGNORED_NAMES))
+    ignored_extensions: Set[str] = field(default_factory=lambda: set(DEFAULT_IGNORED_EXTENSIONS))
+    ignored_globs: List[str] = field(default_factory=lambda: list(DEFAULT_IGNORED_GLOBS))
+    respect_gitignore: bool = False
+
+    @classmethod
+    def for_request(
+        cls,
+        include_md: bool = True,
+        ignore_patterns: Optional[List[str]] = None,
+        respect_gitignore: bool = False,
+    ) -> "FileFilterConfig":
+        """
+        Build the rules of one listing.
+
+        Args:
+            include_md (bool): List markdown and YAML files
+            ignore_patterns (Optional[List[str]]): Extra glob patterns to ignore
+            respect_gitignore (bool): Also ignore what the .gitignore files of the folder ignore
+
+        Returns:
+            FileFilterConfig: The rules
+        """
+        config = cls(respect_gitignore=respect_gitignore)
+        if include_md:
+            config.ignored_extensions -= MARKDOWN_AND_YAML_EXTENSIONS
+        config.ignored_globs.extend(ignore_patterns or [])
+        return config
+
+
+def _gitignore_regex(pattern: str) -> Pattern:
+    """Translate a .gitignore pattern (without its "!" and trailing "/") into a regex on relative paths."""
+    anchored = "/" in pattern
+    pattern = pattern.lstrip("/")
+    regex = ""
+    position = 0
+    while position < len(pattern):
+        if pattern.startswith("**/", position):
+            regex += "(?:.*/)?"
+            position += 3
+        elif pattern.startswith("**", position):
+            regex += ".*"
+            position += 2
+        elif pattern[position] == "*":
+            regex += "[^/]*"
+            position += 1
+        elif pattern[position] == "?":
+            regex += "[^/]"
+            position += 1
+        elif pattern[position] == "[" and "]" in pattern[position + 1:]:
+            closing = pattern.index("]", position + 1)
+            regex += "[" + pattern[position + 1:closing].replace("!", "^", 1) + "]"
+            position = closing + 1
+        else:
+            regex += re.escape(pattern[position])
+            position += 1
+    # Patterns without a "/" match at any depth, the others relative to their .gitignore
+    return re.compile(("" if anchored else "(?:.*/)?") + regex + "$")
+
+
+class GitignoreRules:
+    """The patterns of one .gitignore file."""
+
+    def __init__(self, base: str, lines: List[str]):
+        self.base = base  # Directory of the .gitignore, relative to the listed folder ("" for its root)
+        self.patterns = []  # (regex, negated, directory_only)
+        for line in lines:
+            line = line.rstrip()
+            if not line or line.startswith("#"):
+                continue
+            negated = line.startswith("!")
+            if negated:
+                line = line[1:]
+            directory_only = line.endswith("/")
+            line = line.rstrip("/")
+            if line:
+                self.patterns.append((_gitignore_regex(line), negated, directory_only))
+
+    @classmethod
+    def load(cls, gitignore_path: str, base: str) -> Optional["GitignoreRules"]:
+        """Load a .gitignore file, returning None if it is missing or has no pattern."""
+        try:
+            with open(gitignore_path, "r", errors="ignore") as f:
+                rules = cls(base, f.readlines())
+        except OSError:
+            return None
+        return rules if rules.patterns else None
+
+    def match(self, relative_path: str, is_dir: bool) -> Optional[bool]:
+        """Return True if the path is ignored, False if it is re-included, None if no pattern applies."""
+        if self.base:
+            if not relative_path.startswith(self.base + "/"):
+                return None
+            relative_path = relative_path[len(self.base) + 1:]
+        result = None
+        for regex, negated, directory_only in self.patterns:
+            if directory_only and not is_dir:
+                continue
+            if regex.match(relative_path):
+                result = not negated
+        return result
+
+
+def _gitignored(rules: List[GitignoreRules], relative_path: str, is_dir: bool) -> bool:
+    ignored = False
+    for rule in rules:  # From the root down, so deeper .gitignore files win
+        result = rule.match(relative_path, is_dir)
+        if result is not None:
+            ignored = result
+    return ignored
+
+
+class FileFilter:
+    """
+    Precompiled matchers of a FileFilterConfig: a set of names, a tuple of suffixes for
+    str.endswith and one regex for all the name globs and one for all the path globs.
+    """
+
+    def __init__(self, config: FileFilterConfig):
+        self.config = config
+        self.names = frozenset(config.ignored_names)
+        self.extensions = tuple(sorted(config.ignored_extensions))
+        name_globs = [glob for glob in config.ignored_globs if "/" not in glob]
+        path_globs = [glob.strip("/") for glob in config.ignored_globs if "/" in glob]
+        self.name_regex = re.compile("|".join(fnmatch.translate(glob) for glob in name_globs)) if name_globs else None
+        self.path_regex = re.compile("|".join(fnmatch.translate(glob) for glob in path_globs)) if path_globs else None
+
+    def _matches(self, name: str, relative_path: str) -> bool:
+        return (
+            name in self.names
+            or (self.name_regex is not None and self.name_regex.match(name) is not None)
+            or (self.path_regex is not None and self.path_regex.match(relative_path) is not None)
+        )
+
+    def ignores_directory(self, name: str, relative_path: str) -> bool:
+        return self._matches(name, relative_path)
+
+    def ignores_file(self, name: str, relative_path: str) -> bool:
+        return (
+            not has_file_extension(name)
+            or name.endswith(self.extensions)
+            or self._matches(name, relative_path)
+        )
+
+
+def walk_files(folder_path: str, config: FileFilterConfig):
+    """
+    Yield the full path of every listed file under folder_path, in os.walk order.
+
+    Ignored directories are pruned during the walk, so their content is never visited.
 
     Args:
-        filepath (str): Full path of the file to check
+        folder_path (str): Folder to list
+        config (FileFilterConfig): Rules of the listing
+    """
+    file_filter = FileFilter(config)
+    inherited_rules = {}  # directory full path -> .gitignore rules of its parents
+    for dirpath, dirnames, filenames in os.walk(folder_path):
+        relative_dir = os.path.relpath(dirpath, folder_path)
+        relative_dir = "" if relative_dir == "." else relative_dir.replace(os.sep, "/")
+        rules = inherited_rules.pop(dirpath, [])
+        if config.respect_gitignore and ".gitignore" in filenames:
+            own_rules = GitignoreRules.load(os.path.join(dirpath, ".gitignore"), relative_dir)
+            if own_rules:
+                rules = rules + [own_rules]
 
-    Returns:
-        bool: True if the file should be processed, False otherwise
+        kept_dirnames = []
+        for dirname in dirnames:
+            relative_path = f"{relative_dir}/{dirname}" if relative_dir else dirname
+            if file_filter.ignores_directory(dirname, relative_path):
+                continue
+            if rules and _gitignored(rules, relative_path, True):
+                continue
+            kept_dirnames.append(dirname)
+            inherited_rules[os.path.join(dirpath, dirname)] = rules
+        dirnames[:] = kept_dirnames
+
+        for filename in filenames:
+            relative_path = f"{relative_dir}/{filename}" if relative_dir else filename
+            if file_filter.ignores_file(filename, relative_path):
+                continue
+            if rules and _gitignored(rules, relative_path, False):
+                continue
+            yield os.path.join(dirpath, filename)
+
+
+def is_listed(folder_path: str, relative_path: str, config: FileFilterConfig, file_filter: FileFilter = None) -> bool:
     """
-    filename = os.path.basename(filepath)
+    Tell whether walk_files would list a path, without walking the folder.
 
-    # Check if file matches any pattern in ignore list
-    if any(forbidden in filepath for forbidden in ignore_list):
-        return False
+    Args:
+        folder_path (str): Folder being listed
+        relative_path (str): Path of the file, relative to folder_path
+        config (FileFilterConfig): Rules of the listing
+        file_filter (FileFilter): Matchers compiled from config, to reuse across calls
 
-    # Check if file has an extension
-    if not has_file_extension(filename):
+    Returns:
+        bool: True if the file exists and is not ignored
+    """
+    file_filter = file_filter or FileFilter(config)
+    parts = [part for part in relative_path.replace(os.sep, "/").split("/") if part not in ("", ".")]
+    if not parts or not os.path.isfile(os.path.join(folder_path, *parts)):
         return False
 
+    rules = []
+    for depth, name in enumerate(parts):
+        partial_path = "/".join(parts[: depth + 1])
+        is_dir = depth < len(parts) - 1
+        if config.respect_gitignore:
+            own_rules = GitignoreRules.load(
+                os.path.join(folder_path, *parts[:depth], ".gitignore"), "/".join(parts[:depth])
+            )
+            if own_rules:
+                rules.append(own_rules)
+        if is_dir and file_filter.ignores_directory(name, partial_path):
+            return False
+        if not is_dir and file_filter.ignores_file(name, partial_path):
+            return False
+        if rules and _gitignored(rules, partial_path, is_dir):
+            return False
     return True
 
 
-def list_all_files(folder_path: str, include_md: bool) -> Dict[str, List[str]]:
+def classify_file_locally(file_name: str) -> Optional[str]:
+    """
+    Classify a file from its extension when the extension is unambiguous.
+
+    Args:
+        file_name (str): Name of the file
+
+    Returns:
+        Optional[str]: The classification label, or None if the LLM has to decide
+    """
+    _, extension = os.path.splitext(file_name.lower())
+    # Same table as classify_file, which labels the unlisted extensions "other"
+    return EXTENSION_CLASSIFICATIONS.get(extension)
+
+
+def list_all_files(
+    folder_path: str,
+    include_md: bool,
+    only_files: Optional[List[str]] = None,
+    config: Optional[FileFilterConfig] = None,
+) -> Dict[str, List[str]]:
     """
     Lists all valid files in the given folder and its subdirectories.
 
     Args:
         folder_path (str): Path to the folder to be analyzed.
+        include_md (bool): List markdown and YAML files, when no config is given.
+        only_files (Optional[List[str]]): Restrict the listing to these paths, relative to
+            folder_path, instead of walking the whole folder (incremental re-index).
+        config (Optional[FileFilterConfig]): Rules of the listing, defaults to
+            FileFilterConfig.for_request(include_md).
 
     Returns:
         dict: A dictionary containing two lists:
@@ -229,29 +344,28 @@ def list_all_files(folder_path: str, include_md: bool) -> Dict[str, List[str]]:
     if not os.path.exists(folder_path):
         raise FileNotFoundError(f"The path {folder_path} does not exist")
 
+    config = config or FileFilterConfig.for_request(include_md)
+
     # Initialize lists to store file paths and names
     all_files_with_path = []
     all_files_no_path = []
 
-    # Remove .md from ignore list if include_md is True
-    if include_md:
-        if ".md" in ignore_list:
-            ignore_list.remove(".md")
-        if ".yaml" in ignore_list:
-            ignore_list.remove(".yaml")
-        if ".yml" in ignore_list:
-            ignore_list.remove(".yml")
+    if only_files is not None:
+        file_filter = FileFilter(config)
+        candidates = (
+            os.path.join(folder_path, relative_path)
+            for relative_path in dict.fromkeys(only_files)
+            if is_listed(folder_path, relative_path, config, file_filter)
+        )
+    else:
+        candidates = walk_files(folder_path, config)
 
     try:
-        for root, _, files in os.walk(folder_path):
-            for file in files:
-                full_path = os.path.join(root, file)
-
-                if should_process_file(full_path) and "env_arxflix" not in full_path:
-                    all_files_with_path.append(full_path)
-                    all_files_no_path.append(
-                        {"file_name": file, "file_id": len(all_files_with_path) - 1}
-                    )
+        for full_path in candidates:
+            all_files_with_path.append(full_path)
+            all_files_no_path.append(
+                {"file_name": os.path.basename(full_path), "file_id": len(all_files_with_path) - 1}
+            )
 
         return {
             "all_files_with_path": all_files_with_path,
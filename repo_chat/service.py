@@ -8,19 +8,18 @@ from src.schemas.doc_retriver import GoalRewriteModel,get_necesary_files
 from .utils import SAFE,get_gemini_pro_25_response,get_claude_response
 from src.monitor.langfuse import get_langfuse_context,trace,generate_trace_id
 from src.schemas.description import TemplateManager
+from src.core.llm_clients import llm_client_pool
+from src.core.doc_serializer import serialize_documentation
 import instructor
 import os
 import dotenv
 import traceback
 import json
 import instructor
-from google.generativeai import caching
-import google.generativeai as genai
 from pathlib import Path
 import logging
 import traceback
-from openai import OpenAI
-from anthropic import Anthropic, Timeout
+from anthropic import Timeout
 
 logger = logging.getLogger(__name__)
 
@@ -131,19 +130,8 @@ class Querry_Rewritter_Node(ClassifierConfig):
         # Configure safety settings
         safe = SAFE
 
-        # Configure Gemini with API key from request if provided
-        if GEMINI_API_KEY:
-            genai.configure(api_key=GEMINI_API_KEY)
-        else:
-            # Use default API key from environment
-            genai.configure()
-            
-        client_gemini = instructor.from_gemini(
-            client=genai.GenerativeModel(
-                model_name=self.querry_rewriting_model, safety_settings=safe
-            ),
-            mode=instructor.Mode.GEMINI_JSON,
-        )
+        # Pooled client scoped to the API key of the request (the environment's if empty)
+        client_gemini = llm_client_pool.gemini_instructor(GEMINI_API_KEY, self.querry_rewriting_model, safe)
 
         rewrite = self.process_batch(client_gemini, symstem_prompt, user_prompt, span)
 
@@ -185,7 +173,7 @@ class Documentation_Context_Retriver_Node(ClassifierConfig):
         for index, doc in enumerate(documentation):
             doc["file_id"] = index
 
-        user_prompt = user_prompt.replace("FILES_HERE", str(documentation))
+        user_prompt = user_prompt.replace("FILES_HERE", serialize_documentation({"documentation": documentation})[0])
 
         if len(documentation) == 0:
             return {"files_list": []}
@@ -198,18 +186,9 @@ class Documentation_Context_Retriver_Node(ClassifierConfig):
             {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"},
         ]
 
-        # Configure Gemini with API key from request if provided
-        if GEMINI_API_KEY:
-            genai.configure(api_key=GEMINI_API_KEY)
-        else:
-            # Use default API key from environment
-            genai.configure()
-            
-        client_gemini = instructor.from_gemini(
-            client=genai.GenerativeModel(
-                model_name=self.documentation_context_retriver_model, safety_settings=safe
-            ),
-            mode=instructor.Mode.GEMINI_JSON,
+        # Pooled client scoped to the API key of the request (the environment's if empty)
+        client_gemini = llm_client_pool.gemini_instructor(
+            GEMINI_API_KEY, self.documentation_context_retriver_model, safe
         )
 
         # Process batches in parallel
@@ -357,22 +336,8 @@ class Context_Caching_Retriver_Node(ClassifierConfig):
             {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"},
         ]
 
-        # Configure Gemini with API key from request if provided
-        if GEMINI_API_KEY:
-            genai.configure(api_key=GEMINI_API_KEY)
-        else:
-            # Use default API key from environment
-            genai.configure()
-
-        # getting the cached client
-        cache = caching.CachedContent.get(cache_id)
-
-        client_gemini = instructor.from_gemini(
-            client=genai.GenerativeModel.from_cached_content(
-                cached_content=cache, safety_settings=safe
-            ),
-            mode=instructor.Mode.GEMINI_JSON,
-        )
+        # getting the cached client, scoped to the API key of the request
+        client_gemini = llm_client_pool.gemini_cached_instructor(GEMINI_API_KEY, cache_id, safe)
 
         list_of_files = self.process_batch(
             client_gemini, symstem_prompt, user_prompt, span, documentation, cache_id
@@ -408,13 +373,6 @@ class Final_Response_Generator_Node(ClassifierConfig):
         # Configure safety settings
         safe = SAFE
 
-        # Configure Gemini with API key from request if provided
-        if GEMINI_API_KEY:
-            genai.configure(api_key=GEMINI_API_KEY)
-        else:
-            # Use default API key from environment
-            genai.configure()
-
         # Configure Anthropic client with API key from request if provided
         repository_set = set()
         # Get file names from the documentation : files_list_md_config
@@ -500,7 +458,7 @@ class Final_Response_Generator_Node(ClassifierConfig):
                 if not openai_api_key:
                     raise ValueError(f"OpenAI API key is required for model '{effective_model_name}'. Please configure your OpenAI API key in the settings.")
                 
-                openai_client = OpenAI(api_key=openai_api_key)
+                openai_client = llm_client_pool.openai(openai_api_key)
                 
                 # Handle different OpenAI model types
                 if effective_model_name.lower().startswith("o"):
@@ -553,8 +511,8 @@ class Final_Response_Generator_Node(ClassifierConfig):
                 if not anthropic_api_key:
                     raise ValueError(f"Anthropic API key is required for model '{effective_model_name}'. Please configure your Anthropic API key in the settings.")
                 
-                anthropic_client = Anthropic(
-                    api_key=anthropic_api_key,
+                anthropic_client = llm_client_pool.anthropic(
+                    anthropic_api_key,
                     timeout=Timeout(60.0 * 30, connect=5.0)  # 30 minutes timeout
                 )
                 
@@ -584,14 +542,10 @@ class Final_Response_Generator_Node(ClassifierConfig):
             elif sdk_type == "gemini":
                 logger.info(f"Using Gemini SDK with model: {effective_model_name}")
                 
-                # Configure Gemini with API key if provided
-                if GEMINI_API_KEY:
-                    genai.configure(api_key=GEMINI_API_KEY)
-                else:
-                    genai.configure()
-                
-                final_answer_generator = genai.GenerativeModel(
-                    model_name=effective_model_name,
+                # Pooled model scoped to the API key of the request (the environment's if empty)
+                final_answer_generator = llm_client_pool.gemini_model(
+                    GEMINI_API_KEY,
+                    effective_model_name,
                     safety_settings=safe,
                     generation_config={"temperature": 0, "top_p": 1, "max_output_tokens": 60000},
                 )
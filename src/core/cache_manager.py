@@ -0,0 +1,280 @@
+import datetime
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+import google.api_core.exceptions as exceptions
+from google.ai import generativelanguage as glm
+from google.protobuf import field_mask_pb2
+
+from src.core.cache_registry import cache_registry
+from src.core.llm_clients import llm_client_pool
+
+logger = logging.getLogger(__name__)
+
+# TTL given to context caches on creation and on every extension
+DEFAULT_CONTEXT_CACHE_TTL_SECONDS = float(os.getenv("CONTEXT_CACHE_TTL_SECONDS", 1800))
+# A cache in use is extended once it has less than this left
+DEFAULT_CACHE_RENEW_MARGIN_SECONDS = float(os.getenv("CACHE_RENEW_MARGIN_SECONDS", 300))
+# A repository not queried for this long is idle: its cache is no longer extended and lapses
+DEFAULT_CACHE_IDLE_SECONDS = float(os.getenv("CACHE_IDLE_SECONDS", 2 * 3600))
+DEFAULT_CACHE_MANAGER_INTERVAL = float(os.getenv("CACHE_MANAGER_INTERVAL", 30))
+# A query waits at most this long for the cache of its repository to be recreated
+DEFAULT_CACHE_RECREATE_WAIT_SECONDS = float(os.getenv("CACHE_RECREATE_WAIT_SECONDS", 60))
+
+
+def extend_cache_ttl(cache_name: str, api_key: str = "", ttl: float = DEFAULT_CONTEXT_CACHE_TTL_SECONDS) -> Optional[float]:
+    """
+    Give a context cache `ttl` more seconds to live from now.
+
+    Args:
+        cache_name (str): Name of the cache
+        api_key (str): Gemini API key owning the cache
+        ttl (float): New time to live, in seconds
+
+    Returns:
+        Optional[float]: New expiration timestamp, None if the cache no longer exists
+    """
+    request = glm.UpdateCachedContentRequest(
+        cached_content=glm.CachedContent(name=cache_name, ttl=datetime.timedelta(seconds=ttl)),
+        update_mask=field_mask_pb2.FieldMask(paths=["ttl"]),
+    )
+    try:
+        cache = llm_client_pool.gemini_cache_client(api_key or "").update_cached_content(request)
+    except exceptions.NotFound:
+        cache_registry.forget(cache_name)
+        return None
+    expire_time = cache.expire_time.timestamp()
+    cache_registry.update_expiry(cache_name, expire_time)
+    return expire_time
+
+
+@dataclass
+class ManagedCache:
+    """Context cache of one repository and what the manager knows about it."""
+
+    repo_name: str
+    cache_name: str
+    api_key: str
+    recreate: Callable[[], str]  # Creates a new cache of the repository, returns its name
+    source_path: Optional[Path] = None  # Index the cache is built from; a newer one triggers a rebuild
+    created_at: float = field(default_factory=time.time)
+    expire_time: Optional[float] = None  # Unknown until looked up
+    last_used: float = field(default_factory=time.time)
+    lapsed: bool = False
+    ready: threading.Event = field(default_factory=threading.Event)  # Cleared while it is recreated
+
+    def __post_init__(self):
+        self.ready.set()
+
+
+class CacheLifecycleManager:
+    """
+    Keeps the Gemini context caches of the active repositories alive in the background.
+
+    Every `interval` seconds each registered cache is checked:
+    - a repository queried within `idle_seconds` is in use: its cache is extended by
+      `ttl` when less than `renew_margin` is left, and recreated right away if it is
+      gone or if the index it was built from has been rewritten since;
+    - an idle repository's cache is left to lapse; it is recreated on the next query.
+
+    Queries only read the current cache name, so they never create a cache themselves
+    unless their repository was idle long enough for its cache to lapse.
+    """
+
+    def __init__(
+        self,
+        ttl: float = DEFAULT_CONTEXT_CACHE_TTL_SECONDS,
+        renew_margin: float = DEFAULT_CACHE_RENEW_MARGIN_SECONDS,
+        idle_seconds: float = DEFAULT_CACHE_IDLE_SECONDS,
+        interval: float = DEFAULT_CACHE_MANAGER_INTERVAL,
+    ):
+        self.ttl = ttl
+        self.renew_margin = renew_margin
+        self.idle_seconds = idle_seconds
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._caches: Dict[str, ManagedCache] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.extensions = 0
+        self.recreations = 0
+
+    def register(
+        self,
+        repo_name: str,
+        cache_name: str,
+        api_key: str,
+        recreate: Callable[[], str],
+        source_path: Optional[Path] = None,
+    ):
+        """
+        Start managing the cache of a repository, replacing any previous one.
+
+        Args:
+            repo_name (str): Name of the repository
+            cache_name (str): Name of its current context cache
+            api_key (str): Gemini API key owning the cache
+            recreate (Callable[[], str]): Creates a new cache of the repository and returns its name
+            source_path (Optional[Path]): Docstrings JSON the cache is built from
+        """
+        managed = ManagedCache(repo_name, cache_name, api_key, recreate, source_path)
+        # Known from the registry for the caches created here, looked up otherwise
+        record = cache_registry.get(cache_name)
+        if record is not None:
+            managed.expire_time = record.expire_time
+        with self._lock:
+            self._caches[repo_name] = managed
+
+    def unregister(self, repo_name: str):
+        with self._lock:
+            self._caches.pop(repo_name, None)
+
+    def touch(self, repo_name: str, timeout: float = DEFAULT_CACHE_RECREATE_WAIT_SECONDS) -> Optional[str]:
+        """
+        Mark a repository as queried and return the name of its cache.
+
+        Only a cache that lapsed while its repository was idle is recreated before
+        returning; otherwise the current name is returned at once. A recreation taking
+        longer than `timeout` is left to finish in the background and the current name
+        is returned.
+
+        Args:
+            repo_name (str): Name of the repository
+            timeout (float): Seconds to wait for a recreation in progress
+
+        Returns:
+            Optional[str]: Name of the cache, None if the repository is not managed
+        """
+        with self._lock:
+            managed = self._caches.get(repo_name)
+            if managed is None:
+                return None
+            managed.last_used = time.time()
+            lapsed = managed.lapsed
+        if lapsed:
+            self._recreate_in_background(managed)
+        if not managed.ready.wait(timeout):
+            logger.warning(f"Cache of {repo_name} still being recreated after {timeout:.0f}s, using {managed.cache_name}")
+        return managed.cache_name
+
+    def start(self):
+        """Start the background thread, once."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="context-cache-manager", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.run_once()
+
+    def run_once(self):
+        """Check every registered cache once."""
+        with self._lock:
+            caches = list(self._caches.values())
+        for managed in caches:
+            try:
+                self._maintain(managed)
+            except Exception as e:
+                logger.warning(f"Could not maintain the cache of {managed.repo_name}: {e}")
+
+    def _maintain(self, managed: ManagedCache):
+        if not managed.ready.is_set():
+            return  # Being recreated
+        now = time.time()
+        in_use = now - managed.last_used < self.idle_seconds
+
+        if managed.expire_time is None or managed.expire_time <= now:
+            managed.expire_time = self._lookup_expire_time(managed)
+        if managed.expire_time is None or managed.expire_time <= now:
+            if not managed.lapsed:
+                logger.info(f"Cache of {managed.repo_name} has expired")
+            managed.lapsed = True
+            if in_use:
+                self._recreate_in_background(managed)
+            return
+        if not in_use:
+            return
+
+        if self._source_changed(managed):
+            logger.info(f"Index of {managed.repo_name} changed since its cache was created, rebuilding it")
+            self._recreate_in_background(managed)
+        elif managed.expire_time - now < self.renew_margin:
+            self._extend(managed)
+
+    def _lookup_expire_time(self, managed: ManagedCache) -> Optional[float]:
+        """Expiration of the cache as reported by the API, None if it no longer exists."""
+        try:
+            cache = llm_client_pool.gemini_cache_client(managed.api_key).get_cached_content(name=managed.cache_name)
+        except exceptions.NotFound:
+            cache_registry.forget(managed.cache_name)
+            return None
+        cache_registry.update_expiry(managed.cache_name, cache.expire_time.timestamp())
+        return cache.expire_time.timestamp()
+
+    def _source_changed(self, managed: ManagedCache) -> bool:
+        try:
+            return managed.source_path is not None and managed.source_path.stat().st_mtime > managed.created_at
+        except OSError:
+            return False
+
+    def _extend(self, managed: ManagedCache):
+        expire_time = extend_cache_ttl(managed.cache_name, managed.api_key, self.ttl)
+        if expire_time is None:
+            managed.lapsed = True
+            self._recreate_in_background(managed)
+            return
+        managed.expire_time = expire_time
+        self.extensions += 1
+        logger.info(f"Extended the cache of {managed.repo_name} by {self.ttl:.0f}s")
+
+    def _recreate_in_background(self, managed: ManagedCache):
+        with self._lock:
+            if not managed.ready.is_set():
+                return
+            managed.ready.clear()
+        threading.Thread(target=self._recreate, args=(managed,), name=f"recreate-cache-{managed.repo_name}", daemon=True).start()
+
+    def _recreate(self, managed: ManagedCache):
+        started = time.time()
+        try:
+            managed.cache_name = managed.recreate()
+            managed.created_at = started
+            managed.expire_time = started + self.ttl
+            managed.lapsed = False
+            self.recreations += 1
+            logger.info(f"Recreated the cache of {managed.repo_name}: {managed.cache_name} in {time.time() - started:.1f}s")
+        except Exception as e:
+            logger.error(f"Could not recreate the cache of {managed.repo_name}: {e}")
+        finally:
+            managed.ready.set()
+
+    def snapshot(self) -> dict:
+        now = time.time()
+        with self._lock:
+            return {
+                "extensions": self.extensions,
+                "recreations": self.recreations,
+                "caches": {
+                    repo_name: {
+                        "cache_name": managed.cache_name,
+                        "expires_in": round(managed.expire_time - now, 1) if managed.expire_time else None,
+                        "idle_for": round(now - managed.last_used, 1),
+                        "lapsed": managed.lapsed,
+                        "recreating": not managed.ready.is_set(),
+                    }
+                    for repo_name, managed in self._caches.items()
+                },
+            }
+
+
+cache_manager = CacheLifecycleManager()
@@ -0,0 +1,234 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+REGISTRY_VERSION = 1
+DEFAULT_CACHE_REGISTRY_PATH = os.getenv("CACHE_REGISTRY_PATH", "/app/caches_json/registry.json")
+# The caches of each API key are compared with what the API lists for it at most this often
+DEFAULT_RECONCILE_SECONDS = float(os.getenv("CACHE_REGISTRY_RECONCILE_SECONDS", 3600))
+# Owner filter matching the caches of every API key
+ALL_OWNERS = object()
+# Display names are <repo>_<timestamp>_<hash prefix>, or just <repo> for older caches
+_DISPLAY_NAME_PATTERN = re.compile(r"^(?P<repo>.+)_\d+_[0-9a-f]{8}$")
+
+
+def payload_hash(documentation: str, system_prompt: str, model: str = "") -> str:
+    """Return the SHA-256 identifying the content of a cache: two caches with the same one are interchangeable."""
+    digest = hashlib.sha256()
+    digest.update((model or "").encode())
+    digest.update(b"\0")
+    digest.update(system_prompt.encode())
+    digest.update(b"\0")
+    digest.update(documentation.encode())
+    return digest.hexdigest()
+
+
+def key_fingerprint(api_key: Optional[str]) -> Optional[str]:
+    """Identify the API key, hence the project, a cache belongs to without storing the key."""
+    return hashlib.sha256(api_key.encode()).hexdigest()[:16] if api_key else None
+
+
+def repo_of_display_name(display_name: str) -> str:
+    match = _DISPLAY_NAME_PATTERN.match(display_name or "")
+    return match.group("repo") if match else display_name
+
+
+@dataclass
+class CacheRecord:
+    """A context cache created by this deployment, as last known locally."""
+
+    name: str
+    repo_name: str
+    display_name: str
+    content_hash: Optional[str] = None
+    version: Optional[str] = None  # Version directory of the repository the cache was built from
+    expire_time: Optional[float] = None
+    token_count: Optional[int] = None
+    created_at: float = field(default_factory=time.time)
+    owner: Optional[str] = None  # key_fingerprint of the API key that created it
+    last_reused: Optional[float] = None
+
+    def is_live(self, now: Optional[float] = None) -> bool:
+        return self.expire_time is None or self.expire_time > (now or time.time())
+
+
+def _timestamp(value) -> Optional[float]:
+    return value.timestamp() if hasattr(value, "timestamp") else None
+
+
+def record_from_cache(cache, repo_name: Optional[str] = None, **attrs) -> CacheRecord:
+    """
+    Build a record from a CachedContent returned by the API.
+
+    Args:
+        cache: caching.CachedContent or glm.CachedContent
+        repo_name: Repository of the cache, parsed from its display name if omitted
+        **attrs: Other CacheRecord fields (content_hash, version, owner)
+    """
+    usage = getattr(cache, "usage_metadata", None)
+    return CacheRecord(
+        name=cache.name,
+        repo_name=repo_name or repo_of_display_name(cache.display_name),
+        display_name=cache.display_name,
+        expire_time=_timestamp(getattr(cache, "expire_time", None)),
+        token_count=getattr(usage, "total_token_count", None),
+        created_at=_timestamp(getattr(cache, "create_time", None)) or time.time(),
+        **attrs,
+    )
+
+
+class CacheRegistry:
+    """
+    Persistent local index of the context caches, so that creating and cleaning up
+    caches does not list every cache of the project.
+
+    The registry is written atomically after each change. Caches created or deleted
+    outside of it (another deployment, the console, expiry) are picked up when it is
+    reconciled with the listing of the API, at most every `reconcile_seconds`. An API
+    key only lists the caches of its own project, so each owner is reconciled on its own.
+    """
+
+    def __init__(self, path: Path = DEFAULT_CACHE_REGISTRY_PATH, reconcile_seconds: float = DEFAULT_RECONCILE_SECONDS):
+        self.path = Path(path)
+        self.reconcile_seconds = reconcile_seconds
+        self._lock = threading.Lock()
+        self._records: Optional[Dict[str, CacheRecord]] = None
+        self._reconciled_at: Dict[str, float] = {}  # owner -> last reconciliation
+
+    def _load(self) -> Dict[str, CacheRecord]:
+        if self._records is not None:
+            return self._records
+        self._records = {}
+        if self.path.exists():
+            try:
+                with open(self.path, "r") as f:
+                    data = json.load(f)
+                if data.get("version") == REGISTRY_VERSION:
+                    self._records = {name: CacheRecord(**record) for name, record in data["caches"].items()}
+                    reconciled_at = data.get("reconciled_at")
+                    self._reconciled_at = reconciled_at if isinstance(reconciled_at, dict) else {}
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable cache registry {self.path}: {e}")
+        return self._records
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "version": REGISTRY_VERSION,
+            "reconciled_at": self._reconciled_at,
+            "caches": {name: asdict(record) for name, record in sorted(self._records.items())},
+        }
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
+
+    def get(self, name: str) -> Optional[CacheRecord]:
+        with self._lock:
+            return self._load().get(name)
+
+    def record(self, record: CacheRecord):
+        with self._lock:
+            self._load()[record.name] = record
+            self._save()
+
+    def forget(self, name: str):
+        with self._lock:
+            if self._load().pop(name, None) is not None:
+                self._save()
+
+    def update_expiry(self, name: str, expire_time: float):
+        with self._lock:
+            record = self._load().get(name)
+            if record is not None:
+                record.expire_time = expire_time
+                self._save()
+
+    def caches_of(self, repo_name: str, owner: Optional[str] = ALL_OWNERS) -> List[CacheRecord]:
+        """Live caches of a repository, of one owner unless ALL_OWNERS, the most recently created or reused first."""
+        now = time.time()
+        with self._lock:
+            records = [
+                r for r in self._load().values()
+                if r.repo_name == repo_name and (owner is ALL_OWNERS or r.owner == owner) and r.is_live(now)
+            ]
+        return sorted(records, key=lambda r: max(r.created_at, r.last_reused or 0), reverse=True)
+
+    def find(self, content_hash: str, owner: Optional[str]) -> Optional[CacheRecord]:
+        """
+        Return the live cache of a content, created with the same API key, if there is one.
+
+        Args:
+            content_hash: payload_hash of the content
+            owner: key_fingerprint of the API key the cache will be used with
+
+        Returns:
+            Optional[CacheRecord]: The cache expiring last, None if there is none
+        """
+        now = time.time()
+        with self._lock:
+            records = [
+                r for r in self._load().values()
+                if r.content_hash == content_hash and r.owner == owner and r.is_live(now)
+            ]
+        return max(records, key=lambda r: r.expire_time or float("inf"), default=None)
+
+    def mark_reused(self, name: str, expire_time: Optional[float]):
+        with self._lock:
+            record = self._load().get(name)
+            if record is not None:
+                record.last_reused = time.time()
+                record.expire_time = expire_time or record.expire_time
+                self._save()
+
+    def reconcile_due(self, owner: Optional[str]) -> bool:
+        with self._lock:
+            self._load()
+            return time.time() - self._reconciled_at.get(owner or "", 0.0) >= self.reconcile_seconds
+
+    def reconcile(self, remote_caches: Iterable, owner: Optional[str]) -> Tuple[int, int]:
+        """
+        Make the caches of one owner match those the API lists for its key.
+
+        Caches of the owner missing from the listing are forgotten, unknown ones are
+        added as the owner's and the expiration of the others is refreshed; their
+        content hash and version are kept. Caches of other owners are left untouched.
+
+        Args:
+            remote_caches: CachedContent objects listed with the owner's API key
+            owner: key_fingerprint of that API key
+
+        Returns:
+            Tuple[int, int]: Number of caches added and forgotten
+        """
+        remote = {cache.name: cache for cache in remote_caches if cache is not None}
+        with self._lock:
+            records = self._load()
+            forgotten = [name for name, record in records.items() if record.owner == owner and name not in remote]
+            for name in forgotten:
+                del records[name]
+            added = 0
+            for name, cache in remote.items():
+                if name in records:
+                    records[name].expire_time = _timestamp(getattr(cache, "expire_time", None))
+                    records[name].owner = records[name].owner or owner
+                else:
+                    records[name] = record_from_cache(cache, owner=owner)
+                    added += 1
+            self._reconciled_at[owner or ""] = time.time()
+            self._save()
+        logger.info(f"Reconciled the cache registry for {owner}: {len(remote)} caches, {added} added, {len(forgotten)} forgotten")
+        return added, len(forgotten)
+
+
+cache_registry = CacheRegistry()
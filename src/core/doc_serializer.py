@@ -0,0 +1,164 @@
+import os
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.utils.tokens import estimate_tokens
+
+# "repr" sends str() of the documentation JSON, as before
+DEFAULT_DOCUMENTATION_FORMAT = os.getenv("DOCUMENTATION_FORMAT", "compact")
+# Texts at least this long that appear more than once are written once and referenced
+DEDUP_MIN_CHARACTERS = 40
+
+# Short tags of the keys of the summaries (CodeStructure and the documentation/config summaries)
+FIELD_TAGS = {
+    "global_code_description": "d",
+    "functions_out_class": "f",
+    "classes": "c",
+    "attributes": "a",
+    "functions_in_class": "m",
+    "content_kind": "kind",
+}
+# Keys of a file entry that are rendered in its header line or carry nothing for the LLM
+HEADER_KEYS = ("file_id", "file_name", "file_paths", "classification")
+# Keys holding the summary of a file entry, whose content is rendered under its header
+SUMMARY_KEYS = ("documentation", "documentation_config")
+
+LEGEND = """\
+Each file starts with a line "[file_id] file_name @ directory" (no directory for files at the root).
+Under it: d = description, f = function, c = class, a = attribute, m = method, as "tag name: description".
+~N stands for the repeated text N listed below."""
+
+
+def _named_pair(item: dict) -> Optional[Tuple[str, str, str, str]]:
+    """(name key, name, description key, description) of a {"x_name", "x_description"} item."""
+    name_key = next((key for key in item if key.endswith("_name")), None)
+    description_key = next((key for key in item if key.endswith("_description")), None)
+    if name_key is None or description_key is None:
+        return None
+    return name_key, str(item[name_key]), description_key, item[description_key]
+
+
+def _texts(value) -> Iterable[str]:
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _texts(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _texts(item)
+
+
+class _Writer:
+    def __init__(self, repeated: Dict[str, int]):
+        self.repeated = repeated
+        self.lines: List[str] = []
+
+    def text(self, value) -> str:
+        text = " ".join(str(value).split())
+        return f"~{self.repeated[text]}" if text in self.repeated else text
+
+    def field(self, key: str, value, indent: int):
+        if value in (None, "", [], {}):
+            return
+        tag = FIELD_TAGS.get(key, key)
+        pad = "  " * indent
+        if isinstance(value, list):
+            for item in value:
+                self.field(key, item, indent)
+        elif isinstance(value, dict):
+            pair = _named_pair(value)
+            if pair:
+                name_key, name, description_key, description = pair
+                self.lines.append(f"{pad}{tag} {name}: {self.text(description)}")
+                rest = {k: v for k, v in value.items() if k not in (name_key, description_key)}
+            else:
+                self.lines.append(f"{pad}{tag}:")
+                rest = value
+            for child_key, child in rest.items():
+                self.field(child_key, child, indent + 1)
+        else:
+            self.lines.append(f"{pad}{tag}: {self.text(value)}")
+
+
+def _root_directory(entries: List[dict]) -> str:
+    directories = [os.path.dirname(entry["file_paths"]) for entry in entries if entry.get("file_paths")]
+    if not directories:
+        return ""
+    try:
+        return os.path.commonpath(directories)
+    except ValueError:  # Absolute and relative paths mixed
+        return ""
+
+
+def compact_documentation(entries: List[dict], title: Optional[str] = None) -> str:
+    """
+    Render documentation entries as compact, YAML-like text for an LLM.
+
+    Compared with str() of the JSON, keys become one-letter tags explained once in a
+    legend, (name, description) pairs take one line, paths are relative to the common
+    root of the files, empty fields are left out and every long text appearing more
+    than once is written once. file_id and file_name stay verbatim, since the answers
+    refer to files by them.
+
+    Args:
+        entries (List[dict]): Entries of a docstrings, documentation or config JSON
+        title (Optional[str]): First line of the text
+
+    Returns:
+        str: The compact text
+    """
+    counts = Counter(
+        " ".join(text.split())
+        for entry in entries
+        for key, value in entry.items()
+        if key not in HEADER_KEYS
+        for text in _texts(value)
+    )
+    repeated_texts = [text for text, count in counts.items() if count > 1 and len(text) >= DEDUP_MIN_CHARACTERS]
+    writer = _Writer({text: number for number, text in enumerate(repeated_texts, start=1)})
+    root = _root_directory(entries)
+
+    lines = [title] if title else []
+    lines.append(LEGEND)
+    if root:
+        lines.append(f"Directories are relative to {root}")
+    if repeated_texts:
+        lines.append("Repeated texts:")
+        lines.extend(f"~{number}: {text}" for number, text in enumerate(repeated_texts, start=1))
+    lines.append("")
+
+    for entry in entries:
+        directory = os.path.relpath(os.path.dirname(entry["file_paths"]), root) if root and entry.get("file_paths") else ""
+        header = f"[{entry.get('file_id')}] {entry.get('file_name')}"
+        writer.lines.append(header if directory in ("", ".") else f"{header} @ {directory}")
+        for key, value in entry.items():
+            if key in HEADER_KEYS:
+                continue
+            if key in SUMMARY_KEYS and isinstance(value, dict):
+                for child_key, child in value.items():
+                    writer.field(child_key, child, 1)
+            else:
+                writer.field(key, value, 1)
+    return "\n".join(lines + writer.lines)
+
+
+def serialize_documentation(documentation_json: dict, title: Optional[str] = None, documentation_format: str = DEFAULT_DOCUMENTATION_FORMAT) -> Tuple[str, dict]:
+    """
+    Serialize a docstrings JSON for a context cache and measure what it saves.
+
+    Args:
+        documentation_json (dict): {"documentation": [entries]}
+        title (Optional[str]): First line of the compact text
+        documentation_format (str): "compact", or "repr" for str() of the JSON
+
+    Returns:
+        Tuple[str, dict]: The text, and the estimated tokens of str() of the JSON
+        ("repr_tokens") and of the text ("tokens")
+    """
+    as_repr = str(documentation_json)
+    repr_tokens = estimate_tokens(as_repr)
+    if documentation_format.lower() == "repr":
+        return as_repr, {"repr_tokens": repr_tokens, "tokens": repr_tokens}
+    text = compact_documentation(documentation_json.get("documentation", []), title)
+    return text, {"repr_tokens": repr_tokens, "tokens": estimate_tokens(text)}
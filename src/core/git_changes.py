@@ -0,0 +1,180 @@
+import json
+import logging
+import subprocess
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class GitChanges:
+    """Files that differ between two commits, as paths relative to the repository root."""
+
+    old_commit: str
+    new_commit: str
+    changed: List[str] = field(default_factory=list)
+    added: List[str] = field(default_factory=list)
+    deleted: List[str] = field(default_factory=list)
+    # (old_path, new_path) pairs of files renamed without content change
+    renamed: List[Tuple[str, str]] = field(default_factory=list)
+
+    def is_empty(self) -> bool:
+        return not (self.changed or self.added or self.deleted or self.renamed)
+
+
+def _run_git(repo_path: Path, *args: str) -> str:
+    result = subprocess.run(
+        ["git", "-C", str(repo_path), *args],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    return result.stdout
+
+
+def is_git_repository(repo_path: Path) -> bool:
+    """Return True if repo_path is the root of a git working tree."""
+    return (Path(repo_path) / ".git").exists()
+
+
+def get_head_commit(repo_path: Path) -> str:
+    """Return the SHA of the commit checked out in repo_path."""
+    return _run_git(repo_path, "rev-parse", "HEAD").strip()
+
+
+def fetch_latest_commit(repo_path: Path, remote: str = "origin") -> str:
+    """
+    Fetch the remote and return the SHA its tracked branch now points to.
+
+    Args:
+        repo_path: Root of the existing clone
+        remote: Name of the remote to fetch from
+
+    Returns:
+        SHA of the upstream branch of HEAD, or of the remote HEAD if no upstream is set
+
+    Raises:
+        subprocess.CalledProcessError: If the fetch fails or no remote branch can be resolved
+    """
+    _run_git(repo_path, "fetch", "--quiet", remote)
+    try:
+        return _run_git(repo_path, "rev-parse", "--verify", "@{upstream}").strip()
+    except subprocess.CalledProcessError:
+        return _run_git(repo_path, "rev-parse", "--verify", f"{remote}/HEAD").strip()
+
+
+def diff_commits(repo_path: Path, old_commit: str, new_commit: str) -> GitChanges:
+    """
+    List the files that differ between two commits with `git diff --name-status`.
+
+    Renames detected by git with 100% similarity are reported as renames only. Renames
+    with modified content are reported as a rename plus a change of the new path, so the
+    existing summary moves with the file and is then refreshed.
+
+    Args:
+        repo_path: Root of the clone
+        old_commit: Commit that was indexed
+        new_commit: Commit to index
+
+    Returns:
+        The changes between the two commits
+    """
+    output = _run_git(repo_path, "diff", "--name-status", "-M", "-z", old_commit, new_commit)
+    tokens = output.split("\0")
+    changes = GitChanges(old_commit=old_commit, new_commit=new_commit)
+
+    position = 0
+    while position < len(tokens) and tokens[position]:
+        status = tokens[position]
+        kind = status[0]
+        if kind in ("R", "C"):
+            old_path, new_path = tokens[position + 1], tokens[position + 2]
+            position += 3
+            if kind == "C":
+                changes.added.append(new_path)
+                continue
+            changes.renamed.append((old_path, new_path))
+            if status[1:] != "100":
+                changes.changed.append(new_path)
+            continue
+
+        path = tokens[position + 1]
+        position += 2
+        if kind == "A":
+            changes.added.append(path)
+        elif kind == "D":
+            changes.deleted.append(path)
+        else:  # M, T and anything unexpected are treated as content changes
+            changes.changed.append(path)
+
+    return changes
+
+
+def clone_at_commit(repo_path: Path, commit: str, destination: Path, remote: str = "origin") -> None:
+    """
+    Make destination a clone of repo_path with commit checked out, leaving repo_path untouched.
+
+    The objects are hardlinked from repo_path when both are on the same filesystem, and
+    the clone points to the remote of repo_path, so it can be fetched in turn once it
+    replaces it.
+
+    Args:
+        repo_path: Root of the existing clone, already holding commit
+        commit: Commit to check out
+        destination: Directory of the new clone, which must not exist
+        remote: Name of the remote the clone keeps
+    """
+    destination = Path(destination)
+    _run_git(destination.parent, "clone", "--quiet", "--local", "--no-checkout", str(Path(repo_path).resolve()), str(destination))
+    remote_url = _run_git(repo_path, "remote", "get-url", remote).strip()
+    _run_git(destination, "remote", "set-url", remote, remote_url)
+    # Moves the current branch, so that its upstream is still followed by the next fetch
+    _run_git(destination, "reset", "--hard", "--quiet", commit)
+
+
+def tracked_files(repo_path: Path) -> List[str]:
+    """Files of the working tree tracked by git, relative to the repository root."""
+    return [path for path in _run_git(repo_path, "ls-files", "-z").split("\0") if path]
+
+
+def object_files(repo_path: Path) -> List[str]:
+    """
+    Loose objects and packs of a clone, relative to the repository root.
+
+    They are named after their content, so the same path holds the same bytes in any
+    clone of the repository.
+    """
+    objects_dir = Path(repo_path) / ".git" / "objects"
+    return [
+        path.relative_to(repo_path).as_posix()
+        for path in objects_dir.rglob("*")
+        if path.is_file() and (len(path.parent.name) == 2 or (path.parent.name == "pack" and path.suffix in (".pack", ".idx", ".rev")))
+    ]
+
+
+def get_commit_record_path(repo_name: str) -> Path:
+    """Path of the file recording the indexed commit, next to the JSON artifacts."""
+    return Path(f"/app/commits_json/{repo_name}.json")
+
+
+def read_indexed_commit(repo_name: str) -> Optional[str]:
+    """Return the SHA of the commit the JSON artifacts were built from, if recorded."""
+    record_path = get_commit_record_path(repo_name)
+    if not record_path.exists():
+        return None
+    try:
+        with open(record_path, "r") as f:
+            return json.load(f).get("commit")
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable commit record {record_path}: {e}")
+        return None
+
+
+def record_indexed_commit(repo_name: str, commit: str) -> None:
+    """Record the SHA of the commit the JSON artifacts were built from."""
+    record_path = get_commit_record_path(repo_name)
+    record_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(record_path, "w") as f:
+        json.dump({"commit": commit}, f, indent=4)
@@ -1,25 +1,47 @@
 import os
-import google.generativeai as genai
-from google.generativeai import caching
+from google.ai import generativelanguage as glm
 import google.api_core.exceptions as exceptions
 import datetime
 import requests
 import subprocess
 from pathlib import Path
-from typing import Optional
 import json
 from urllib.parse import urlparse
 import time
-import hashlib
-import shutil
+import queue
+import threading
+import weakref
 import tempfile
 import zipfile
 import traceback
-import json
-from typing import List, Tuple, Dict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.core.manifest import (
+    ManifestEntry,
+    diff_manifests,
+    hash_file,
+    load_manifest,
+    save_manifest,
+    scan_directory,
+)
+from src.core.repo_versions import current_version, publish_version, versions_root
+from src.core.doc_serializer import serialize_documentation
+from src.core.cache_manager import DEFAULT_CONTEXT_CACHE_TTL_SECONDS, extend_cache_ttl
+from src.core.cache_registry import cache_registry, key_fingerprint, payload_hash, record_from_cache, repo_of_display_name
+from src.core.llm_clients import llm_client_pool
+from src.core.git_changes import (
+    clone_at_commit,
+    diff_commits,
+    fetch_latest_commit,
+    get_head_commit,
+    is_git_repository,
+    object_files,
+    read_indexed_commit,
+    record_indexed_commit,
+    tracked_files,
+)
 
 import dotenv
-import os
 
 import logging
 
@@ -30,17 +52,22 @@ logger = logging.getLogger(__name__)
 dotenv.load_dotenv()
 CONTEXT_CACHING_RETRIVER = os.getenv("CONTEXT_CACHING_RETRIVER")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-
-# Default configuration with environment variable
-genai.configure(api_key=GEMINI_API_KEY)
-
-# Function to configure API with a specific key
-def configure_gemini_api(api_key=None):
-    """Configure Gemini API with a specific key or use the environment variable"""
-    if api_key:
-        genai.configure(api_key=api_key)
-    else:
-        genai.configure(api_key=GEMINI_API_KEY)
+INDEXER_URL = os.getenv("INDEXER_URL", "http://localhost:8002")
+# Timeout of each HTTP request to the indexer; the indexing itself runs as a background job
+INDEXER_REQUEST_TIMEOUT = float(os.getenv("INDEXER_REQUEST_TIMEOUT", 30))
+INDEXER_POLL_INTERVAL = float(os.getenv("INDEXER_POLL_INTERVAL", 5))
+# Give up waiting for an indexing job after this many seconds
+INDEXER_JOB_TIMEOUT = float(os.getenv("INDEXER_JOB_TIMEOUT", 6 * 3600))
+# "off" waits for the complete index of a new repository instead of starting from a partial one
+INDEXER_EARLY_PUBLICATION = os.getenv("INDEXER_EARLY_PUBLICATION", "on")
+
+# Docstrings JSONs holding a partial index that a background thread of this process is completing
+_refining_indexes = set()
+_refining_lock = threading.Lock()
+# One lock per cache content, so concurrent inits of the same content create a single cache;
+# a lock goes away with the last init holding it
+_cache_creation_locks: "weakref.WeakValueDictionary[str, threading.Lock]" = weakref.WeakValueDictionary()
+_cache_creation_locks_guard = threading.Lock()
 
 
 def clone_github_repo(folder_path: str, repo_url: str) -> Optional[str]:
@@ -118,79 +145,148 @@ def clone_github_repo(folder_path: str, repo_url: str) -> Optional[str]:
         return None
 
 
-def create_cache(display_name: str, documentation: str, system_prompt: str, gemini_api_key=None):
-    # Configure Gemini API with the provided key or use the default
-    configure_gemini_api(gemini_api_key)
-    
-    # Create a unique display name by adding timestamp and hash to avoid conflicts
-    timestamp = str(int(time.time()))
-    content_hash = hashlib.md5(documentation.encode()).hexdigest()[:8]
-    unique_display_name = f"{display_name}_{timestamp}_{content_hash}"
-    
-    # Delete old caches with the same base display name to prevent accumulation
-    max_retries = 3
-    retry_delay = 2 # seconds
-    cache_list = None
+def documentation_payload(repo_name: str, documentation_json: dict) -> str:
+    """Serialize the docstrings JSON of a repository for its context cache, logging the tokens saved."""
+    documentation_str, tokens = serialize_documentation(documentation_json, title=f"Documentation of the repository {repo_name}")
+    saved = 1 - tokens["tokens"] / tokens["repr_tokens"] if tokens["repr_tokens"] else 0.0
+    logger.info(
+        f"Documentation of {repo_name}: ~{tokens['tokens']} tokens, "
+        f"~{tokens['repr_tokens']} as a dict repr ({saved:.0%} saved)"
+    )
+    return documentation_str
+
+
+def _list_remote_caches(gemini_api_key=None, max_retries: int = 3, retry_delay: float = 2):
+    """List every context cache of the project of an API key, retrying while the service is unavailable."""
     for attempt in range(max_retries):
         try:
-            cache_list = caching.CachedContent.list()
+            cache_list = list(
+                llm_client_pool.gemini_cache_client(gemini_api_key or "").list_cached_contents(glm.ListCachedContentsRequest())
+            )
             logger.info(f"Successfully listed caches on attempt {attempt + 1}")
-            break # Success, exit loop
+            return cache_list
         except exceptions.ServiceUnavailable as e:
             logger.warning(f"Attempt {attempt + 1}/{max_retries} failed to list caches: {e}. Retrying in {retry_delay}s...")
             if attempt + 1 == max_retries:
                 logger.error("Max retries reached for listing caches. Raising error.")
-                raise # Re-raise the last exception if max retries reached
+                raise
             time.sleep(retry_delay)
-        except Exception as e: # Catch other potential exceptions during list
-            logger.error(f"Unexpected error listing caches on attempt {attempt + 1}: {e}")
-            raise # Re-raise unexpected errors immediately
 
-    if cache_list is not None:
-        logger.info(f"Result of caching.CachedContent.list(): {cache_list}")
-        logger.info(f"Type of cache_list: {type(cache_list)}")
-        
-        # Clean up old caches for the same repository (keep only the most recent ones)
-        old_caches_for_repo = []
-        for cache in cache_list:
-            if cache is not None:
-                if cache.display_name.startswith(f"{display_name}_"):
-                    old_caches_for_repo.append(cache)
-                elif cache.display_name == display_name:
-                    # Handle old caches without timestamp format
-                    old_caches_for_repo.append(cache)
-            else:
-                logger.warning("Encountered None value while iterating through cache_list")
-        
-        # Sort by creation time (if available) or name and keep only the 2 most recent
-        # to allow for graceful transitions
-        if len(old_caches_for_repo) > 2:
-            # Sort by display name (which includes timestamp) and delete older ones
-            old_caches_for_repo.sort(key=lambda x: x.display_name, reverse=True)
-            caches_to_delete = old_caches_for_repo[2:]  # Keep 2 most recent
-            
-            for cache_to_delete in caches_to_delete:
-                try:
-                    logger.info(f"Deleting old cache: {cache_to_delete.display_name}")
-                    cache_to_delete.delete()
-                except Exception as e:
-                    logger.warning(f"Failed to delete old cache {cache_to_delete.display_name}: {e}")
+
+def _delete_remote_cache(cache_name: str, gemini_api_key=None):
+    """Delete a context cache and forget it, an already deleted one included."""
+    try:
+        llm_client_pool.gemini_cache_client(gemini_api_key or "").delete_cached_content(name=cache_name)
+    except exceptions.NotFound:
+        pass
+    cache_registry.forget(cache_name)
+
+
+def _reuse_cache(content_hash: str, owner: Optional[str], gemini_api_key=None) -> Optional[str]:
+    """Return a live cache of the same content, extended to a full TTL, None if there is none."""
+    while True:
+        record = cache_registry.find(content_hash, owner)
+        if record is None:
+            return None
+        # Extending it also checks that it still exists
+        try:
+            expire_time = extend_cache_ttl(record.name, gemini_api_key)
+        except Exception as e:
+            logger.warning(f"Could not extend cache {record.name} for reuse, creating a new one: {e}")
+            return None
+        if expire_time is not None:
+            cache_registry.mark_reused(record.name, expire_time)
+            logger.info(f"Reusing cache {record.name} ({record.display_name}), same content hash {content_hash[:8]}")
+            return record.name
+
+
+def create_cache(display_name: str, documentation: str, system_prompt: str, gemini_api_key=None, repo_path: Optional[Path] = None):
+    """
+    Return a context cache holding the documentation, reusing a live one with the same content.
+
+    A cache is identified by the hash of its model, system prompt and documentation, so
+    any init, re-init or session producing the same payload with the same API key gets
+    the existing cache instead of uploading it again.
+
+    Args:
+        display_name (str): Name of the repository
+        documentation (str): Content of the cache
+        system_prompt (str): System instruction of the cache
+        gemini_api_key (str, optional): The Gemini API key. Defaults to None.
+        repo_path (Path, optional): Repository the documentation was built from, whose
+            current version is recorded with a new cache. Defaults to None.
+
+    Returns:
+        str: The name of the cache
+    """
+    content_hash = payload_hash(documentation, system_prompt, CONTEXT_CACHING_RETRIVER)
+    owner = key_fingerprint(gemini_api_key or GEMINI_API_KEY)
+    with _cache_creation_locks_guard:
+        creation_lock = _cache_creation_locks.get(content_hash)
+        if creation_lock is None:
+            creation_lock = _cache_creation_locks[content_hash] = threading.Lock()
+    with creation_lock:
+        cache_name = _reuse_cache(content_hash, owner, gemini_api_key)
+        if cache_name:
+            return cache_name
+        return _create_new_cache(display_name, documentation, system_prompt, content_hash, owner, gemini_api_key, repo_path)
+
+
+def _model_resource_name(model_name: str) -> str:
+    """models/<name>, the form the API expects, for a model given with or without its prefix."""
+    return model_name if "/" in model_name else f"models/{model_name}"
+
+
+def _create_new_cache(display_name: str, documentation: str, system_prompt: str, content_hash: str, owner: Optional[str], gemini_api_key=None, repo_path: Optional[Path] = None) -> str:
+    # Create a unique display name by adding timestamp and hash to avoid conflicts
+    timestamp = str(int(time.time()))
+    unique_display_name = f"{display_name}_{timestamp}_{content_hash[:8]}"
+
+    # The registry knows the caches of the repository; the API listing only refreshes it now and then
+    if cache_registry.reconcile_due(owner):
+        try:
+            cache_registry.reconcile(_list_remote_caches(gemini_api_key), owner)
+        except Exception as e:
+            logger.warning(f"Could not reconcile the cache registry, using it as is: {e}")
+
+    # Clean up old caches for the same repository, keeping the 2 most recent
+    # to allow for graceful transitions; only the caches of this key can be deleted with it
+    for old_cache in cache_registry.caches_of(display_name, owner)[2:]:
+        try:
+            logger.info(f"Deleting old cache: {old_cache.display_name}")
+            _delete_remote_cache(old_cache.name, gemini_api_key)
+        except Exception as e:
+            logger.warning(f"Failed to delete old cache {old_cache.display_name}: {e}")
     
-    # Create new cache with unique display name
+    # Create new cache with unique display name, through the cache client of the key
     try:
-        cache = caching.CachedContent.create(
-            model=CONTEXT_CACHING_RETRIVER,
-            display_name=unique_display_name,  # used to identify the cache
-            contents=documentation,
-            system_instruction=system_prompt,
-            ttl=datetime.timedelta(minutes=30),
+        request = glm.CreateCachedContentRequest(
+            cached_content=glm.CachedContent(
+                model=_model_resource_name(CONTEXT_CACHING_RETRIVER),
+                display_name=unique_display_name,  # used to identify the cache
+                contents=[glm.Content(role="user", parts=[glm.Part(text=documentation)])],
+                system_instruction=glm.Content(parts=[glm.Part(text=system_prompt)]),
+                ttl=datetime.timedelta(seconds=DEFAULT_CONTEXT_CACHE_TTL_SECONDS),
+            )
         )
+        cache = llm_client_pool.gemini_cache_client(gemini_api_key or "").create_cached_content(request)
         logger.info(f"Created new cache with display_name: {unique_display_name}, cache_id: {cache.name}")
-        return cache.name
     except Exception as e:
         logger.error(f"Failed to create cache: {e}")
         raise
 
+    version = current_version(repo_path) if repo_path is not None else None
+    cache_registry.record(
+        record_from_cache(
+            cache,
+            repo_name=display_name,
+            content_hash=content_hash,
+            version=version.name if version else None,
+            owner=owner,
+        )
+    )
+    return cache.name
+
 
 def get_cache(cache_name: str, gemini_api_key=None):
     """
@@ -201,15 +297,12 @@ def get_cache(cache_name: str, gemini_api_key=None):
         gemini_api_key (str, optional): The Gemini API key. Defaults to None.
 
     Returns:
-        Optional[caching.CachedContent]: The cached content object if found, otherwise None.
+        Optional[glm.CachedContent]: The cached content object if found, otherwise None.
     """
     try:
-        configure_gemini_api(gemini_api_key)
         logger.info(f"Attempting to retrieve cache with name: {cache_name}")
-        cache = caching.CachedContent(name=cache_name)
-        # The following line is just to check if the cache exists.
-        # It will raise an exception if not found.
-        cache.update_time
+        # Raises NotFound if the cache does not exist
+        cache = llm_client_pool.gemini_cache_client(gemini_api_key or "").get_cached_content(name=cache_name)
         logger.info(f"Successfully retrieved cache: {cache.display_name}")
         return cache
     except exceptions.NotFound:
@@ -222,16 +315,12 @@ def get_cache(cache_name: str, gemini_api_key=None):
 
 def delete_cache(display_name: str):
     # Delete old display name
-    cache_list = caching.CachedContent.list()
-    for cache in cache_list:
+    for cache in cache_registry.caches_of(repo_of_display_name(display_name)):
         if cache.display_name == display_name:
-            cache.delete()
+            _delete_remote_cache(cache.name)
             return None
 
 
-import os
-
-
 def process_repo_link(link: str, gemini_api_key=None):
     display_name = link.split("/")[-1]
     documentation_path = f"docstrings_json/{display_name}.json"
@@ -256,7 +345,7 @@ Your task is to answer any question related to the documentation of the python r
     )
 
     # Check if documentation file already exists
-    if os.path.exists(documentation_path):
+    if has_usable_index(documentation_path):
         # Load existing documentation
         with open(documentation_path, "r") as f:
             documentation_json = json.load(f)
@@ -273,48 +362,24 @@ Your task is to answer any question related to the documentation of the python r
     else:
         
         # If file doesn't exist, proceed with repo cloning and documentation generation
-        url_file_classification = "http://localhost:8002/score"
-
         # Get the documentation json from the fastapi documentation generation server
         logger.info(f"Calling classifier service for {repo_path}")
         api_key_preview = gemini_api_key[:5] if gemini_api_key and len(gemini_api_key) >= 5 else gemini_api_key
         logger.info(f"Using GEMINI_API_KEY: {api_key_preview}... (length: {len(gemini_api_key) if gemini_api_key else 0})")
         
-        payload = {
-            "folder_path": str(repo_path), 
-            "batch_size": 50,
-            "max_workers": 10,
-            "GEMINI_API_KEY": gemini_api_key,
-            "ANTHROPIC_API_KEY": "",
-            "OPENAI_API_KEY": ""
-        }
-        
-        response = requests.post(url_file_classification, json=payload) # Use repo_path directly
-        if response.status_code != 200:
-            raise Exception("Failed to get documentation from the server.")
-        response_data = response.json()
-        response = response_data["result"]
-
+        # Returns once the first priority tiers are indexed, the rest is saved in the background
+        # The commit is recorded once the complete index is saved, never on a partial one
+        response = index_repository(
+            repo_path, # Use repo_path directly
+            gemini_api_key,
+            lambda index: save_index_files(index, documentation_path, documentation_md_path, config_path),
+            documentation_path,
+            on_complete=_commit_recorder(display_name, repo_path),
+        )
         documentation_json = {"documentation": response["documentation"]}
-        documentation_md_json = {"documentation_md": response["documentation_md"]}
-        config_json = {"config": response["config"]}
 
-        logger.info(f"Loaded existing documentation_json")
-        logger.info(f"Loaded existing config")
-        logger.info(f"Loaded existing documentation_md")
-
-        # Save the documentation_json to a file
-        with open(documentation_path, "w") as f1:
-            json.dump(documentation_json, f1, indent=4)
-        # Save the config_json to a file
-        with open(documentation_md_path, "w") as f2:
-            json.dump(documentation_md_json, f2, indent=4)
-        # Save the config_json to a file
-        with open(config_path, "w") as f3:
-            json.dump(config_json, f3, indent=4)
-
-    documentation_str = str(documentation_json)
-    cache_name = create_cache(display_name, documentation_str, system_prompt, gemini_api_key)
+    documentation_str = documentation_payload(display_name, documentation_json)
+    cache_name = create_cache(display_name, documentation_str, system_prompt, gemini_api_key, repo_path)
 
     return cache_name
 
@@ -356,7 +421,7 @@ Your task is to answer any question related to the documentation of the python r
 """.replace("repository_name", display_name)
 
     # Check if documentation file already exists
-    if documentation_path.exists():
+    if has_usable_index(documentation_path):
         logger.info(f"Documentation already exists for {display_name}, loading...")
         # Load existing documentation
         with open(documentation_path, "r") as f:
@@ -366,61 +431,32 @@ Your task is to answer any question related to the documentation of the python r
     else:
         logger.info(f"Documentation not found for {display_name}, generating...")
         # If file doesn't exist, proceed with documentation generation
-        url_file_classification = "http://localhost:8002/score"
-
         # Get the documentation json from the fastapi documentation generation server
         logger.info(f"Calling classifier service for local folder: {repo_path}")
         api_key_preview = gemini_api_key[:5] if gemini_api_key and len(gemini_api_key) >= 5 else gemini_api_key
         logger.info(f"Using GEMINI_API_KEY: {api_key_preview}... (length: {len(gemini_api_key) if gemini_api_key else 0})")
         
-        payload = {
-            "folder_path": str(repo_path), 
-            "batch_size": 50,
-            "max_workers": 10,
-            "GEMINI_API_KEY": gemini_api_key,
-            "ANTHROPIC_API_KEY": "",
-            "OPENAI_API_KEY": ""
-        }
-        
         try:
-            response = requests.post(url_file_classification, json=payload)
-            response.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
+            # Returns once the first priority tiers are indexed, the rest is saved in the background
+            response = index_repository(
+                repo_path,
+                gemini_api_key,
+                lambda index: save_index_files(index, documentation_path, documentation_md_path, config_path),
+                documentation_path,
+            )
         except requests.exceptions.RequestException as e:
             logger.error(f"Failed to connect to classifier service: {e}")
             raise Exception(f"Failed to connect to classifier service: {e}")
-        except Exception as e:
-            logger.error(f"Error during classifier request: {e}")
-            raise Exception(f"Error during classifier request: {e}")
-
-        if response.status_code != 200:
-             logger.error(f"Classifier service returned status {response.status_code}: {response.text}")
-             raise Exception(f"Classifier service failed with status {response.status_code}.")
-
-        response_data = response.json()
-        logger.info(f"Received response from classifier: {response_data}")
-        response = response_data["result"]
-
-        documentation_json = {"documentation": response.get("documentation", {})}
-        documentation_md_json = {"documentation_md": response.get("documentation_md", "")}
-        config_json = {"config": response.get("config", {})}
-
-
-        # Save the generated data
-        try:
-            with open(documentation_path, "w") as f1:
-                json.dump(documentation_json, f1, indent=4)
-            with open(documentation_md_path, "w") as f2:
-                json.dump(documentation_md_json, f2, indent=4)
-            with open(config_path, "w") as f3:
-                json.dump(config_json, f3, indent=4)
-            logger.info(f"Successfully saved generated documentation for {display_name}")
         except IOError as e:
             logger.error(f"Failed to write documentation files: {e}")
             raise Exception(f"Failed to write documentation files: {e}")
+        logger.info(f"Successfully saved generated documentation for {display_name}")
+
+        documentation_json = {"documentation": response.get("documentation", {})}
 
 
-    documentation_str = str(documentation_json) # Use the structure containing 'documentation' key
-    cache_name = create_cache(display_name, documentation_str, system_prompt, gemini_api_key)
+    documentation_str = documentation_payload(display_name, documentation_json)
+    cache_name = create_cache(display_name, documentation_str, system_prompt, gemini_api_key, repo_path)
     logger.info(f"Cache created/updated for {display_name}: {cache_name}")
 
     return cache_name
@@ -432,88 +468,548 @@ def get_file_hash(file_path: Path) -> str:
     """Calculate MD5 hash of file content for quick comparison."""
     if not file_path.is_file():
         return ""
-    
-    hash_md5 = hashlib.md5()
-    try:
-        with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                hash_md5.update(chunk)
-        return hash_md5.hexdigest()
-    except Exception as e:
-        logger.error(f"Error hashing file {file_path}: {e}")
-        return ""
+    return hash_file(file_path)
+
+
+def get_manifest_path(repo_name: str) -> Path:
+    """Path of the persisted file manifest of a repository, next to its JSON artifacts."""
+    return Path(f"/app/manifests_json/{repo_name}.json")
+
+
+def compare_manifests(
+    source_dir: Path, target_dir: Path, manifest_path: Optional[Path] = None
+) -> Tuple[Dict[str, ManifestEntry], Dict[str, ManifestEntry], Tuple[List[str], List[str], List[str]]]:
+    """
+    Scan both directories and diff them through their manifests.
+
+    The existing directory reuses the hashes of its persisted manifest for every file
+    whose size and mtime are unchanged. In the new directory, files whose size differs
+    from the existing one are changed without being hashed.
 
-def compare_directories(source_dir: Path, target_dir: Path) -> Tuple[List[Path], List[Path], List[Path]]:
+    Args:
+        source_dir: Path to the new directory
+        target_dir: Path to the existing directory
+        manifest_path: Persisted manifest of target_dir, if any
+
+    Returns:
+        The manifests of source_dir and target_dir, and the (changed, added, deleted) relative paths
+    """
+    if not source_dir.exists() or not target_dir.exists():
+        raise ValueError(f"Both directories must exist: {source_dir}, {target_dir}")
+
+    target_manifest = scan_directory(target_dir, previous=load_manifest(manifest_path))
+    source_manifest = scan_directory(source_dir, reference=target_manifest)
+    return source_manifest, target_manifest, diff_manifests(source_manifest, target_manifest)
+
+
+def compare_directories(source_dir: Path, target_dir: Path, manifest_path: Optional[Path] = None) -> Tuple[List[Path], List[Path], List[Path]]:
     """
     Compare two directories and return lists of changed, added, and deleted files.
     
     Args:
         source_dir: Path to the new directory
         target_dir: Path to the existing directory
+        manifest_path: Persisted manifest of target_dir, used to skip hashing unchanged files
         
     Returns:
         Tuple of (changed_files, added_files, deleted_files)
     """
-    if not source_dir.exists() or not target_dir.exists():
-        raise ValueError(f"Both directories must exist: {source_dir}, {target_dir}")
-    
-    # Get all files recursively from both directories, excluding .git
-    source_files = {p.relative_to(source_dir): get_file_hash(p) 
-                    for p in source_dir.rglob('*') 
-                    if p.is_file() and '.git' not in p.parts}
-    target_files = {p.relative_to(target_dir): get_file_hash(p) 
-                    for p in target_dir.rglob('*') 
-                    if p.is_file() and '.git' not in p.parts}
-    
-    # Find changes
-    changed_files = [source_dir / p for p, hash_val in source_files.items() 
-                    if p in target_files and hash_val != target_files[p]]
+    _, _, (changed, added, deleted) = compare_manifests(source_dir, target_dir, manifest_path)
     
-    # Find additions (files in source not in target)
-    added_files = [source_dir / p for p in source_files.keys() if p not in target_files]
-    
-    # Find deletions (files in target not in source)
-    deleted_files = [target_dir / p for p in target_files.keys() if p not in source_files]
+    changed_files = [source_dir / p for p in changed]
+    added_files = [source_dir / p for p in added]
+    deleted_files = [target_dir / p for p in deleted]
     
     return changed_files, added_files, deleted_files
 
-def prepare_temp_folder_for_changes(
-    changed_files: List[Path], 
-    added_files: List[Path],
-    source_dir: Path,
-    temp_dir: Path
-) -> Dict[str, str]:
+
+def call_indexer_service(
+    folder_path: Path,
+    gemini_api_key: str,
+    files: Optional[List[str]] = None,
+    on_partial: Optional[Callable[[dict], None]] = None,
+) -> dict:
     """
-    Create a temporary folder with only changed and added files, preserving original paths.
-    
+    Ask the indexer service to classify and summarize a repository.
+
+    The indexing runs as a background job of the indexer: it is submitted, then polled
+    until it completes. A job interrupted by a restart of the indexer is resumed, and
+    only the files it had not summarized yet are processed again.
+
     Args:
-        changed_files: List of changed file paths
-        added_files: List of added file paths
-        source_dir: Source directory (new version)
-        temp_dir: Temporary directory to create files in
-        
+        folder_path: Repository root, as seen by the indexer service
+        gemini_api_key: Gemini API key forwarded to the indexer
+        files: Optional list of paths relative to folder_path. When given, only these
+            files are indexed instead of the whole repository.
+        on_partial: Called with each partial index the job publishes while it runs
+
     Returns:
-        Mapping of temporary file paths to original paths
+        The indexer result with "documentation", "documentation_md" and "config" lists
     """
-    # Create mapping of paths
-    path_mapping = {}
-    
-    # Process all changed and added files
-    all_files = changed_files + added_files
-    for file_path in all_files:
-        rel_path = file_path.relative_to(source_dir)
-        temp_file_path = temp_dir / rel_path
-        
-        # Create parent directories if they don't exist
-        temp_file_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        # Copy the file
-        shutil.copy2(file_path, temp_file_path)
-        
-        # Add to mapping (storing both original and temporary paths)
-        path_mapping[str(temp_file_path)] = str(file_path)
-    
-    return path_mapping
+    payload = {
+        "folder_path": str(folder_path),
+        "batch_size": 50,
+        "max_workers": 10,
+        "GEMINI_API_KEY": gemini_api_key,
+        "ANTHROPIC_API_KEY": "",
+        "OPENAI_API_KEY": "",
+    }
+    if files is not None:
+        payload["files"] = files
+
+    response = requests.post(f"{INDEXER_URL}/jobs", json=payload, timeout=INDEXER_REQUEST_TIMEOUT)
+    if response.status_code != 202:
+        raise Exception(f"Classifier service failed with status {response.status_code}.")
+    job_id = response.json()["job_id"]
+    logger.info(f"Indexing job {job_id} submitted for {folder_path}")
+
+    deadline = time.monotonic() + INDEXER_JOB_TIMEOUT
+    partial_tiers = []
+    while True:
+        if time.monotonic() > deadline:
+            raise Exception(f"Indexing job {job_id} did not complete within {INDEXER_JOB_TIMEOUT:.0f}s.")
+        time.sleep(INDEXER_POLL_INTERVAL)
+        try:
+            response = requests.get(f"{INDEXER_URL}/jobs/{job_id}", timeout=INDEXER_REQUEST_TIMEOUT)
+        except requests.exceptions.ConnectionError as e:
+            # The indexer may be restarting; the job is resumed once it is back
+            logger.warning(f"Indexer unreachable while polling job {job_id}: {e}")
+            continue
+        if response.status_code != 200:
+            raise Exception(f"Classifier service failed with status {response.status_code}.")
+        status = response.json()
+        progress = status.get("progress") or {}
+        logger.info(f"Indexing job {job_id} {status['status']}: {progress.get('files')} (ETA {progress.get('eta_seconds')}s)")
+
+        if status["status"] == "completed":
+            break
+        if on_partial and len(status.get("partial_tiers") or []) > len(partial_tiers):
+            response = requests.get(f"{INDEXER_URL}/jobs/{job_id}/partial", timeout=INDEXER_REQUEST_TIMEOUT)
+            if response.status_code == 200:
+                partial_tiers = status["partial_tiers"]
+                logger.info(f"Indexing job {job_id} published a partial index ({', '.join(partial_tiers)} complete)")
+                on_partial(response.json()["result"])
+        if status["status"] == "failed":
+            raise Exception(f"Indexing job {job_id} failed: {status.get('error')}")
+        if status["status"] == "interrupted":
+            logger.info(f"Resuming indexing job {job_id} ({status.get('checkpointed_files', 0)} files already summarized)")
+            response = requests.post(
+                f"{INDEXER_URL}/jobs/{job_id}/resume",
+                json={key: payload[key] for key in ("GEMINI_API_KEY", "ANTHROPIC_API_KEY", "OPENAI_API_KEY")},
+                timeout=INDEXER_REQUEST_TIMEOUT,
+            )
+            if response.status_code not in (202, 409):  # 409: already resumed by another poller
+                raise Exception(f"Failed to resume indexing job {job_id}: status {response.status_code}.")
+
+    response = requests.get(f"{INDEXER_URL}/jobs/{job_id}/result", timeout=INDEXER_REQUEST_TIMEOUT)
+    if response.status_code != 200:
+        raise Exception(f"Classifier service failed with status {response.status_code}.")
+    return response.json()["result"]
+
+
+def save_index_files(index: dict, documentation_path, documentation_md_path, config_path):
+    """Write the docstrings, documentation and config JSONs of a repository from an indexer result."""
+    for path, section in (
+        (documentation_path, "documentation"),
+        (documentation_md_path, "documentation_md"),
+        (config_path, "config"),
+    ):
+        with open(path, "w") as f:
+            json.dump({section: index.get(section, [])}, f, indent=4)
+
+
+def _partial_marker(documentation_path) -> Path:
+    return Path(f"{documentation_path}.partial")
+
+
+def has_usable_index(documentation_path) -> bool:
+    """
+    Tell whether the docstrings JSON of a repository can be loaded instead of indexing it.
+
+    A partial index is only usable while this process is completing it; one left behind
+    by a process that stopped before its index was complete is indexed again.
+    """
+    if not os.path.exists(documentation_path):
+        return False
+    with _refining_lock:
+        if str(documentation_path) in _refining_indexes:
+            return True
+    return not _partial_marker(documentation_path).exists()
+
+
+def index_is_complete(documentation_path) -> bool:
+    """Tell whether the docstrings JSON of a repository holds a complete index, not a partial one."""
+    return os.path.exists(documentation_path) and not _partial_marker(documentation_path).exists()
+
+
+def _commit_recorder(repo_name: str, repo_path) -> Optional[Callable[[], None]]:
+    """Return a callback recording the commit checked out now as indexed, None outside of git."""
+    if not repo_path or not is_git_repository(Path(repo_path)):
+        return None
+    commit = get_head_commit(Path(repo_path))
+    return lambda: record_indexed_commit(repo_name, commit)
+
+
+def index_repository(
+    folder_path: Path,
+    gemini_api_key: str,
+    save_index: Callable[[dict], None],
+    documentation_path,
+    on_complete: Optional[Callable[[], None]] = None,
+) -> dict:
+    """
+    Index a repository, returning as soon as the indexer publishes a usable partial index.
+
+    The indexer works through the repository by priority tier (overview, core packages,
+    other files, tests) and publishes a partial index as tiers complete. The first one
+    is saved and returned, so the repository can be chatted with while a background
+    thread follows the job and saves each refined index, then the complete one.
+
+    Args:
+        folder_path: Repository root, as seen by the indexer service
+        gemini_api_key: Gemini API key forwarded to the indexer
+        save_index: Writes an index (partial or complete) to the repository's JSONs
+        documentation_path: Docstrings JSON of the repository, marked as partial until
+            the complete index is saved
+        on_complete: Called once the complete index is saved and no longer marked as partial
+
+    Returns:
+        The first partial index, or the complete one if the job finished before publishing any
+    """
+    if INDEXER_EARLY_PUBLICATION.lower() == "off":
+        index = call_indexer_service(folder_path, gemini_api_key)
+        save_index(index)
+        if on_complete:
+            on_complete()
+        return index
+
+    marker = _partial_marker(documentation_path)
+    first_index = queue.Queue(maxsize=1)
+    returned = threading.Event()
+
+    def on_partial(index):
+        # Saved from the thread of the job only, so a partial index never overwrites a later one
+        with _refining_lock:
+            _refining_indexes.add(str(documentation_path))
+        marker.touch()
+        save_index(index)
+        if not returned.is_set():
+            returned.set()
+            first_index.put(("index", index))
+
+    def follow_job():
+        try:
+            index = call_indexer_service(folder_path, gemini_api_key, on_partial=on_partial)
+            save_index(index)
+            marker.unlink(missing_ok=True)
+            if on_complete:
+                on_complete()
+            if returned.is_set():
+                logger.info(f"Complete index of {folder_path} saved")
+            else:
+                returned.set()
+                first_index.put(("index", index))
+        except Exception as e:
+            if returned.is_set():
+                logger.error(f"Indexing of {folder_path} failed after a partial index was published: {e}")
+            else:
+                returned.set()
+                first_index.put(("error", e))
+        finally:
+            with _refining_lock:
+                _refining_indexes.discard(str(documentation_path))
+
+    threading.Thread(target=follow_job, name=f"index-{Path(folder_path).name}", daemon=True).start()
+    kind, value = first_index.get()
+    if kind == "error":
+        raise value
+    return value
+
+
+def merge_index_entries(
+    existing_entries: List[dict],
+    new_entries: List[dict],
+    removed_paths: set,
+    repo_root: Path,
+) -> List[dict]:
+    """
+    Merge freshly indexed entries into an existing index section with stable file ids.
+
+    file_id is the position of an entry in its list, so ids are kept stable by
+    reusing slots: an updated file keeps its slot, a new file fills the slot of a
+    removed one, and only when removals outnumber additions are entries moved from
+    the tail of the list into the remaining holes.
+
+    Args:
+        existing_entries: Current entries of the section
+        new_entries: Entries returned by the indexer for the re-indexed files
+        removed_paths: Paths (relative to repo_root) whose entries must be dropped
+        repo_root: Repository root used to compare paths
+
+    Returns:
+        The merged list of entries, with file_id equal to each entry position
+    """
+    def relative_key(file_path: str) -> str:
+        return os.path.relpath(file_path, repo_root)
+
+    merged = list(existing_entries)
+    slot_by_path = {
+        relative_key(entry["file_paths"]): index
+        for index, entry in enumerate(merged)
+        if "file_paths" in entry
+    }
+
+    free_slots = []
+    for path in removed_paths:
+        index = slot_by_path.pop(path, None)
+        if index is not None:
+            merged[index] = None
+            free_slots.append(index)
+    free_slots.sort(reverse=True)
+
+    for entry in new_entries:
+        path = relative_key(entry["file_paths"])
+        if path in slot_by_path:
+            index = slot_by_path[path]
+        elif free_slots:
+            index = free_slots.pop()
+        else:
+            merged.append(None)
+            index = len(merged) - 1
+        slot_by_path[path] = index
+        entry["file_id"] = index
+        merged[index] = entry
+
+    # Fill the remaining holes with entries taken from the tail of the list
+    for hole in sorted(free_slots):
+        while merged and merged[-1] is None:
+            merged.pop()
+        if hole >= len(merged):
+            break
+        entry = merged.pop()
+        entry["file_id"] = hole
+        merged[hole] = entry
+    while merged and merged[-1] is None:
+        merged.pop()
+
+    return merged
+
+
+def update_repository_index(
+    repo_name: str,
+    repo_path: Path,
+    reindexed_files: List[str],
+    deleted_files: List[str],
+    gemini_api_key: str,
+    renamed_files: Optional[List[Tuple[str, str]]] = None,
+) -> None:
+    """
+    Incrementally update the docstrings/documentation/config JSONs of a repository.
+
+    Only the re-indexed files are sent to the indexer, so the cost of an update grows
+    with the size of the diff rather than the size of the repository.
+
+    Args:
+        repo_name: Name of the repository
+        repo_path: Repository root, already holding the new content
+        reindexed_files: Changed and added files, relative to repo_path
+        deleted_files: Deleted files, relative to repo_path
+        gemini_api_key: Gemini API key forwarded to the indexer
+        renamed_files: (old_path, new_path) pairs whose existing entries are moved to
+            the new path instead of being summarized again
+    """
+    if reindexed_files:
+        logger.info(f"Calling classifier service for {len(reindexed_files)} files of {repo_path}")
+        response_data = call_indexer_service(repo_path, gemini_api_key, files=reindexed_files)
+    else:
+        response_data = {}
+
+    sections = {
+        "documentation": Path(f"/app/docstrings_json/{repo_name}.json"),
+        "documentation_md": Path(f"/app/ducomentations_json/{repo_name}.json"),
+        "config": Path(f"/app/configs_json/{repo_name}.json"),
+    }
+
+    stale_paths = set(deleted_files) | set(reindexed_files)
+    for section, json_path in sections.items():
+        json_path.parent.mkdir(parents=True, exist_ok=True)
+        section_json = {section: []}
+        if json_path.exists():
+            with open(json_path, "r") as f:
+                section_json = json.load(f)
+
+        # Renamed files keep their summary, only their path and name change
+        for old_path, new_path in renamed_files or []:
+            for entry in section_json.get(section, []):
+                if "file_paths" in entry and os.path.relpath(entry["file_paths"], repo_path) == old_path:
+                    entry["file_paths"] = str(repo_path / new_path)
+                    entry["file_name"] = os.path.basename(new_path)
+
+        new_entries = response_data.get(section, [])
+        # A re-indexed file may have moved to another section or failed to summarize,
+        # so its old entry goes away unless the indexer returned a new one for this section
+        refreshed_paths = {os.path.relpath(entry["file_paths"], repo_path) for entry in new_entries}
+        section_json[section] = merge_index_entries(
+            section_json.get(section, []),
+            new_entries,
+            stale_paths - refreshed_paths,
+            repo_path,
+        )
+
+        with open(json_path, "w") as f:
+            json.dump(section_json, f, indent=4)
+
+    logger.info(
+        f"Updated index of {repo_name}: {len(reindexed_files)} files re-indexed, "
+        f"{len(deleted_files)} removed, {len(renamed_files or [])} renamed"
+    )
+
+
+def create_repository_cache(repo_name: str, gemini_api_key: str = None, repo_path: Optional[Path] = None) -> str:
+    """
+    Create the context cache of a repository from its persisted docstrings JSON.
+
+    Args:
+        repo_name: Name of the repository
+        gemini_api_key: Gemini API key used to create the cache
+        repo_path: Repository the JSON was built from, whose current version is
+            recorded with the cache
+
+    Returns:
+        cache_name: The name of the created cache
+    """
+    with open(Path(f"/app/docstrings_json/{repo_name}.json"), "r") as f:
+        documentation_json = json.load(f)
+
+    system_prompt = """
+# Context
+You are an expert Software developer with a deep understanding of the software development lifecycle, including requirements gathering, design, implementation, testing, and deployment.
+Your task is to answer any question related to the documentation of the python repository repository_name that you have in your context.
+
+
+""".replace("repository_name", repo_name)
+
+    documentation_str = documentation_payload(repo_name, documentation_json)
+    return create_cache(repo_name, documentation_str, system_prompt, gemini_api_key, repo_path)
+
+
+def reindex_repository(repo_name: str, repo_path: Path, gemini_api_key: str) -> str:
+    """
+    Index a repository from scratch and create its context cache.
+
+    Used when its JSONs cannot be updated incrementally: they are missing, or hold a
+    partial index left behind by a process that stopped before completing it.
+
+    Args:
+        repo_name: Name of the repository
+        repo_path: Repository root, already holding the content to index
+        gemini_api_key: Gemini API key
+
+    Returns:
+        cache_name: The name of the cache of the repository
+    """
+    documentation_path = Path(f"/app/docstrings_json/{repo_name}.json")
+    documentation_md_path = Path(f"/app/ducomentations_json/{repo_name}.json")
+    config_path = Path(f"/app/configs_json/{repo_name}.json")
+    for path in (documentation_path, documentation_md_path, config_path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+    logger.info(f"Indexing {repo_name} from scratch")
+    index_repository(
+        repo_path,
+        gemini_api_key,
+        lambda index: save_index_files(index, documentation_path, documentation_md_path, config_path),
+        documentation_path,
+        on_complete=_commit_recorder(repo_name, repo_path),
+    )
+    return create_repository_cache(repo_name, gemini_api_key, repo_path)
+
+
+def publish_commit(repo_path: Path, commit: str) -> Path:
+    """
+    Make a commit of a clone the current version of the repository.
+
+    The commit is checked out in a staged clone which is then swapped in with
+    publish_version, so the working tree readers go through is never reset in place.
+    The git objects, and the files the commit leaves untouched, are hardlinked from the
+    current version.
+
+    Args:
+        repo_path: <repository_folder>/<repo>, a clone already holding commit
+        commit: Commit to publish
+
+    Returns:
+        The new version directory
+    """
+    repo_path = Path(repo_path)
+    changes = diff_commits(repo_path, get_head_commit(repo_path), commit)
+    modified = set(changes.changed) | set(changes.added) | {new_path for _, new_path in changes.renamed}
+    staging_root = versions_root(repo_path).parent
+    staging_root.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=staging_root) as staging_dir:
+        clone_dir = Path(staging_dir) / repo_path.name
+        clone_at_commit(repo_path, commit, clone_dir)
+        unchanged_files = set(object_files(clone_dir)) | (set(tracked_files(clone_dir)) - modified)
+        return publish_version(repo_path, clone_dir, unchanged_files)
+
+
+def process_git_repository(repo_name: str, repo_path: Path, gemini_api_key: str) -> str:
+    """
+    Refresh a repository cloned from a URL using git instead of hashing its files.
+
+    The existing clone is fetched and `git diff --name-status` between the indexed
+    commit and the new one gives the changed/added/deleted/renamed files directly. The
+    new commit is published as a new version of the repository (see publish_commit).
+
+    Args:
+        repo_name: Name of the repository
+        repo_path: Path to the existing clone
+        gemini_api_key: Gemini API key
+
+    Returns:
+        cache_name: The name of the cache for the updated repository
+
+    Raises:
+        subprocess.CalledProcessError: If a git command fails
+    """
+    documentation_path = Path(f"/app/docstrings_json/{repo_name}.json")
+    # Repositories indexed before commits were recorded were indexed at their checked-out HEAD
+    old_commit = read_indexed_commit(repo_name) or get_head_commit(repo_path)
+    new_commit = fetch_latest_commit(repo_path)
+
+    if not has_usable_index(documentation_path):
+        # No diff applies to a partial index left behind, only its complete version would do
+        logger.info(f"Index of {repo_name} is missing or incomplete, indexing it again")
+        if new_commit != get_head_commit(repo_path):
+            publish_commit(repo_path, new_commit)
+        return reindex_repository(repo_name, repo_path, gemini_api_key)
+
+    if old_commit == new_commit:
+        logger.info(f"{repo_name} is already indexed at {new_commit}, using existing cached data")
+        if index_is_complete(documentation_path):
+            record_indexed_commit(repo_name, new_commit)
+        return create_repository_cache(repo_name, gemini_api_key, repo_path)
+
+    changes = diff_commits(repo_path, old_commit, new_commit)
+    logger.info(
+        f"{repo_name} {old_commit[:8]}..{new_commit[:8]}: {len(changes.changed)} changed, "
+        f"{len(changes.added)} added, {len(changes.deleted)} deleted, {len(changes.renamed)} renamed"
+    )
+
+    publish_commit(repo_path, new_commit)
+    update_repository_index(
+        repo_name,
+        repo_path,
+        changes.changed + changes.added,
+        changes.deleted,
+        gemini_api_key,
+        renamed_files=changes.renamed,
+    )
+    if index_is_complete(documentation_path):
+        record_indexed_commit(repo_name, new_commit)
+
+    return create_repository_cache(repo_name, gemini_api_key, repo_path)
+
 
 def process_changed_repository(repo_name: str, new_repo_path: Path, existing_repo_path: Path, gemini_api_key: str, anthropic_api_key: str = None, openai_api_key: str = None) -> str:
     """
@@ -531,185 +1027,51 @@ def process_changed_repository(repo_name: str, new_repo_path: Path, existing_rep
     logger.info(f"Detecting changes between existing repo and new repo: {repo_name}")
     
     try:
-        # Compare directories to find changes
-        changed_files, added_files, deleted_files = compare_directories(new_repo_path, existing_repo_path)
+        # Compare directories to find changes, the manifest being the source of truth
+        manifest_path = get_manifest_path(repo_name)
+        new_manifest, existing_manifest, (changed_files, added_files, deleted_files) = compare_manifests(
+            new_repo_path, existing_repo_path, manifest_path
+        )
         
         # Log what we found
         logger.info(f"Found {len(changed_files)} changed files, {len(added_files)} added files, and {len(deleted_files)} deleted files")
+        documentation_path = Path(f"/app/docstrings_json/{repo_name}.json")
+        usable_index = has_usable_index(documentation_path)
         
-        if not changed_files and not added_files and not deleted_files:
+        if not changed_files and not added_files and not deleted_files and usable_index:
             logger.info(f"No changes detected for {repo_name}, using existing cached data")
-            # If no changes, load existing documentation and return existing cache
-            documentation_path = Path(f"docstrings_json/{repo_name}.json")
-            with open(documentation_path, "r") as f:
-                documentation_json = json.load(f)
-                
-            # Create system prompt and cache with existing data
-            system_prompt = """
-# Context
-You are an expert Software developer with a deep understanding of the software development lifecycle, including requirements gathering, design, implementation, testing, and deployment.
-Your task is to answer any question related to the documentation of the python repository repository_name that you have in your context.
-
-
-""".replace("repository_name", repo_name)
-            
-            documentation_str = str(documentation_json)
-            from src.core.init_repo import create_cache
-            cache_name = create_cache(repo_name, documentation_str, system_prompt, gemini_api_key)
-            
-            return cache_name
-        
-        # If we have changes, process only those files
-        # Create temporary directory within repository_folder instead of system default temp location
-        target_base_path = Path("/app/repository_folder")
-        temp_dir = target_base_path / f"temp_{repo_name}_changes"
-        
-        # Ensure the directory doesn't exist (clean state)
-        if temp_dir.exists():
-            shutil.rmtree(temp_dir)
-        
-        # Create the directory
-        temp_dir.mkdir(parents=True, exist_ok=True)
+            save_manifest(manifest_path, existing_manifest)
+            return create_repository_cache(repo_name, gemini_api_key, existing_repo_path)
         
-        try:
-            # Create a temporary folder with only changed/added files
-            # Replace the old repository with the new one first
-            logger.info(f"Replacing content at {existing_repo_path} with content from {new_repo_path}")
-            if existing_repo_path.exists(): # Ensure it exists before removing
-                shutil.rmtree(existing_repo_path)
-            shutil.copytree(new_repo_path, existing_repo_path)
-            logger.info(f"Updated repository content at {existing_repo_path}")
-
-            # Replace the old repository with the new one first
-            logger.info(f"Replacing content at {existing_repo_path} with content from {new_repo_path}")
-            if existing_repo_path.exists(): # Ensure it exists before removing
-                shutil.rmtree(existing_repo_path)
-            shutil.copytree(new_repo_path, existing_repo_path)
-            logger.info(f"Updated repository content at {existing_repo_path}")
-
-            path_mapping = prepare_temp_folder_for_changes(
-                changed_files, added_files, new_repo_path, temp_dir
-            )
-            
-            logger.info(f"Created temporary folder with {len(path_mapping)} files for classification at {temp_dir}")
-            
-            # Call classifier on the updated repository in the shared volume
-            url_file_classification = "http://localhost:8002/score"
-            logger.info(f"Calling classifier service for updated repo at {existing_repo_path}")
-            response = requests.post(
-                url_file_classification, json={
-                    "folder_path": str(existing_repo_path), 
-                    "batch_size": 50,
-                    "max_workers": 10,
-                    "GEMINI_API_KEY": gemini_api_key,
-                    "ANTHROPIC_API_KEY": "",
-                    "OPENAI_API_KEY": ""
-                } # Use the path in the shared volume
-            )
-            
-            if response.status_code != 200:
-                raise Exception(f"Classifier service failed with status {response.status_code}.")
-                
-            response_result = response.json()
-            response_data = response_result["result"]
-            
-            # Load existing JSON files using absolute paths
-            documentation_path = Path(f"/app/docstrings_json/{repo_name}.json")
-            documentation_md_path = Path(f"/app/ducomentations_json/{repo_name}.json")
-            config_path = Path(f"/app/configs_json/{repo_name}.json")
-            
-            # Ensure parent directories exist
-            documentation_path.parent.mkdir(parents=True, exist_ok=True)
-            documentation_md_path.parent.mkdir(parents=True, exist_ok=True)
-            config_path.parent.mkdir(parents=True, exist_ok=True)
-            
-            with open(documentation_path, "r") as f1:
-                documentation_json = json.load(f1)
-            with open(documentation_md_path, "r") as f2:
-                documentation_md_json = json.load(f2)
-            with open(config_path, "r") as f3:
-                config_json = json.load(f3)
-                
-            # Update JSONs with new data
-            # 1. Remove entries for deleted files
-            deleted_rel_paths = [str(f.relative_to(existing_repo_path)) for f in deleted_files]
-            
-            # Handle docstrings_json (documentation)
-            if "documentation" in documentation_json:
-                updated_docs = []
-                for item in documentation_json["documentation"]:
-                    if "file_paths" in item and not any(item["file_paths"].endswith(deleted_path) for deleted_path in deleted_rel_paths):
-                        updated_docs.append(item)
-                documentation_json["documentation"] = updated_docs
-            
-            # Handle documentation_md
-            if "documentation_md" in documentation_md_json:
-                updated_md_docs = []
-                for item in documentation_md_json["documentation_md"]:
-                    if "file_paths" in item and not any(item["file_paths"].endswith(deleted_path) for deleted_path in deleted_rel_paths):
-                        updated_md_docs.append(item)
-                documentation_md_json["documentation_md"] = updated_md_docs
-            
-            # Handle configs
-            if "config" in config_json:
-                updated_configs = []
-                for item in config_json["config"]:
-                    if "file_paths" in item and not any(item["file_paths"].endswith(deleted_path) for deleted_path in deleted_rel_paths):
-                        updated_configs.append(item)
-                config_json["config"] = updated_configs
-            
-            # 2. Add new entries for changed/added files
-            # Map temporary paths back to original paths for proper integration
-            if "documentation" in response_data:
-                for item in response_data["documentation"]:
-                    if "file_paths" in item and item["file_paths"] in path_mapping:
-                        # Replace temp path with original path
-                        item["file_paths"] = path_mapping[item["file_paths"]]
-                        # Add to existing documentation
-                        documentation_json["documentation"].append(item)
-            
-            if "documentation_md" in response_data:
-                for item in response_data["documentation_md"]:
-                    if "file_paths" in item and item["file_paths"] in path_mapping:
-                        item["file_paths"] = path_mapping[item["file_paths"]]
-                        documentation_md_json["documentation_md"].append(item)
-                        
-            if "config" in response_data:
-                for item in response_data["config"]:
-                    if "file_paths" in item and item["file_paths"] in path_mapping:
-                        item["file_paths"] = path_mapping[item["file_paths"]]
-                        config_json["config"].append(item)
-            
-            # Save updated JSONs using absolute paths
-            with open(documentation_path, "w") as f1:
-                json.dump(documentation_json, f1, indent=4)
-            with open(documentation_md_path, "w") as f2:
-                json.dump(documentation_md_json, f2, indent=4)
-            with open(config_path, "w") as f3:
-                json.dump(config_json, f3, indent=4)
-            
-            # Create system prompt and cache
-            system_prompt = """
-# Context
-You are an expert Software developer with a deep understanding of the software development lifecycle, including requirements gathering, design, implementation, testing, and deployment.
-Your task is to answer any question related to the documentation of the python repository repository_name that you have in your context.
+        # Switch to a new version of the repository, unchanged files being hardlinked from the current one
+        logger.info(f"Replacing content at {existing_repo_path} with content from {new_repo_path}")
+        unchanged_files = set(new_manifest) - set(changed_files) - set(added_files)
+        publish_version(existing_repo_path, new_repo_path, unchanged_files)
+        logger.info(f"Updated repository content at {existing_repo_path}")
+
+        # Linked files keep the stat of the previous version and copied ones (copy2) that of
+        # the new tree, so the hashes of both manifests carry over
+        linked_entries = {path: existing_manifest[path] for path in unchanged_files if path in existing_manifest}
+        save_manifest(manifest_path, scan_directory(existing_repo_path, previous={**new_manifest, **linked_entries}))
+
+        if not usable_index:
+            # No delta applies to a partial index left behind, only its complete version would do
+            logger.info(f"Index of {repo_name} is missing or incomplete, indexing it again")
+            return reindex_repository(repo_name, existing_repo_path, gemini_api_key)
+
+        # Index only the delta, from the updated repository in the shared volume
+        update_repository_index(
+            repo_name,
+            existing_repo_path,
+            changed_files + added_files,
+            deleted_files,
+            gemini_api_key,
+        )
 
+        if index_is_complete(documentation_path) and is_git_repository(existing_repo_path):
+            record_indexed_commit(repo_name, get_head_commit(existing_repo_path))
 
-""".replace("repository_name", repo_name)
-            
-            documentation_str = str(documentation_json)
-            from src.core.init_repo import create_cache
-            cache_name = create_cache(repo_name, documentation_str, system_prompt, gemini_api_key)
-            
-            return cache_name
-        finally:
-            # Clean up the temporary directory
-            if temp_dir.exists():
-                try:
-                    shutil.rmtree(temp_dir)
-                    logger.info(f"Cleaned up temporary directory: {temp_dir}")
-                except Exception as cleanup_error:
-                    logger.warning(f"Failed to clean up temporary directory {temp_dir}: {cleanup_error}")
+        return create_repository_cache(repo_name, gemini_api_key, existing_repo_path)
     
     except Exception as e:
         logger.error(f"Error processing changed repository {repo_name}: {str(e)}", exc_info=True)
@@ -738,7 +1100,15 @@ def init_repo(repo_link, gemini_api_key=None):
         target_base_path = Path("/app/repository_folder")
         target_repo_path = target_base_path / repo_name
         
-        if target_repo_path.exists():
+        cache_name = None
+        if target_repo_path.exists() and is_git_repository(target_repo_path):
+            logger.info(f"Repository already exists: {repo_name}. Checking for changes with git...")
+            try:
+                cache_name = process_git_repository(repo_name, target_repo_path, gemini_api_key)
+            except subprocess.CalledProcessError as e:
+                logger.warning(f"Git change detection failed for {repo_name}, falling back to a fresh clone: {e.stderr}")
+
+        if cache_name is None and target_repo_path.exists():
             logger.info(f"Repository already exists: {repo_name}. Checking for changes...")
             
             # Create a temporary directory for the new repository
@@ -757,7 +1127,7 @@ def init_repo(repo_link, gemini_api_key=None):
                     target_repo_path,
                     gemini_api_key,
                 )
-        else:
+        elif cache_name is None:
             # Repository doesn't exist, process normally
             cache_name = process_repo_link(repo_link, gemini_api_key)
             
@@ -895,17 +1265,11 @@ def handle_zip_upload(uploaded_zip_file, gemini_api_key=None):
             except Exception as log_e:
                 logger.warning(f"Could not log source directory contents: {log_e}")
 
-            # Remove existing target directory if it exists to ensure fresh copy
-            if target_repo_path.exists():
-                logger.warning(f"Removing existing folder at target: {target_repo_path}")
-                shutil.rmtree(target_repo_path)
-
             # Update status before copy
             yield repo_params_error, f"Copying folder '{repo_name}'..."
 
-            # Copy the uploaded folder contents to the target path
-            # shutil.copytree is suitable for copying directories
-            shutil.copytree(temp_source_dir, target_repo_path)
+            # Copy the uploaded folder contents as the first version of the repository
+            publish_version(target_repo_path, temp_source_dir)
             logger.info(f"Successfully copied folder to {target_repo_path}")
 
             # --- Logging after copy ---
@@ -0,0 +1,209 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+import google.generativeai as genai
+import instructor
+from google.ai import generativelanguage as glm
+from google.api_core import client_options as client_options_lib
+from google.generativeai import caching
+
+logger = logging.getLogger(__name__)
+
+# Clients kept per process; the least recently used one is dropped beyond this
+DEFAULT_LLM_CLIENT_POOL_SIZE = 256
+# Version of google-generativeai whose private parts the pool was checked against (see requirements.txt)
+GENAI_TESTED_VERSION = "0.8.3"
+
+
+def check_genai_internals():
+    """
+    Fail loudly if the private parts of google-generativeai the pool relies on have moved.
+
+    GenerativeModel takes no client, so the pool sets its _client, and a cache fetched
+    through a pooled client only becomes a caching.CachedContent with
+    CachedContent._from_obj. Both are checked when the module is imported rather than
+    on the first request.
+
+    Raises:
+        ImportError: If one of them is missing
+    """
+    model = genai.GenerativeModel(model_name="models/internals-check")
+    missing = [
+        name
+        for name, present in (
+            ("GenerativeModel._client", "_client" in vars(model)),
+            ("caching.CachedContent._from_obj", callable(getattr(caching.CachedContent, "_from_obj", None))),
+        )
+        if not present
+    ]
+    version = getattr(genai, "__version__", "unknown")
+    if missing:
+        raise ImportError(
+            f"google-generativeai {version} has no {', '.join(missing)}, which LLMClientPool relies on "
+            f"(checked against {GENAI_TESTED_VERSION})"
+        )
+    if version != GENAI_TESTED_VERSION:
+        logger.warning(f"google-generativeai {version} is not the version LLMClientPool was checked against ({GENAI_TESTED_VERSION})")
+
+
+class LLMClientPool:
+    """
+    Process-wide pool of LLM clients, built once and reused across requests.
+
+    Clients are keyed by (provider, API key, model, mode), so requests carrying different
+    API keys get distinct clients and never go through the process-global
+    genai.configure(), which concurrent requests would otherwise race on. Gemini models
+    of the same API key share one transport (gRPC channel).
+    """
+
+    def __init__(self, max_size: Optional[int] = None):
+        self.max_size = int(max_size or os.getenv("LLM_CLIENT_POOL_SIZE", DEFAULT_LLM_CLIENT_POOL_SIZE))
+        self._lock = threading.RLock()  # Factories may build the clients they wrap through the pool
+        self._clients: "OrderedDict[tuple, Any]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _get_or_create(self, key: tuple, factory: Callable[[], Any]) -> Any:
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                self._clients.move_to_end(key)
+                self.hits += 1
+                return client
+            self.misses += 1
+            client = factory()
+            self._clients[key] = client
+            if len(self._clients) > self.max_size:
+                self._clients.popitem(last=False)
+            return client
+
+    @staticmethod
+    def _gemini_key(api_key: str) -> str:
+        # An empty key means the key of the environment, as genai.configure() without arguments
+        return api_key or os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY") or ""
+
+    def gemini_transport(self, api_key: str = "") -> glm.GenerativeServiceClient:
+        """Return the generative service client authenticated with api_key."""
+        api_key = self._gemini_key(api_key)
+        return self._get_or_create(
+            ("gemini", api_key, None, "transport"),
+            lambda: glm.GenerativeServiceClient(client_options=client_options_lib.ClientOptions(api_key=api_key)),
+        )
+
+    def gemini_cache_client(self, api_key: str = "") -> glm.CacheServiceClient:
+        """Return the context caching service client authenticated with api_key."""
+        api_key = self._gemini_key(api_key)
+        return self._get_or_create(
+            ("gemini", api_key, None, "cache"),
+            lambda: glm.CacheServiceClient(client_options=client_options_lib.ClientOptions(api_key=api_key)),
+        )
+
+    def _bind(self, model: genai.GenerativeModel, api_key: str) -> genai.GenerativeModel:
+        # GenerativeModel falls back to the global default client only while _client is unset;
+        # private, hence check_genai_internals()
+        model._client = self.gemini_transport(api_key)
+        return model
+
+    def gemini_model(
+        self,
+        api_key: str,
+        model_name: str,
+        safety_settings=None,
+        generation_config: Optional[dict] = None,
+    ) -> genai.GenerativeModel:
+        """
+        Return a GenerativeModel bound to api_key.
+
+        Args:
+            api_key (str): Gemini API key of the request, empty for the environment's
+            model_name (str): Name of the model
+            safety_settings: Safety settings of the model
+            generation_config (Optional[dict]): Default generation config of the model
+
+        Returns:
+            genai.GenerativeModel: The shared model
+        """
+        settings = repr((safety_settings, generation_config))
+        return self._get_or_create(
+            ("gemini", self._gemini_key(api_key), model_name, "raw", settings),
+            lambda: self._bind(
+                genai.GenerativeModel(
+                    model_name=model_name,
+                    safety_settings=safety_settings,
+                    generation_config=generation_config,
+                ),
+                api_key,
+            ),
+        )
+
+    def gemini_instructor(
+        self,
+        api_key: str,
+        model_name: str,
+        safety_settings=None,
+        mode=instructor.Mode.GEMINI_JSON,
+    ):
+        """
+        Return an instructor client over a GenerativeModel bound to api_key.
+
+        Args:
+            api_key (str): Gemini API key of the request, empty for the environment's
+            model_name (str): Name of the model
+            safety_settings: Safety settings of the model
+            mode: Instructor mode
+
+        Returns:
+            instructor.Instructor: The shared client
+        """
+        return self._get_or_create(
+            ("gemini", self._gemini_key(api_key), model_name, mode, repr(safety_settings)),
+            lambda: instructor.from_gemini(
+                client=self.gemini_model(api_key, model_name, safety_settings),
+                mode=mode,
+            ),
+        )
+
+    def gemini_cached_instructor(
+        self,
+        api_key: str,
+        cache_name: str,
+        safety_settings=None,
+        mode=instructor.Mode.GEMINI_JSON,
+    ):
+        """
+        Return an instructor client over the model of a Gemini context cache.
+
+        Caches expire, so this client is not pooled: the cache is looked up on every call,
+        through the pooled cache client of api_key.
+        """
+        cache = caching.CachedContent._from_obj(
+            self.gemini_cache_client(api_key).get_cached_content(name=cache_name)
+        )
+        model = genai.GenerativeModel.from_cached_content(cached_content=cache, safety_settings=safety_settings)
+        return instructor.from_gemini(client=self._bind(model, api_key), mode=mode)
+
+    def openai(self, api_key: str):
+        """Return the OpenAI client of api_key."""
+        from openai import OpenAI
+
+        return self._get_or_create(("openai", api_key, None, None), lambda: OpenAI(api_key=api_key))
+
+    def anthropic(self, api_key: str, timeout=None):
+        """Return the Anthropic client of api_key."""
+        from anthropic import Anthropic
+
+        return self._get_or_create(
+            ("anthropic", api_key, None, None, repr(timeout)),
+            lambda: Anthropic(api_key=api_key, **({"timeout": timeout} if timeout is not None else {})),
+        )
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"clients": len(self._clients), "hits": self.hits, "misses": self.misses}
+
+
+check_genai_internals()
+llm_client_pool = LLMClientPool()
@@ -0,0 +1,192 @@
+import hashlib
+import json
+import logging
+import mmap
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+# Large reads amortize syscalls; files above the mmap threshold are hashed straight from the page cache
+HASH_CHUNK_SIZE = 1024 * 1024
+MMAP_THRESHOLD = 64 * 1024 * 1024
+IGNORED_DIRECTORIES = {".git"}
+
+
+@dataclass
+class ManifestEntry:
+    """Stat information and content hash of one file of a repository."""
+
+    size: int
+    mtime_ns: int
+    hash: Optional[str] = None
+
+
+def hash_file(file_path: Path) -> str:
+    """
+    Calculate the MD5 hash of a file content.
+
+    Args:
+        file_path: Path of the file to hash
+
+    Returns:
+        The hex digest, or an empty string if the file cannot be read
+    """
+    hash_md5 = hashlib.md5()
+    try:
+        with open(file_path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size >= MMAP_THRESHOLD:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    hash_md5.update(mapped)
+            else:
+                buffer = bytearray(HASH_CHUNK_SIZE)
+                view = memoryview(buffer)
+                while True:
+                    read = f.readinto(buffer)
+                    if not read:
+                        break
+                    hash_md5.update(view[:read])
+        return hash_md5.hexdigest()
+    except Exception as e:
+        logger.error(f"Error hashing file {file_path}: {e}")
+        return ""
+
+
+def load_manifest(manifest_path: Path) -> Dict[str, ManifestEntry]:
+    """
+    Load a persisted manifest.
+
+    Args:
+        manifest_path: Path of the manifest JSON file
+
+    Returns:
+        Mapping of relative file path to its entry, empty if the manifest is missing or unreadable
+    """
+    if not manifest_path or not Path(manifest_path).exists():
+        return {}
+    try:
+        with open(manifest_path, "r") as f:
+            data = json.load(f)
+        if data.get("version") != MANIFEST_VERSION:
+            return {}
+        return {
+            path: ManifestEntry(size, mtime_ns, file_hash)
+            for path, (size, mtime_ns, file_hash) in data["files"].items()
+        }
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable manifest {manifest_path}: {e}")
+        return {}
+
+
+def save_manifest(manifest_path: Path, manifest: Dict[str, ManifestEntry]) -> None:
+    """
+    Atomically persist a manifest.
+
+    Args:
+        manifest_path: Path of the manifest JSON file
+        manifest: Mapping of relative file path to its entry
+    """
+    manifest_path = Path(manifest_path)
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    data = {
+        "version": MANIFEST_VERSION,
+        "files": {
+            path: [entry.size, entry.mtime_ns, entry.hash]
+            for path, entry in sorted(manifest.items())
+        },
+    }
+    fd, tmp_path = tempfile.mkstemp(dir=manifest_path.parent, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, manifest_path)
+
+
+def scan_directory(
+    root: Path,
+    previous: Optional[Dict[str, ManifestEntry]] = None,
+    reference: Optional[Dict[str, ManifestEntry]] = None,
+    max_workers: Optional[int] = None,
+) -> Dict[str, ManifestEntry]:
+    """
+    Build the manifest of a directory, hashing as few files as possible.
+
+    Files whose size and mtime match their entry in `previous` keep the stored hash.
+    Files whose size differs from their entry in `reference` are known to have changed
+    against it, so their hash is left empty instead of being computed now. Every other
+    file is hashed, in parallel.
+
+    Args:
+        root: Directory to scan
+        previous: Earlier manifest of the same directory
+        reference: Manifest of the tree this directory will be compared with
+        max_workers: Number of hashing threads
+
+    Returns:
+        Mapping of relative (POSIX) file path to its entry
+    """
+    root = Path(root)
+    previous = previous or {}
+    reference = reference or {}
+    manifest: Dict[str, ManifestEntry] = {}
+    to_hash: List[Tuple[str, Path]] = []
+
+    for dirpath, dirnames, filenames in os.walk(root):
+        # Prune ignored directories instead of walking into them
+        dirnames[:] = [d for d in dirnames if d not in IGNORED_DIRECTORIES]
+        for filename in filenames:
+            full_path = Path(dirpath) / filename
+            try:
+                stat = full_path.stat()
+            except OSError:
+                continue
+            relative_path = full_path.relative_to(root).as_posix()
+            entry = ManifestEntry(stat.st_size, stat.st_mtime_ns)
+            known = previous.get(relative_path)
+            other = reference.get(relative_path)
+            if known and known.hash and known.size == entry.size and known.mtime_ns == entry.mtime_ns:
+                entry.hash = known.hash
+            elif not (other and other.size != entry.size):
+                to_hash.append((relative_path, full_path))
+            manifest[relative_path] = entry
+
+    if to_hash:
+        workers = max_workers or min(32, (os.cpu_count() or 1) * 4)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for (relative_path, _), file_hash in zip(
+                to_hash, executor.map(lambda item: hash_file(item[1]), to_hash)
+            ):
+                manifest[relative_path].hash = file_hash
+
+    logger.info(f"Scanned {len(manifest)} files under {root}, hashed {len(to_hash)}")
+    return manifest
+
+
+def diff_manifests(
+    new_manifest: Dict[str, ManifestEntry],
+    old_manifest: Dict[str, ManifestEntry],
+) -> Tuple[List[str], List[str], List[str]]:
+    """
+    Compare two manifests.
+
+    Args:
+        new_manifest: Manifest of the new version of the tree
+        old_manifest: Manifest of the existing version of the tree
+
+    Returns:
+        Tuple of (changed_files, added_files, deleted_files) as relative paths
+    """
+    changed_files = [
+        path
+        for path, entry in new_manifest.items()
+        if path in old_manifest
+        and (entry.size != old_manifest[path].size or entry.hash != old_manifest[path].hash)
+    ]
+    added_files = [path for path in new_manifest if path not in old_manifest]
+    deleted_files = [path for path in old_manifest if path not in new_manifest]
+    return changed_files, added_files, deleted_files
@@ -0,0 +1,185 @@
+import logging
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import Iterable, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Versions of <repository_folder>/<repo> live in <repository_folder>/.versions/<repo>/<version>
+VERSIONS_DIR = ".versions"
+# A replaced version is deleted once it has been out of use for this long, longer than any
+# request reading the repository (the chat requests time out after 300s at most)
+DEFAULT_VERSION_GRACE_SECONDS = float(os.getenv("REPOSITORY_VERSION_GRACE_SECONDS", 900))
+RETIRED_SUFFIX = ".retired"
+
+
+def versions_root(repo_path: Path) -> Path:
+    """Directory holding the versions of a repository."""
+    repo_path = Path(repo_path)
+    return repo_path.parent / VERSIONS_DIR / repo_path.name
+
+
+def current_version(repo_path: Path) -> Optional[Path]:
+    """Version directory repo_path points to, None if it is not versioned."""
+    repo_path = Path(repo_path)
+    if not repo_path.is_symlink():
+        return None
+    return (repo_path.parent / os.readlink(repo_path)).resolve()
+
+
+def _new_version_dir(repo_path: Path) -> Path:
+    return versions_root(repo_path) / f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+
+def _point_to(repo_path: Path, version_dir: Path):
+    """Atomically make repo_path a symlink to version_dir."""
+    # Relative, so the link resolves wherever the shared volume is mounted
+    target = os.path.relpath(version_dir, repo_path.parent)
+    tmp_link = repo_path.parent / f".{repo_path.name}.{uuid.uuid4().hex}.tmp"
+    os.symlink(target, tmp_link)
+    os.replace(tmp_link, repo_path)
+
+
+def adopt_repository(repo_path: Path) -> Optional[Path]:
+    """
+    Turn a plain repository directory into the first version of a versioned one.
+
+    The directory is renamed into the versions directory, which moves no data, and
+    repo_path becomes a symlink to it. The path is missing only between the rename and
+    the symlink, once per repository.
+
+    Args:
+        repo_path: <repository_folder>/<repo>
+
+    Returns:
+        The current version directory, None if repo_path does not exist
+    """
+    repo_path = Path(repo_path)
+    if repo_path.is_symlink():
+        return current_version(repo_path)
+    if not repo_path.is_dir():
+        return None
+    version_dir = _new_version_dir(repo_path)
+    version_dir.parent.mkdir(parents=True, exist_ok=True)
+    os.rename(repo_path, version_dir)
+    _point_to(repo_path, version_dir)
+    logger.info(f"Adopted {repo_path} as version {version_dir.name}")
+    return version_dir
+
+
+def stage_version(repo_path: Path, source_dir: Path, unchanged_files: Iterable[str] = ()) -> Path:
+    """
+    Build a new version of a repository from source_dir, without making it current.
+
+    Files listed in unchanged_files are hardlinked from the current version instead of
+    copied, so only the changed files take new space and time. A file that cannot be
+    linked (other filesystem, missing in the current version) is copied.
+
+    Args:
+        repo_path: <repository_folder>/<repo>
+        source_dir: Complete new content of the repository
+        unchanged_files: Paths, relative to the repository root, whose content is the
+            same in source_dir and in the current version
+
+    Returns:
+        The new version directory
+    """
+    repo_path, source_dir = Path(repo_path), Path(source_dir)
+    current = current_version(repo_path)
+    unchanged: Set[str] = set(unchanged_files) if current else set()
+    version_dir = _new_version_dir(repo_path)
+    linked = copied = 0
+
+    for dirpath, dirnames, filenames in os.walk(source_dir):
+        relative_dir = Path(dirpath).relative_to(source_dir)
+        (version_dir / relative_dir).mkdir(parents=True, exist_ok=True)
+        for name in filenames + [d for d in dirnames if (Path(dirpath) / d).is_symlink()]:
+            source = Path(dirpath) / name
+            destination = version_dir / relative_dir / name
+            relative_path = (relative_dir / name).as_posix()
+            if source.is_symlink():
+                os.symlink(os.readlink(source), destination)
+                continue
+            if relative_path in unchanged:
+                try:
+                    os.link(current / relative_path, destination)
+                    linked += 1
+                    continue
+                except OSError:
+                    pass
+            shutil.copy2(source, destination)
+            copied += 1
+        # Symlinked directories were recreated as links, their content is not walked
+        dirnames[:] = [d for d in dirnames if not (Path(dirpath) / d).is_symlink()]
+
+    logger.info(f"Staged version {version_dir.name} of {repo_path.name}: {linked} files linked, {copied} copied")
+    return version_dir
+
+
+def activate_version(repo_path: Path, version_dir: Path) -> Optional[Path]:
+    """
+    Atomically make version_dir the current version of a repository.
+
+    Readers go through repo_path, so each open sees either the previous version or the
+    new one in full, never a partly deleted or copied tree.
+
+    Returns:
+        The version that was current before, None if there was none
+    """
+    repo_path = Path(repo_path)
+    previous = current_version(repo_path)
+    _point_to(repo_path, Path(version_dir))
+    if previous and previous != Path(version_dir).resolve():
+        (previous.parent / f"{previous.name}{RETIRED_SUFFIX}").write_text(str(time.time()))
+    logger.info(f"{repo_path.name} now points to version {Path(version_dir).name}")
+    return previous
+
+
+def collect_versions(repo_path: Path, grace_seconds: float = DEFAULT_VERSION_GRACE_SECONDS) -> int:
+    """
+    Delete the versions of a repository that were replaced more than grace_seconds ago.
+
+    Returns:
+        The number of versions deleted
+    """
+    root = versions_root(repo_path)
+    current = current_version(repo_path)
+    removed = 0
+    for marker in root.glob(f"*{RETIRED_SUFFIX}"):
+        version_dir = root / marker.name[: -len(RETIRED_SUFFIX)]
+        if current and version_dir.resolve() == current:
+            marker.unlink(missing_ok=True)  # Made current again
+            continue
+        try:
+            retired_at = float(marker.read_text())
+        except (OSError, ValueError):
+            retired_at = marker.stat().st_mtime
+        if time.time() - retired_at < grace_seconds:
+            continue
+        shutil.rmtree(version_dir, ignore_errors=True)
+        marker.unlink(missing_ok=True)
+        removed += 1
+        logger.info(f"Deleted version {version_dir.name} of {Path(repo_path).name}")
+    return removed
+
+
+def publish_version(repo_path: Path, source_dir: Path, unchanged_files: Iterable[str] = ()) -> Path:
+    """
+    Stage a new version of a repository, make it current and collect expired versions.
+
+    Args:
+        repo_path: <repository_folder>/<repo>, a plain directory is adopted first
+        source_dir: Complete new content of the repository
+        unchanged_files: Paths whose content did not change, hardlinked instead of copied
+
+    Returns:
+        The new version directory
+    """
+    adopt_repository(repo_path)
+    version_dir = stage_version(repo_path, source_dir, unchanged_files)
+    activate_version(repo_path, version_dir)
+    collect_versions(repo_path)
+    return version_dir
@@ -474,3 +474,77 @@ class YamlBrief(BaseModel):
         default=[],
         description="List of key-value pairs not part of a distinct section",
     )
+
+
+######################################################
+##### complete the descriptions missing from an AST extracted code skeleton
+
+
+class ElementDescription(BaseModel):
+    """
+    Represents the description of one element of a code skeleton.
+    """
+
+    key: str = Field(
+        description="Key of the element, exactly as given",
+        example="method DataStore.calculate_average",
+    )
+    description: str = Field(
+        description="Concise description of the element",
+        example="Calculate the average of a list of numbers",
+    )
+
+
+class MissingDescriptions(BaseModel):
+    """
+    Descriptions of the elements of a code skeleton that have no docstring.
+    """
+
+    descriptions: List[ElementDescription] = Field(
+        description="One description per requested key",
+    )
+
+
+######################################################
+##### summarize several small files in one request
+
+
+def create_packed_summaries_model(summary_model, file_summary_models: Optional[Dict[str, Any]] = None):
+    """
+    Create the response model of a request summarizing several files at once.
+
+    Args:
+        summary_model: Response model of a single file (CodeStructure, DocumentCompression, YamlBrief)
+        file_summary_models: Response model of each file, keyed by file key, whose summary
+            is validated against it too (a CodeStructure checks names against its own file)
+
+    Returns:
+        A PackedSummaries model holding one summary per file key
+    """
+
+    class PackedSummary(BaseModel):
+        """
+        Represents the summary of one file of the request.
+        """
+
+        file_key: str = Field(description="Key of the file, exactly as given", example="0")
+        summary: summary_model = Field(description="Summary of the file")
+
+        @model_validator(mode="after")
+        def check_summary_against_its_file(cls, values):
+            """
+            Validate the summary with the model of its own file, so that a name found in
+            another file of the request is not accepted.
+            """
+            if file_summary_models and values.file_key in file_summary_models:
+                file_summary_models[values.file_key].model_validate(values.summary.model_dump())
+            return values
+
+    class PackedSummaries(BaseModel):
+        """
+        Summaries of all the files of the request.
+        """
+
+        summaries: List[PackedSummary] = Field(description="One summary per file")
+
+    return PackedSummaries
@@ -0,0 +1,48 @@
+import math
+import os
+import re
+
+# Words, numbers and single punctuation characters, the units most tokenizers split on
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+# Average size of a token of source code or prose, used when the text itself is not at hand
+_BYTES_PER_TOKEN = 4
+# Long words are split by BPE tokenizers into pieces of roughly this many characters
+_CHARACTERS_PER_WORD_PIECE = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens of a text without calling a tokenizer.
+
+    Every punctuation character counts as one token and words count as one token per
+    few characters, which tracks code, paths and English prose closely enough to pack
+    requests against a budget.
+
+    Args:
+        text (str): The text to measure
+
+    Returns:
+        int: The estimated number of tokens
+    """
+    if not text:
+        return 0
+    return sum(
+        math.ceil(len(match) / _CHARACTERS_PER_WORD_PIECE) if match[0].isalnum() or match[0] == "_" else 1
+        for match in _TOKEN_PATTERN.findall(text)
+    )
+
+
+def estimate_file_tokens(file_path: str) -> int:
+    """
+    Estimate the number of tokens of a file from its size, without reading it.
+
+    Args:
+        file_path (str): Path of the file
+
+    Returns:
+        int: The estimated number of tokens, 0 if the file cannot be stat'ed
+    """
+    try:
+        return math.ceil(os.path.getsize(file_path) / _BYTES_PER_TOKEN)
+    except OSError:
+        return 0
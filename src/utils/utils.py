@@ -24,20 +24,23 @@ class FileInfo:
 class FunctionVisitor(ast.NodeVisitor):
     """Visiteur AST pour extraire les informations des fonctions."""
 
+    # Description des fonctions sans docstring
+    missing_description = "Pas de description disponible"
+
     def __init__(self):
         self.functions = []
 
-    def visit_FunctionDef(self, node: ast.FunctionDef):
-        """Visite chaque définition de fonction dans l'AST."""
-        # Extraction de la docstring
-        docstring = ast.get_docstring(node) or "Pas de description disponible"
-
-        function_info = {
+    def function_info(self, node) -> Dict[str, str]:
+        """Nom et description (docstring) d'une définition de fonction."""
+        docstring = ast.get_docstring(node) or self.missing_description
+        return {
             "function_name": node.name,
             "function_description": docstring.strip(),
         }
 
-        self.functions.append(function_info)
+    def visit_FunctionDef(self, node: ast.FunctionDef):
+        """Visite chaque définition de fonction dans l'AST."""
+        self.functions.append(self.function_info(node))
 
         # Continue la visite pour les fonctions imbriquées
         self.generic_visit(node)
@@ -114,35 +117,33 @@ for file_info in results:
 # tu peux aussi juste afficher results après l'avoir run
 
 
+# Extensions that map to a single classification label. classify_file labels every other
+# extension "other"; the indexer leaves those to the LLM instead.
+CLASSIFICATION_EXTENSIONS = {
+    "code_file": {
+        ".py", ".pyi", ".java", ".kt", ".scala", ".c", ".h", ".cc", ".cpp", ".hpp", ".cs",
+        ".js", ".jsx", ".mjs", ".cjs", ".ts", ".tsx", ".vue", ".svelte", ".html", ".css",
+        ".scss", ".sass", ".less", ".php", ".rb", ".go", ".rs", ".swift", ".m", ".dart",
+        ".lua", ".pl", ".r", ".jl", ".sh", ".bash", ".zsh", ".ps1",
+    },
+    "doc_file": {".md", ".markdown", ".rst", ".adoc", ".txt", ".rtf", ".doc", ".docx", ".pdf"},
+    "configuration_file": {
+        ".yaml", ".yml", ".toml", ".ini", ".cfg", ".conf", ".json", ".xml", ".properties", ".env",
+    },
+}
+EXTENSION_CLASSIFICATIONS = {
+    extension: classification
+    for classification, extensions in CLASSIFICATION_EXTENSIONS.items()
+    for extension in extensions
+}
+
+
 def classify_file(file_name):
     # Extract file extension
     _, extension = os.path.splitext(file_name.lower())
 
-    # Define file type mappings
-    code_extensions = [
-        ".py",
-        ".java",
-        ".cpp",
-        ".js",
-        ".html",
-        ".css",
-        ".php",
-        ".rb",
-        ".go",
-        ".swift",
-    ]
-    doc_extensions = [".txt", ".doc", ".docx", ".pdf", ".md", ".rtf"]
-    config_extensions = [".json", ".xml", ".yaml", ".yml", ".ini", ".cfg", ".conf"]
-
     # Classify based on extension
-    if extension in code_extensions:
-        return "code_file"
-    elif extension in doc_extensions:
-        return "doc_file"
-    elif extension in config_extensions:
-        return "configuration_file"
-    else:
-        return "other"
+    return EXTENSION_CLASSIFICATIONS.get(extension, "other")
 
 
 import os
@@ -0,0 +1,148 @@
+import os
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("google.ai.generativelanguage")
+pytest.importorskip("google.protobuf")
+
+from src.core import cache_manager as cache_manager_module
+from src.core.cache_manager import CacheLifecycleManager
+from src.core.cache_registry import CacheRegistry
+
+
+class Recreate:
+    """recreate callback of a managed cache, returning cache-1, cache-2..."""
+
+    def __init__(self, release: threading.Event = None):
+        self.calls = 0
+        self.release = release
+
+    def __call__(self):
+        if self.release is not None:
+            self.release.wait(5)
+        self.calls += 1
+        return f"cache-{self.calls}"
+
+
+@pytest.fixture
+def extensions(monkeypatch, tmp_path):
+    """Stubs extend_cache_ttl; set "gone" to make it report the cache as deleted."""
+    calls = {"names": [], "gone": False}
+
+    def extend_cache_ttl(cache_name, api_key="", ttl=0):
+        calls["names"].append(cache_name)
+        return None if calls["gone"] else time.time() + ttl
+
+    monkeypatch.setattr(cache_manager_module, "extend_cache_ttl", extend_cache_ttl)
+    monkeypatch.setattr(cache_manager_module, "cache_registry", CacheRegistry(tmp_path / "registry.json"))
+    return calls
+
+
+def manager() -> CacheLifecycleManager:
+    return CacheLifecycleManager(ttl=1800, renew_margin=300, idle_seconds=3600, interval=3600)
+
+
+def register(manager, recreate, expires_in, idle_for=0.0, source_path=None):
+    manager.register("repo", "cache-0", "key", recreate, source_path)
+    managed = manager._caches["repo"]
+    managed.expire_time = time.time() + expires_in
+    managed.last_used = time.time() - idle_for
+    return managed
+
+
+def wait_ready(managed):
+    assert managed.ready.wait(5)
+
+
+def test_cache_in_use_is_extended_close_to_its_expiry(extensions):
+    lifecycle, recreate = manager(), Recreate()
+    managed = register(lifecycle, recreate, expires_in=60)
+
+    lifecycle.run_once()
+
+    assert extensions["names"] == ["cache-0"]
+    assert managed.expire_time > time.time() + 1700
+    assert (lifecycle.extensions, recreate.calls) == (1, 0)
+
+
+def test_cache_far_from_its_expiry_is_left_alone(extensions):
+    lifecycle, recreate = manager(), Recreate()
+    register(lifecycle, recreate, expires_in=1000)
+
+    lifecycle.run_once()
+
+    assert extensions["names"] == []
+    assert recreate.calls == 0
+
+
+def test_idle_cache_lapses_and_is_recreated_on_the_next_query(extensions, monkeypatch):
+    lifecycle, recreate = manager(), Recreate()
+    managed = register(lifecycle, recreate, expires_in=60, idle_for=7200)
+
+    lifecycle.run_once()
+    assert extensions["names"] == []  # Idle: not extended
+
+    managed.expire_time = time.time() - 1
+    monkeypatch.setattr(lifecycle, "_lookup_expire_time", lambda managed: None)
+    lifecycle.run_once()
+    assert managed.lapsed and recreate.calls == 0
+
+    assert lifecycle.touch("repo") == "cache-1"
+    assert not managed.lapsed
+    assert recreate.calls == 1
+
+
+def test_expired_cache_in_use_is_recreated_in_the_background(extensions, monkeypatch):
+    lifecycle, recreate = manager(), Recreate()
+    managed = register(lifecycle, recreate, expires_in=-1)
+    monkeypatch.setattr(lifecycle, "_lookup_expire_time", lambda managed: None)
+
+    lifecycle.run_once()
+    wait_ready(managed)
+
+    assert managed.cache_name == "cache-1"
+    assert managed.expire_time > time.time() + 1700
+    assert lifecycle.recreations == 1
+
+
+def test_cache_gone_when_extended_is_recreated(extensions):
+    lifecycle, recreate = manager(), Recreate()
+    managed = register(lifecycle, recreate, expires_in=60)
+    extensions["gone"] = True
+
+    lifecycle.run_once()
+    wait_ready(managed)
+
+    assert managed.cache_name == "cache-1"
+    assert not managed.lapsed
+
+
+def test_cache_of_a_rewritten_index_is_rebuilt(extensions, tmp_path):
+    source = tmp_path / "repo.json"
+    source.write_text("{}")
+    lifecycle, recreate = manager(), Recreate()
+    managed = register(lifecycle, recreate, expires_in=1000, source_path=source)
+    managed.created_at = time.time() - 60
+    os.utime(source)
+
+    lifecycle.run_once()
+    wait_ready(managed)
+
+    assert managed.cache_name == "cache-1"
+    lifecycle.run_once()
+    assert recreate.calls == 1  # Built after the rewrite: not rebuilt again
+
+
+def test_touch_waits_for_a_recreation_at_most_its_timeout(extensions):
+    release = threading.Event()
+    lifecycle, recreate = manager(), Recreate(release)
+    managed = register(lifecycle, recreate, expires_in=60)
+    managed.lapsed = True
+
+    assert lifecycle.touch("repo", timeout=0.05) == "cache-0"
+
+    release.set()
+    wait_ready(managed)
+    assert lifecycle.touch("repo") == "cache-1"
@@ -0,0 +1,111 @@
+import datetime
+import time
+from types import SimpleNamespace
+
+from src.core.cache_registry import CacheRecord, CacheRegistry, key_fingerprint, payload_hash, repo_of_display_name
+
+OWNER_A = key_fingerprint("key-a")
+OWNER_B = key_fingerprint("key-b")
+
+
+def remote_cache(name: str, display_name: str, expires_in: float = 600) -> SimpleNamespace:
+    expire_time = datetime.datetime.fromtimestamp(time.time() + expires_in, datetime.timezone.utc)
+    return SimpleNamespace(name=name, display_name=display_name, expire_time=expire_time)
+
+
+def record(name: str, repo_name: str = "repo", owner=OWNER_A, **attrs) -> CacheRecord:
+    return CacheRecord(
+        name=name,
+        repo_name=repo_name,
+        display_name=f"{repo_name}_1700000000_0123abcd",
+        expire_time=time.time() + 600,
+        owner=owner,
+        **attrs,
+    )
+
+
+def test_payload_hash_and_fingerprint():
+    assert payload_hash("doc", "prompt", "model") == payload_hash("doc", "prompt", "model")
+    assert payload_hash("doc", "prompt", "model") != payload_hash("doc", "prompt", "other model")
+    assert payload_hash("ab", "c") != payload_hash("a", "bc")
+    assert key_fingerprint(None) is None
+    assert "key-a" not in key_fingerprint("key-a")
+
+
+def test_repo_of_display_name():
+    assert repo_of_display_name("my_repo_1700000000_0123abcd") == "my_repo"
+    assert repo_of_display_name("legacy_repo") == "legacy_repo"
+
+
+def test_records_persist_atomically(tmp_path):
+    path = tmp_path / "registry.json"
+    registry = CacheRegistry(path)
+    registry.record(record("caches/1", content_hash="h1"))
+
+    reopened = CacheRegistry(path)
+
+    assert reopened.get("caches/1").content_hash == "h1"
+    assert [p.name for p in tmp_path.iterdir()] == ["registry.json"]
+
+
+def test_find_matches_content_and_owner(tmp_path):
+    registry = CacheRegistry(tmp_path / "registry.json")
+    registry.record(record("caches/1", content_hash="h1", owner=OWNER_A))
+
+    assert registry.find("h1", OWNER_A).name == "caches/1"
+    assert registry.find("h1", OWNER_B) is None
+    assert registry.find("h2", OWNER_A) is None
+
+
+def test_caches_of_filters_by_owner_and_skips_expired(tmp_path):
+    registry = CacheRegistry(tmp_path / "registry.json")
+    registry.record(record("caches/a", owner=OWNER_A))
+    registry.record(record("caches/b", owner=OWNER_B))
+    expired = record("caches/old", owner=OWNER_A)
+    expired.expire_time = time.time() - 1
+    registry.record(expired)
+
+    assert {r.name for r in registry.caches_of("repo")} == {"caches/a", "caches/b"}
+    assert [r.name for r in registry.caches_of("repo", OWNER_A)] == ["caches/a"]
+
+
+def test_reconcile_only_touches_the_listed_owner(tmp_path):
+    registry = CacheRegistry(tmp_path / "registry.json")
+    registry.record(record("caches/a-kept", owner=OWNER_A, content_hash="h1"))
+    registry.record(record("caches/a-deleted", owner=OWNER_A))
+    registry.record(record("caches/b", owner=OWNER_B))
+
+    added, forgotten = registry.reconcile(
+        [remote_cache("caches/a-kept", "repo_1700000000_0123abcd"), remote_cache("caches/a-new", "other_1700000000_89abcdef")],
+        OWNER_A,
+    )
+
+    assert (added, forgotten) == (1, 1)
+    assert registry.get("caches/a-deleted") is None
+    assert registry.get("caches/a-kept").content_hash == "h1"
+    assert registry.get("caches/b") is not None
+    new = registry.get("caches/a-new")
+    assert (new.owner, new.repo_name) == (OWNER_A, "other")
+
+
+def test_reconcile_is_due_per_owner(tmp_path):
+    registry = CacheRegistry(tmp_path / "registry.json", reconcile_seconds=3600)
+    assert registry.reconcile_due(OWNER_A)
+
+    registry.reconcile([], OWNER_A)
+
+    assert not registry.reconcile_due(OWNER_A)
+    assert registry.reconcile_due(OWNER_B)
+    assert not CacheRegistry(tmp_path / "registry.json", reconcile_seconds=3600).reconcile_due(OWNER_A)
+
+
+def test_mark_reused_moves_a_cache_first(tmp_path):
+    registry = CacheRegistry(tmp_path / "registry.json")
+    older = record("caches/older")
+    older.created_at -= 100
+    registry.record(older)
+    registry.record(record("caches/newer"))
+
+    registry.mark_reused("caches/older", time.time() + 1800)
+
+    assert [r.name for r in registry.caches_of("repo")] == ["caches/older", "caches/newer"]
@@ -0,0 +1,110 @@
+import datetime
+import itertools
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("google.generativeai")
+pytest.importorskip("requests")
+pytest.importorskip("dotenv")
+
+from src.core import init_repo
+from src.core.cache_registry import CacheRegistry
+
+
+class CacheService:
+    """Stands for the pooled cache client of one API key."""
+
+    ids = itertools.count()
+
+    def __init__(self):
+        self.created = []
+
+    def create_cached_content(self, request):
+        cached_content = request.cached_content
+        now = time.time()
+        cache = SimpleNamespace(
+            name=f"cachedContents/{next(self.ids)}",
+            display_name=cached_content.display_name,
+            expire_time=datetime.datetime.fromtimestamp(now + 1800, datetime.timezone.utc),
+            create_time=datetime.datetime.fromtimestamp(now, datetime.timezone.utc),
+            usage_metadata=SimpleNamespace(total_token_count=100),
+        )
+        self.created.append(cache)
+        return cache
+
+    def list_cached_contents(self, request):
+        return list(self.created)
+
+    def delete_cached_content(self, name):
+        self.created = [cache for cache in self.created if cache.name != name]
+
+
+@pytest.fixture
+def api(monkeypatch, tmp_path):
+    api = SimpleNamespace(services={}, registry=CacheRegistry(tmp_path / "registry.json"), gone=set())
+
+    def extend_cache_ttl(cache_name, api_key="", ttl=1800):
+        if cache_name in api.gone:
+            api.registry.forget(cache_name)
+            return None
+        return time.time() + ttl
+
+    monkeypatch.setattr(init_repo, "CONTEXT_CACHING_RETRIVER", "gemini-test")
+    monkeypatch.setattr(init_repo, "cache_registry", api.registry)
+    monkeypatch.setattr(init_repo, "extend_cache_ttl", extend_cache_ttl)
+    monkeypatch.setattr(
+        init_repo.llm_client_pool, "gemini_cache_client", lambda api_key="": api.services.setdefault(api_key, CacheService())
+    )
+    return api
+
+
+def test_unchanged_payload_reuses_the_live_cache(api):
+    first = init_repo.create_cache("repo", "documentation", "system", "key-a")
+    second = init_repo.create_cache("repo", "documentation", "system", "key-a")
+
+    assert second == first
+    assert len(api.services["key-a"].created) == 1
+    assert api.registry.get(first).last_reused is not None
+
+
+def test_changed_payload_gets_a_new_cache(api):
+    first = init_repo.create_cache("repo", "documentation", "system", "key-a")
+
+    assert init_repo.create_cache("repo", "documentation v2", "system", "key-a") != first
+    assert init_repo.create_cache("repo", "documentation", "other system prompt", "key-a") != first
+    assert len(api.services["key-a"].created) == 3
+
+
+def test_caches_are_not_reused_across_api_keys(api):
+    first = init_repo.create_cache("repo", "documentation", "system", "key-a")
+
+    assert init_repo.create_cache("repo", "documentation", "system", "key-b") != first
+    assert len(api.services["key-b"].created) == 1
+
+
+def test_cache_gone_since_it_was_recorded_is_created_again(api):
+    first = init_repo.create_cache("repo", "documentation", "system", "key-a")
+    api.gone.add(first)
+
+    second = init_repo.create_cache("repo", "documentation", "system", "key-a")
+
+    assert second != first
+    assert api.registry.get(first) is None
+
+
+def test_concurrent_requests_for_the_same_payload_create_one_cache(api):
+    names = []
+    threads = [
+        threading.Thread(target=lambda: names.append(init_repo.create_cache("repo", "documentation", "system", "key-a")))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(set(names)) == 1
+    assert len(api.services["key-a"].created) == 1
@@ -0,0 +1,121 @@
+import textwrap
+
+from indexer.chunking import assign_keys_to_chunks, merge_code_structures, split_source
+from src.utils.tokens import estimate_tokens
+
+
+def function(name: str, lines: int = 8) -> str:
+    body = "".join(f"    value_{i} = compute_{i}(argument, other_argument)\n" for i in range(lines))
+    return f"def {name}(argument, other_argument):\n{body}    return value_0\n\n\n"
+
+
+def test_small_source_is_one_chunk():
+    source = function("only")
+
+    assert split_source(source, 1000, is_python=True) == [source]
+
+
+def test_python_chunks_end_at_function_boundaries():
+    source = '"""Module docstring."""\nimport os\n\n\n' + "".join(function(f"f{i}") for i in range(12))
+    max_tokens = 3 * estimate_tokens(function("f0"))
+
+    chunks = split_source(source, max_tokens, is_python=True)
+
+    assert len(chunks) > 1
+    assert "".join(chunks) == source
+    assert chunks[0].startswith('"""Module docstring."""')
+    for chunk in chunks:
+        assert estimate_tokens(chunk) <= max_tokens
+        assert chunk.lstrip().startswith(('"""', "def "))
+
+
+def test_decorators_stay_with_their_function():
+    source = function("first") + "@decorator\n" + function("second")
+    max_tokens = estimate_tokens(function("first")) + 5
+
+    chunks = split_source(source, max_tokens, is_python=True)
+
+    assert chunks[1].startswith("@decorator\ndef second")
+
+
+def test_large_class_is_cut_between_methods_with_its_header():
+    methods = "".join(textwrap.indent(function(f"method_{i}"), "    ") for i in range(6))
+    source = "class Store:\n    \"\"\"Keeps things.\"\"\"\n\n" + methods
+    max_tokens = 2 * estimate_tokens(function("method_0"))
+
+    chunks = split_source(source, max_tokens, is_python=True)
+
+    assert len(chunks) > 1
+    assert chunks[0].startswith("class Store:")
+    for chunk in chunks[1:]:
+        assert chunk.startswith("class Store:\n")
+    assert sum(chunk.count("def method_") for chunk in chunks) == 6
+
+
+def test_unparsable_python_falls_back_to_blank_line_boundaries():
+    blocks = [f"function f{i}() {{\n  return {i};\n}}\n\n" for i in range(6)]
+    source = "".join(blocks)
+    max_tokens = 2 * estimate_tokens(blocks[0])
+
+    chunks = split_source(source, max_tokens, is_python=True)
+
+    assert "".join(chunks) == source
+    for chunk in chunks:
+        assert chunk.startswith("function ")
+
+
+def test_statement_larger_than_the_budget_is_cut_between_lines():
+    source = "DATA = [\n" + "".join(f"    {i},\n" for i in range(500)) + "]\n"
+
+    chunks = split_source(source, 100, is_python=True)
+
+    assert len(chunks) > 1
+    assert "".join(chunks) == source
+    for chunk in chunks:
+        assert estimate_tokens(chunk) <= 100
+
+
+def test_merge_code_structures_joins_classes_cut_across_chunks():
+    first = {
+        "global_code_description": "Storage helpers.",
+        "functions_out_class": [{"function_name": "load", "function_description": "Loads."}],
+        "classes": [{
+            "class_name": "Store",
+            "class_description": "Keeps things.",
+            "attributes": [{"attribute_name": "data", "attribute_description": "The data."}],
+            "functions_in_class": [{"function_name": "get", "function_description": "Gets."}],
+        }],
+    }
+    second = {
+        "global_code_description": "Storage helpers.",
+        "functions_out_class": [{"function_name": "load", "function_description": "Duplicate."}],
+        "classes": [{
+            "class_name": "Store",
+            "class_description": "",
+            "attributes": [{"attribute_name": "data", "attribute_description": "Duplicate."}],
+            "functions_in_class": [{"function_name": "put", "function_description": "Puts."}],
+        }],
+    }
+
+    merged = merge_code_structures([first, second])
+
+    assert merged["global_code_description"] == "Storage helpers."
+    assert merged["functions_out_class"] == [{"function_name": "load", "function_description": "Loads."}]
+    [store] = merged["classes"]
+    assert store["class_description"] == "Keeps things."
+    assert [a["attribute_description"] for a in store["attributes"]] == ["The data."]
+    assert [m["function_name"] for m in store["functions_in_class"]] == ["get", "put"]
+
+
+def test_assign_keys_to_the_chunk_defining_them():
+    chunks = ["import os\n\ndef load():\n    pass\n", "class Store:\n    def get(self):\n        self.data = 1\n"]
+
+    assigned = assign_keys_to_chunks(
+        ["module", "function load", "class Store", "method Store.get", "attribute Store.data", "function missing"],
+        chunks,
+    )
+
+    assert assigned == [
+        ["module", "function load", "function missing"],
+        ["class Store", "method Store.get", "attribute Store.data"],
+    ]
@@ -0,0 +1,23 @@
+import pytest
+
+from indexer.utils import classify_file_locally
+from src.utils.utils import classify_file
+
+
+@pytest.mark.parametrize(
+    "file_name, classification",
+    [
+        ("main.py", "code_file"),
+        ("App.TSX", "code_file"),
+        ("README.md", "doc_file"),
+        ("values.yaml", "configuration_file"),
+    ],
+)
+def test_local_classification_matches_classify_file(file_name, classification):
+    assert classify_file_locally(file_name) == classification
+    assert classify_file(file_name) == classification
+
+
+def test_ambiguous_extensions_are_left_to_the_llm():
+    assert classify_file_locally("Makefile") is None
+    assert classify_file("Makefile") == "other"
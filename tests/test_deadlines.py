@@ -0,0 +1,48 @@
+import time
+
+from indexer.deadlines import CallTimeouts, job_deadline
+from indexer.health import ModelHealthRegistry
+
+
+def timeouts(health=None) -> CallTimeouts:
+    return CallTimeouts(
+        health or ModelHealthRegistry(),
+        min_seconds=10,
+        max_seconds=120,
+        overhead=3,
+        factor=3,
+        default_tokens_per_second=500,
+    )
+
+
+def test_timeout_grows_with_the_prompt():
+    call_timeouts = timeouts()
+
+    assert call_timeouts.timeout("model", 500) == 10  # Clamped to the minimum
+    assert call_timeouts.timeout("model", 5000) == 3 + 3 * 5000 / 500
+    assert call_timeouts.timeout("model", 500000) == 120  # Clamped to the maximum
+
+
+def test_timeout_follows_the_measured_speed_of_the_model():
+    health = ModelHealthRegistry()
+    health.get("fast").record_throughput(10000, 1.0)
+    call_timeouts = timeouts(health)
+
+    assert call_timeouts.timeout("fast", 100000) == 3 + 3 * 100000 / 10000
+    assert call_timeouts.timeout("unmeasured", 100000) == 120
+
+
+def test_timeout_never_outlives_the_deadline_of_the_run():
+    token = job_deadline.set(time.monotonic() + 5)
+    try:
+        assert 4 < timeouts().timeout("model", 5000) <= 5
+    finally:
+        job_deadline.reset(token)
+
+
+def test_timeout_past_the_deadline_is_not_positive():
+    token = job_deadline.set(time.monotonic() - 1)
+    try:
+        assert timeouts().timeout("model", 5000) <= 0
+    finally:
+        job_deadline.reset(token)
@@ -0,0 +1,76 @@
+import pytest
+
+from indexer.dedup import DuplicateFiles, content_digest
+
+
+@pytest.fixture
+def files(tmp_path):
+    def make(name: str, content: str) -> dict:
+        path = tmp_path / name
+        path.write_text(content)
+        return {"file_name": name, "file_paths": str(path)}
+
+    return make
+
+
+def test_copy_of_a_summarized_file_reuses_its_result(files):
+    duplicates = DuplicateFiles()
+    original, copy = files("a.py", "x = 1\n"), files("b.py", "x = 1\n")
+
+    assert duplicates.add(original, "docstring") == (True, None)
+    assert duplicates.settle(original, {"summary": "x"}) == []
+    assert duplicates.add(copy, "docstring") == (False, {"summary": "x"})
+    assert duplicates.stats()["calls_saved"] == 1
+
+
+def test_copies_in_flight_wait_for_the_representative(files):
+    duplicates = DuplicateFiles()
+    original, copy = files("a.py", "x = 1\n"), files("b.py", "x = 1\n")
+
+    duplicates.add(original, "docstring")
+    assert duplicates.add(copy, "docstring") == (False, None)
+    assert duplicates.settle(original, {"summary": "x"}) == [copy]
+
+
+def test_failed_representative_lets_the_next_copy_try(files):
+    duplicates = DuplicateFiles()
+    original, waiting, later = files("a.py", "x\n"), files("b.py", "x\n"), files("c.py", "x\n")
+
+    duplicates.add(original, "docstring")
+    duplicates.add(waiting, "docstring")
+    assert duplicates.settle(original, None) == [waiting]
+    assert duplicates.add(later, "docstring") == (True, None)
+
+
+def test_same_content_in_another_category_is_summarized_again(files):
+    duplicates = DuplicateFiles()
+    readme, notes = files("README.md", "# Title\n"), files("notes.txt", "# Title\n")
+
+    duplicates.add(readme, "documentation")
+    duplicates.settle(readme, {"summary": "doc"})
+
+    assert duplicates.add(notes, "config") == (True, None)
+
+
+def test_different_content_is_not_a_duplicate(files):
+    duplicates = DuplicateFiles()
+
+    assert duplicates.add(files("a.py", "x = 1\n"), "docstring") == (True, None)
+    assert duplicates.add(files("b.py", "x = 2\n"), "docstring") == (True, None)
+    assert duplicates.stats()["duplicates"] == 0
+
+
+def test_unreadable_file_is_summarized(tmp_path):
+    duplicates = DuplicateFiles()
+
+    assert duplicates.add({"file_paths": str(tmp_path / "missing.py")}, "docstring") == (True, None)
+
+
+def test_digest_computed_by_the_caller_is_used(files):
+    duplicates = DuplicateFiles()
+    original, copy = files("a.py", "x = 1\n"), files("b.py", "y = 2\n")
+
+    duplicates.add(original, "docstring", content_digest(original["file_paths"]))
+    duplicates.settle(original, {"summary": "x"})
+
+    assert duplicates.add(copy, "docstring", content_digest(original["file_paths"])) == (False, {"summary": "x"})
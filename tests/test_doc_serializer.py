@@ -0,0 +1,93 @@
+import re
+
+from src.core.doc_serializer import compact_documentation, serialize_documentation
+
+SHARED = "Validates the payload against the schema and raises on the first error found."
+
+
+def entries() -> list:
+    return [
+        {
+            "file_id": 0,
+            "file_name": "store.py",
+            "file_paths": "/app/repository_folder/repo/pkg/store.py",
+            "classification": "code_file",
+            "documentation": {
+                "global_code_description": "Storage of the records.",
+                "functions_out_class": [{"function_name": "validate", "function_description": SHARED}],
+                "classes": [{
+                    "class_name": "Store",
+                    "class_description": "Keeps the records in memory.",
+                    "attributes": [],
+                    "functions_in_class": [{"function_name": "check", "function_description": SHARED}],
+                }],
+            },
+        },
+        {
+            "file_id": 1,
+            "file_name": "README.md",
+            "file_paths": "/app/repository_folder/repo/README.md",
+            "classification": "doc_file",
+            "documentation": {"global_code_description": "How to install and run the project."},
+        },
+    ]
+
+
+def expand(text: str) -> str:
+    """Replace every ~N reference by the repeated text it stands for."""
+    repeated = dict(re.findall(r"^~(\d+): (.*)$", text, re.MULTILINE))
+    body = text.split("\n\n", 1)[1]
+    return re.sub(r"~(\d+)\b", lambda match: repeated[match.group(1)], body)
+
+
+def texts(value):
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from texts(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from texts(item)
+
+
+def test_every_name_and_description_survives():
+    text = compact_documentation(entries(), title="Documentation of repo")
+    body = expand(text)
+
+    assert text.startswith("Documentation of repo\n")
+    for entry in entries():
+        assert f"[{entry['file_id']}] {entry['file_name']}" in body
+        for value in texts(entry["documentation"]):
+            assert value in body
+
+
+def test_repeated_texts_are_written_once():
+    text = compact_documentation(entries())
+
+    assert text.count(SHARED) == 1
+    assert "~1" in text.split("\n\n", 1)[1]
+
+
+def test_paths_are_relative_to_the_common_root():
+    text = compact_documentation(entries())
+
+    assert "Directories are relative to /app/repository_folder/repo" in text
+    assert "[0] store.py @ pkg" in text
+    assert "[1] README.md\n" in text
+
+
+def test_compact_format_is_smaller_than_the_repr():
+    text, tokens = serialize_documentation({"documentation": entries() * 5})
+
+    assert tokens["tokens"] < tokens["repr_tokens"]
+    assert text != str({"documentation": entries() * 5})
+
+
+def test_repr_format_keeps_the_dict_repr():
+    documentation_json = {"documentation": entries()}
+
+    text, tokens = serialize_documentation(documentation_json, documentation_format="repr")
+
+    assert text == str(documentation_json)
+    assert tokens["tokens"] == tokens["repr_tokens"]
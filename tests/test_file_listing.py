@@ -0,0 +1,64 @@
+import os
+
+import pytest
+
+from indexer.utils import FileFilterConfig, is_listed, list_all_files
+
+
+@pytest.fixture
+def repo(tmp_path):
+    for relative_path in (
+        "app.py",
+        "README.md",
+        "config.yaml",
+        "data.json",
+        "pkg/module.py",
+        "pkg/__init__.py",
+        "node_modules/lib/index.js",
+        "build/out.py",
+        "generated/stub.py",
+        "logs/debug.py",
+        "logs/keep.py",
+    ):
+        path = tmp_path / relative_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("x = 1\n")
+    (tmp_path / ".gitignore").write_text("generated/\nlogs/*\n!logs/keep.py\n")
+    return tmp_path
+
+
+def listed(folder, **kwargs) -> set:
+    result = list_all_files(str(folder), **kwargs)
+    assert [item["file_id"] for item in result["all_files_no_path"]] == list(range(len(result["all_files_with_path"])))
+    return {os.path.relpath(path, folder).replace(os.sep, "/") for path in result["all_files_with_path"]}
+
+
+def test_ignored_directories_and_extensions_are_not_listed(repo):
+    assert listed(repo, include_md=False) == {"app.py", "pkg/module.py", "generated/stub.py", "logs/debug.py", "logs/keep.py"}
+    assert {"README.md", "config.yaml"} <= listed(repo, include_md=True)
+
+
+def test_gitignore_is_respected_on_request(repo):
+    config = FileFilterConfig.for_request(include_md=False, respect_gitignore=True)
+
+    assert listed(repo, include_md=False, config=config) == {"app.py", "pkg/module.py", "logs/keep.py"}
+
+
+def test_extra_ignore_patterns(repo):
+    config = FileFilterConfig.for_request(include_md=False, ignore_patterns=["pkg/*", "logs"])
+
+    assert listed(repo, include_md=False, config=config) == {"app.py", "generated/stub.py"}
+
+
+def test_only_files_agrees_with_the_walk(repo):
+    config = FileFilterConfig.for_request(include_md=True, respect_gitignore=True)
+    candidates = ["app.py", "pkg/module.py", "node_modules/lib/index.js", "generated/stub.py", "logs/keep.py", "missing.py", "app.py"]
+
+    assert listed(repo, include_md=True, only_files=candidates, config=config) == {"app.py", "pkg/module.py", "logs/keep.py"}
+    assert is_listed(str(repo), "README.md", config)
+    assert not is_listed(str(repo), "logs/debug.py", config)
+
+
+def test_missing_folder():
+    with pytest.raises(FileNotFoundError):
+        list_all_files("/does/not/exist", include_md=True)
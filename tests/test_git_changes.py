@@ -0,0 +1,124 @@
+import shutil
+import subprocess
+
+import pytest
+
+from src.core import git_changes
+from src.core.git_changes import diff_commits
+
+
+def name_status(*records: tuple) -> str:
+    """Output of `git diff --name-status -z` for the given (status, path, ...) records."""
+    return "".join("\0".join(record) + "\0" for record in records)
+
+
+@pytest.fixture
+def git_diff(monkeypatch):
+    def use(output: str):
+        monkeypatch.setattr(git_changes, "_run_git", lambda repo_path, *args: output)
+
+    return use
+
+
+def test_diff_commits_parses_every_status(git_diff):
+    git_diff(name_status(
+        ("M", "edited.py"),
+        ("A", "added.py"),
+        ("D", "deleted.py"),
+        ("T", "now_a_symlink"),
+        ("R100", "old/moved.py", "new/moved.py"),
+        ("R075", "old/reworked.py", "new/reworked.py"),
+        ("C090", "template.py", "copy.py"),
+    ))
+
+    changes = diff_commits("/repo", "old", "new")
+
+    assert changes.changed == ["edited.py", "now_a_symlink", "new/reworked.py"]
+    assert changes.added == ["added.py", "copy.py"]
+    assert changes.deleted == ["deleted.py"]
+    assert changes.renamed == [("old/moved.py", "new/moved.py"), ("old/reworked.py", "new/reworked.py")]
+
+
+def test_diff_commits_keeps_paths_with_spaces_and_tabs(git_diff):
+    git_diff(name_status(("M", "docs/read me.md"), ("R100", "a\tb.py", "c d.py")))
+
+    changes = diff_commits("/repo", "old", "new")
+
+    assert changes.changed == ["docs/read me.md"]
+    assert changes.renamed == [("a\tb.py", "c d.py")]
+
+
+def test_diff_commits_without_changes(git_diff):
+    git_diff("")
+
+    assert diff_commits("/repo", "old", "new").is_empty()
+
+
+requires_git = pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+
+
+def git_in(repo):
+    def git(*args):
+        return subprocess.run(["git", "-C", str(repo), *args], check=True, capture_output=True, text=True).stdout
+
+    return git
+
+
+def init_repository(repo):
+    repo.mkdir(parents=True, exist_ok=True)
+    git = git_in(repo)
+    git("init", "-q")
+    git("config", "user.email", "test@example.com")
+    git("config", "user.name", "test")
+    return git
+
+
+@requires_git
+def test_diff_commits_on_a_repository(tmp_path):
+    git = init_repository(tmp_path)
+    (tmp_path / "kept.py").write_text("value = 1\n" * 20)
+    (tmp_path / "gone.py").write_text("gone = True\n")
+    git("add", "-A")
+    git("commit", "-qm", "first")
+    old_commit = git_changes.get_head_commit(tmp_path)
+
+    (tmp_path / "kept.py").rename(tmp_path / "moved.py")
+    (tmp_path / "gone.py").unlink()
+    (tmp_path / "new.py").write_text("new = True\n")
+    git("add", "-A")
+    git("commit", "-qm", "second")
+
+    changes = diff_commits(tmp_path, old_commit, git_changes.get_head_commit(tmp_path))
+
+    assert changes.renamed == [("kept.py", "moved.py")]
+    assert changes.added == ["new.py"]
+    assert changes.deleted == ["gone.py"]
+    assert changes.changed == []
+
+
+@requires_git
+def test_clone_at_commit_leaves_the_source_untouched(tmp_path):
+    source = tmp_path / "source"
+    git = init_repository(source)
+    (source / "a.py").write_text("v1\n")
+    git("add", "-A")
+    git("commit", "-qm", "first")
+    first = git_changes.get_head_commit(source)
+    git("remote", "add", "origin", "https://example.com/repo.git")
+    (source / "a.py").write_text("v2\n")
+    git("commit", "-qam", "second")
+    second = git_changes.get_head_commit(source)
+    git("reset", "--hard", "-q", first)
+
+    clone = tmp_path / "clone"
+    git_changes.clone_at_commit(source, second, clone)
+
+    assert git_changes.get_head_commit(clone) == second
+    assert (clone / "a.py").read_text() == "v2\n"
+    assert (source / "a.py").read_text() == "v1\n"
+    assert git_changes.get_head_commit(source) == first
+    assert git_in(clone)("remote", "get-url", "origin").strip() == "https://example.com/repo.git"
+    assert git_changes.tracked_files(clone) == ["a.py"]
+    objects = git_changes.object_files(clone)
+    assert objects and all(path.startswith(".git/objects/") for path in objects)
+    assert all((source / path).exists() for path in objects)
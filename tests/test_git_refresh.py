@@ -0,0 +1,81 @@
+import os
+import shutil
+import subprocess
+
+import pytest
+
+pytest.importorskip("google.generativeai")
+pytest.importorskip("requests")
+pytest.importorskip("dotenv")
+
+from src.core import init_repo
+from src.core.git_changes import fetch_latest_commit, get_head_commit
+from src.core.repo_versions import current_version
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+
+
+def git(repo, *args):
+    return subprocess.run(["git", "-C", str(repo), *args], check=True, capture_output=True, text=True).stdout
+
+
+def commit_files(repo, files: dict, message: str):
+    for relative_path, content in files.items():
+        (repo / relative_path).write_text(content)
+    git(repo, "add", "-A")
+    git(repo, "-c", "user.email=test@example.com", "-c", "user.name=test", "commit", "-qm", message)
+
+
+@pytest.fixture
+def upstream_and_clone(tmp_path):
+    upstream = tmp_path / "upstream"
+    upstream.mkdir()
+    git(upstream, "init", "-q")
+    commit_files(upstream, {"kept.py": "kept\n", "edited.py": "v1\n"}, "first")
+    repo_path = tmp_path / "repository_folder" / "repo"
+    repo_path.parent.mkdir()
+    subprocess.run(["git", "clone", "-q", str(upstream), str(repo_path)], check=True, capture_output=True)
+    return upstream, repo_path
+
+
+def test_publish_commit_swaps_in_a_new_version_instead_of_resetting(upstream_and_clone):
+    upstream, repo_path = upstream_and_clone
+    commit_files(upstream, {"edited.py": "v2\n"}, "second")
+    new_commit = fetch_latest_commit(repo_path)
+
+    init_repo.publish_commit(repo_path, new_commit)
+    first_version = next(p for p in repo_path.parent.glob(".versions/repo/*") if p.is_dir() and p.resolve() != current_version(repo_path))
+
+    assert repo_path.is_symlink()
+    assert get_head_commit(repo_path) == new_commit
+    assert (repo_path / "edited.py").read_text() == "v2\n"
+    # Readers of the previous version still see it whole
+    assert (first_version / "edited.py").read_text() == "v1\n"
+    assert os.path.samefile(first_version / "kept.py", repo_path / "kept.py")
+    assert not git(repo_path, "status", "--porcelain")
+    # The new version still follows the remote
+    commit_files(upstream, {"edited.py": "v3\n"}, "third")
+    assert fetch_latest_commit(repo_path) == get_head_commit(upstream)
+
+
+def test_git_refresh_indexes_the_published_version(upstream_and_clone, monkeypatch):
+    upstream, repo_path = upstream_and_clone
+    old_commit = get_head_commit(repo_path)
+    commit_files(upstream, {"edited.py": "v2\n", "added.py": "new\n"}, "second")
+    updates = []
+    recorded = []
+
+    def update_repository_index(repo_name, path, reindexed_files, deleted_files, gemini_api_key, renamed_files=None):
+        updates.append((sorted(reindexed_files), (path / "edited.py").read_text(), path.is_symlink()))
+
+    monkeypatch.setattr(init_repo, "read_indexed_commit", lambda repo_name: old_commit)
+    monkeypatch.setattr(init_repo, "has_usable_index", lambda path: True)
+    monkeypatch.setattr(init_repo, "index_is_complete", lambda path: True)
+    monkeypatch.setattr(init_repo, "update_repository_index", update_repository_index)
+    monkeypatch.setattr(init_repo, "record_indexed_commit", lambda repo_name, commit: recorded.append(commit))
+    monkeypatch.setattr(init_repo, "create_repository_cache", lambda repo_name, key, repo_path: "cachedContents/repo")
+
+    assert init_repo.process_git_repository("repo", repo_path, "key") == "cachedContents/repo"
+
+    assert updates == [(["added.py", "edited.py"], "v2\n", True)]
+    assert recorded == [get_head_commit(upstream)]
@@ -0,0 +1,100 @@
+import time
+
+from indexer.health import ModelHealth
+from indexer.limiter import ModelLimiters
+
+
+def open_circuit(health: ModelHealth):
+    for _ in range(health.consecutive_failures):
+        health.before_call()
+        health.record(1.0, "timeout")
+
+
+def expire(health: ModelHealth):
+    health._opened_at = time.monotonic() - health._open_for
+
+
+def test_consecutive_failures_open_the_circuit():
+    health = ModelHealth("model", consecutive_failures=3)
+    open_circuit(health)
+
+    assert health.state == "open"
+    assert not health.available()
+    assert health.trips == 1
+    assert health.seconds_until_retry() > 0
+
+
+def test_error_rate_opens_the_circuit():
+    health = ModelHealth("model", min_calls=4, error_threshold=0.5, consecutive_failures=10)
+    for outcome in ("ok", "error", "ok", "error"):
+        health.record(1.0, outcome)
+
+    assert health.state == "open"
+
+
+def test_half_open_lets_a_single_probe_through():
+    health = ModelHealth("model", consecutive_failures=1)
+    open_circuit(health)
+    expire(health)
+
+    assert health.state == "half_open"
+    assert health.available()
+    health.before_call()
+    assert not health.available()
+
+
+def test_successful_probe_closes_the_circuit():
+    health = ModelHealth("model", consecutive_failures=1)
+    open_circuit(health)
+    expire(health)
+    health.before_call()
+    health.record(1.0, "ok")
+
+    assert health.state == "closed"
+    assert health.available()
+
+
+def test_failed_probe_opens_it_for_twice_as_long():
+    health = ModelHealth("model", consecutive_failures=1, open_seconds=10, max_open_seconds=15)
+    open_circuit(health)
+    expire(health)
+    health.before_call()
+    health.record(1.0, "rate_limited")
+
+    assert health.state == "open"
+    assert health._open_for == 15
+    assert health.trips == 2
+
+
+def test_cancelled_probe_frees_the_probe_without_moving_the_circuit():
+    health = ModelHealth("model", consecutive_failures=1)
+    open_circuit(health)
+    expire(health)
+    health.before_call()
+    health.record(0.0, "cancelled")
+
+    assert health.state == "half_open"
+    assert health.available()
+
+
+def test_percentiles_and_samples_only_count_successful_calls():
+    health = ModelHealth("model", consecutive_failures=100, min_calls=100)
+    for latency in (1.0, 2.0, 3.0, 4.0):
+        health.record(latency, "ok")
+    health.record(60.0, "timeout")
+
+    assert health.percentile(0.5) in (2.0, 3.0)
+    assert health.percentile(0.99) == 4.0
+    assert health.latency_samples() == 4
+    assert health.snapshot()["calls"] == 5
+    assert health.error_rate() == 0.2
+
+
+def test_rank_routes_to_the_fastest_healthy_model():
+    limiters = ModelLimiters()
+    for latency, model_name in ((5.0, "slow"), (1.0, "fast"), (0.5, "down")):
+        limiters.health.get(model_name).record(latency, "ok")
+    open_circuit(limiters.health.get("down"))
+
+    assert limiters.rank(["slow", "fast", "down"]) == [1, 0, 2]
+    assert [name for _, name in limiters.healthy_first([(None, "down"), (None, "slow")])] == ["slow"]
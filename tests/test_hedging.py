@@ -0,0 +1,93 @@
+import asyncio
+import concurrent.futures
+import threading
+
+from indexer.health import ModelHealthRegistry
+from indexer.hedging import HedgingPolicy
+from indexer.limiter import ModelLimiters
+
+
+def test_delay_waits_for_enough_successful_samples():
+    health = ModelHealthRegistry()
+    policy = HedgingPolicy(health, enabled=True, min_samples=3, min_delay=0.5)
+    for _ in range(5):
+        health.get("model").record(30.0, "timeout")
+
+    assert policy.delay("model") is None
+
+    for latency in (1.0, 2.0, 3.0):
+        health.get("model").record(latency, "ok")
+
+    assert policy.delay("model") == 3.0
+
+
+def test_delay_is_never_under_min_delay():
+    health = ModelHealthRegistry()
+    policy = HedgingPolicy(health, enabled=True, min_samples=1, min_delay=0.5)
+    health.get("model").record(0.1, "ok")
+
+    assert policy.delay("model") == 0.5
+
+
+def test_disabled_policy_never_hedges():
+    health = ModelHealthRegistry()
+    policy = HedgingPolicy(health, enabled=False, min_samples=1)
+    health.get("model").record(1.0, "ok")
+
+    assert policy.delay("model") is None
+
+
+def test_budget_limits_hedges_to_a_share_of_the_calls():
+    policy = HedgingPolicy(ModelHealthRegistry(), enabled=True, budget_ratio=0.1, burst=1)
+    for _ in range(10):
+        policy.delay("model")
+
+    assert [policy.try_hedge() for _ in range(3)] == [True, True, False]
+
+
+def test_abandoned_call_keeps_its_slots_until_its_thread_ends():
+    release = threading.Event()
+
+    async def scenario():
+        limiters = ModelLimiters(global_limit=4)
+        with concurrent.futures.ThreadPoolExecutor(1) as executor:
+            async def call():
+                async with limiters.slot("model") as call_slot:
+                    future = executor.submit(release.wait)
+                    call_slot.hold_until(future)
+                    await asyncio.wait_for(asyncio.wrap_future(future), timeout=0.01)
+
+            try:
+                await call()
+            except asyncio.TimeoutError:
+                pass
+            held = (limiters.get("model").in_flight, limiters.global_budget.in_flight)
+            release.set()
+            for _ in range(100):
+                if limiters.get("model").in_flight == 0:
+                    break
+                await asyncio.sleep(0.01)
+        return held, (limiters.get("model").in_flight, limiters.global_budget.in_flight), limiters
+
+    held, freed, limiters = asyncio.run(scenario())
+    assert held == (1, 1)
+    assert freed == (0, 0)
+    # The window adapted to the timeout as soon as the call was given up
+    assert limiters.get("model").timeouts == 1
+
+
+def test_snapshot_since_an_earlier_one_counts_only_the_later_calls():
+    health = ModelHealthRegistry()
+    policy = HedgingPolicy(health, enabled=True, burst=5)
+    policy.delay("model")
+    policy.try_hedge()
+    start = policy.snapshot()
+
+    policy.delay("model")
+    policy.delay("model")
+    policy.try_hedge()
+    stats = policy.snapshot(since=start)
+
+    assert (stats["calls"], stats["hedges"], stats["hedge_rate"]) == (2, 1, 0.5)
+    assert "max_saved_seconds" not in stats
+    assert policy.snapshot()["calls"] == 3
@@ -0,0 +1,26 @@
+from indexer.jobs import JobCheckpoint
+
+
+def test_checkpoint_round_trips_entries(tmp_path):
+    checkpoint = JobCheckpoint(tmp_path / "job" / "checkpoint.jsonl")
+    checkpoint.record({"file_id": 1}, "docstring", {"summary": "a"})
+    checkpoint.record({"file_id": 2}, "config", {"summary": "b"})
+
+    assert checkpoint.load() == [
+        ({"file_id": 1}, "docstring", {"summary": "a"}),
+        ({"file_id": 2}, "config", {"summary": "b"}),
+    ]
+    assert checkpoint.count() == 2
+
+
+def test_checkpoint_ignores_a_line_cut_short_by_a_crash(tmp_path):
+    checkpoint = JobCheckpoint(tmp_path / "checkpoint.jsonl")
+    checkpoint.record({"file_id": 1}, "docstring", {"summary": "a"})
+    with open(checkpoint.path, "a") as f:
+        f.write('{"file": {"file_id": 2}, "categ')
+
+    assert checkpoint.load() == [({"file_id": 1}, "docstring", {"summary": "a"})]
+
+
+def test_missing_checkpoint_loads_empty(tmp_path):
+    assert JobCheckpoint(tmp_path / "absent.jsonl").load() == []
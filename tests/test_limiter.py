@@ -0,0 +1,135 @@
+import asyncio
+
+import pytest
+
+from indexer.deadlines import JobDeadlineExceeded
+from indexer.limiter import AdaptiveLimiter, ModelLimiters, call_outcome, is_rate_limit_error
+
+
+class ResourceExhausted(Exception):
+    pass
+
+
+def test_successes_grow_the_window_additively():
+    limiter = AdaptiveLimiter("model", initial_limit=4, max_limit=8)
+    # About +1 per window of successful calls
+    for _ in range(5):
+        limiter.in_flight += 1
+        limiter.release(1.0, "ok")
+
+    assert limiter.window == 5
+    assert limiter.in_flight == 0
+
+
+def test_window_stays_under_max_limit():
+    limiter = AdaptiveLimiter("model", initial_limit=2, max_limit=3)
+    for _ in range(100):
+        limiter.in_flight += 1
+        limiter.release(1.0, "ok")
+
+    assert limiter.window == 3
+
+
+def test_throttling_halves_the_window_once_per_cooldown():
+    limiter = AdaptiveLimiter("model", initial_limit=16)
+    for _ in range(3):
+        limiter.in_flight += 1
+        limiter.release(1.0, "rate_limited")
+
+    assert limiter.window == 8
+    assert limiter.rate_limited == 3
+
+
+def test_errors_do_not_shrink_the_window():
+    limiter = AdaptiveLimiter("model", initial_limit=4)
+    limiter.in_flight += 1
+    limiter.release(1.0, "error")
+
+    assert limiter.window == 4
+    assert limiter.errors == 1
+
+
+def test_cancelled_calls_are_neither_errors_nor_load_signals():
+    limiter = AdaptiveLimiter("model", initial_limit=4)
+    limiter.in_flight += 1
+    limiter.release(1.0, "cancelled")
+
+    assert (limiter.limit, limiter.in_flight) == (4, 0)
+    assert (limiter.errors, limiter.successes, limiter.timeouts, limiter.rate_limited) == (0, 0, 0, 0)
+
+
+def test_window_never_goes_under_min_limit():
+    limiter = AdaptiveLimiter("model", initial_limit=2, min_limit=2)
+    limiter.in_flight += 1
+    limiter.release(1.0, "timeout")
+
+    assert limiter.window == 2
+
+
+def test_waiters_get_the_released_slots_in_order():
+    async def scenario():
+        limiter = AdaptiveLimiter("model", initial_limit=1, max_limit=1)
+        order = []
+
+        async def call(name):
+            async with limiter.slot():
+                order.append(name)
+                await asyncio.sleep(0)
+
+        await asyncio.gather(*(call(name) for name in "abc"))
+        return limiter, order
+
+    limiter, order = asyncio.run(scenario())
+    assert order == ["a", "b", "c"]
+    assert limiter.in_flight == 0
+    assert limiter.successes == 3
+
+
+def test_cancelled_waiter_gives_its_turn_away():
+    async def scenario():
+        limiter = AdaptiveLimiter("model", initial_limit=1, max_limit=1)
+        await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        limiter.release(1.0, "ok")
+        return limiter
+
+    limiter = asyncio.run(scenario())
+    assert limiter.in_flight == 0
+    assert limiter.has_free_slot()
+
+
+def test_model_slot_also_takes_a_global_slot():
+    async def scenario():
+        limiters = ModelLimiters(global_limit=1)
+        async with limiters.slot("a"):
+            assert limiters.global_budget.in_flight == 1
+            assert not limiters.global_budget.has_free_slot()
+        return limiters
+
+    limiters = asyncio.run(scenario())
+    assert limiters.global_budget.in_flight == 0
+    assert limiters.get("a").in_flight == 0
+    assert limiters.health.get("a").snapshot()["calls"] == 1
+
+
+@pytest.mark.parametrize(
+    "error, outcome",
+    [
+        (asyncio.TimeoutError(), "timeout"),
+        (asyncio.CancelledError(), "cancelled"),
+        (JobDeadlineExceeded("deadline"), "cancelled"),
+        (ResourceExhausted("quota"), "rate_limited"),
+        (RuntimeError("429 Too Many Requests"), "rate_limited"),
+        (ValueError("validation failed"), "error"),
+    ],
+)
+def test_call_outcome(error, outcome):
+    assert call_outcome(error) == outcome
+
+
+def test_is_rate_limit_error():
+    assert is_rate_limit_error(RuntimeError("RESOURCE_EXHAUSTED"))
+    assert not is_rate_limit_error(RuntimeError("connection reset"))
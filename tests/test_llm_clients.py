@@ -0,0 +1,83 @@
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("google.generativeai")
+pytest.importorskip("instructor")
+
+import google.generativeai as genai
+
+from src.core import llm_clients
+from src.core.llm_clients import GENAI_TESTED_VERSION, LLMClientPool, check_genai_internals
+
+
+def test_genai_internals_the_pool_relies_on_are_there():
+    check_genai_internals()
+
+
+def test_tested_version_is_the_pinned_one():
+    requirements = (Path(__file__).resolve().parents[1] / "requirements.txt").read_text().splitlines()
+
+    assert f"google.generativeai=={GENAI_TESTED_VERSION}" in requirements
+
+
+@pytest.fixture
+def transports(monkeypatch):
+    created = []
+
+    def transport(client_options):
+        created.append(client_options.api_key)
+        return ("transport", client_options.api_key, len(created))
+
+    monkeypatch.setattr(llm_clients.glm, "GenerativeServiceClient", transport)
+    return created
+
+
+def test_models_of_a_key_go_through_its_transport(transports):
+    pool = LLMClientPool()
+
+    model = pool.gemini_model("key-a", "models/gemini")
+
+    assert isinstance(model, genai.GenerativeModel)
+    assert model._client == ("transport", "key-a", 1)
+
+
+def test_missing_internals_fail_loudly(monkeypatch):
+    monkeypatch.delattr(llm_clients.caching.CachedContent, "_from_obj")
+
+    with pytest.raises(ImportError, match="_from_obj"):
+        check_genai_internals()
+
+
+def test_clients_are_shared_within_a_key_and_isolated_across_keys(transports):
+    pool = LLMClientPool()
+
+    a = pool.gemini_transport("key-a")
+    b = pool.gemini_transport("key-b")
+
+    assert pool.gemini_transport("key-a") is a
+    assert a != b
+    assert transports == ["key-a", "key-b"]
+    assert pool.gemini_model("key-a", "models/gemini")._client is a
+    assert pool.gemini_model("key-b", "models/gemini")._client is b
+    assert pool.gemini_model("key-a", "models/gemini") is not pool.gemini_model("key-b", "models/gemini")
+
+
+def test_empty_key_means_the_key_of_the_environment(transports, monkeypatch):
+    monkeypatch.setenv("GEMINI_API_KEY", "env-key")
+    pool = LLMClientPool()
+
+    assert pool.gemini_transport("") is pool.gemini_transport("env-key")
+
+
+def test_least_recently_used_client_is_evicted(transports):
+    pool = LLMClientPool(max_size=2)
+    a = pool.gemini_transport("key-a")
+    pool.gemini_transport("key-b")
+    pool.gemini_transport("key-a")  # key-b is now the least recently used
+    pool.gemini_transport("key-c")
+
+    assert pool.gemini_transport("key-a") is a
+    assert pool.stats()["clients"] == 2
+    pool.gemini_transport("key-b")
+    assert transports == ["key-a", "key-b", "key-c", "key-b"]
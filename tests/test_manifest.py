@@ -0,0 +1,64 @@
+import os
+
+from src.core.manifest import ManifestEntry, diff_manifests, hash_file, load_manifest, save_manifest, scan_directory
+
+
+def write(path, content: str):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content)
+
+
+def test_diff_manifests():
+    old = {
+        "same.py": ManifestEntry(3, 1, "h1"),
+        "edited.py": ManifestEntry(3, 1, "h2"),
+        "resized.py": ManifestEntry(3, 1, None),
+        "deleted.py": ManifestEntry(3, 1, "h4"),
+    }
+    new = {
+        "same.py": ManifestEntry(3, 2, "h1"),  # Touched only
+        "edited.py": ManifestEntry(3, 2, "h2-bis"),
+        "resized.py": ManifestEntry(5, 2, None),
+        "added.py": ManifestEntry(3, 2, "h5"),
+    }
+
+    changed, added, deleted = diff_manifests(new, old)
+
+    assert sorted(changed) == ["edited.py", "resized.py"]
+    assert added == ["added.py"]
+    assert deleted == ["deleted.py"]
+
+
+def test_scan_directory_skips_git_and_hashes_content(tmp_path):
+    write(tmp_path / "pkg" / "a.py", "print(1)\n")
+    write(tmp_path / ".git" / "HEAD", "ref: refs/heads/main\n")
+
+    manifest = scan_directory(tmp_path)
+
+    assert set(manifest) == {"pkg/a.py"}
+    assert manifest["pkg/a.py"].hash == hash_file(tmp_path / "pkg" / "a.py")
+
+
+def test_scan_directory_reuses_hashes_of_unchanged_files(tmp_path):
+    write(tmp_path / "a.py", "print(1)\n")
+    first = scan_directory(tmp_path)
+    first["a.py"].hash = "stored"
+
+    assert scan_directory(tmp_path, previous=first)["a.py"].hash == "stored"
+
+
+def test_scan_directory_does_not_hash_files_whose_size_changed(tmp_path):
+    write(tmp_path / "a.py", "print(1)\n")
+    reference = {"a.py": ManifestEntry(1, 0, "reference")}
+
+    assert scan_directory(tmp_path, reference=reference)["a.py"].hash is None
+
+
+def test_manifest_round_trip(tmp_path):
+    manifest = {"a.py": ManifestEntry(3, 10, "h1"), "b.py": ManifestEntry(4, 20, None)}
+    path = tmp_path / "manifests" / "repo.json"
+
+    save_manifest(path, manifest)
+
+    assert load_manifest(path) == manifest
+    assert not [name for name in os.listdir(path.parent) if name.endswith(".tmp")]
@@ -0,0 +1,58 @@
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("google.generativeai")
+pytest.importorskip("requests")
+pytest.importorskip("dotenv")
+
+from src.core.init_repo import merge_index_entries
+
+ROOT = Path("/repo")
+
+
+def entry(path: str, summary: str = "") -> dict:
+    return {"file_id": None, "file_name": Path(path).name, "file_paths": str(ROOT / path), "documentation": summary}
+
+
+def index(*paths: str) -> list:
+    entries = [entry(path, "old") for path in paths]
+    for file_id, item in enumerate(entries):
+        item["file_id"] = file_id
+    return entries
+
+
+def ids(entries: list) -> dict:
+    return {item["file_paths"]: item["file_id"] for item in entries}
+
+
+def test_updated_file_keeps_its_id():
+    merged = merge_index_entries(index("a.py", "b.py", "c.py"), [entry("b.py", "new")], {"b.py"}, ROOT)
+
+    assert ids(merged) == {"/repo/a.py": 0, "/repo/b.py": 1, "/repo/c.py": 2}
+    assert merged[1]["documentation"] == "new"
+
+
+def test_added_file_fills_the_slot_of_a_removed_one():
+    merged = merge_index_entries(index("a.py", "b.py", "c.py"), [entry("d.py")], {"b.py"}, ROOT)
+
+    assert ids(merged) == {"/repo/a.py": 0, "/repo/d.py": 1, "/repo/c.py": 2}
+
+
+def test_added_files_are_appended_without_removals():
+    merged = merge_index_entries(index("a.py", "b.py"), [entry("c.py")], set(), ROOT)
+
+    assert ids(merged) == {"/repo/a.py": 0, "/repo/b.py": 1, "/repo/c.py": 2}
+
+
+def test_removals_move_only_tail_entries_into_holes():
+    merged = merge_index_entries(index("a.py", "b.py", "c.py", "d.py", "e.py"), [], {"a.py", "c.py"}, ROOT)
+
+    assert ids(merged) == {"/repo/e.py": 0, "/repo/b.py": 1, "/repo/d.py": 2}
+    assert [item["file_id"] for item in merged] == list(range(len(merged)))
+
+
+def test_removing_the_tail_leaves_no_holes():
+    merged = merge_index_entries(index("a.py", "b.py", "c.py"), [], {"c.py"}, ROOT)
+
+    assert ids(merged) == {"/repo/a.py": 0, "/repo/b.py": 1}
@@ -0,0 +1,69 @@
+import json
+
+import pytest
+
+pytest.importorskip("instructor")
+pytest.importorskip("google.generativeai")
+pytest.importorskip("langfuse")
+pytest.importorskip("dotenv")
+
+from indexer.service import ClassifierNode
+from src.utils.tokens import estimate_tokens
+
+
+def classifier(output_budgets=(40, 40, 40), input_budget=32000) -> ClassifierNode:
+    # Only the budgets are used by pack_batches, the models and prompts are not needed
+    node = object.__new__(ClassifierNode)
+    node.classification_token_budgets = dict(enumerate(output_budgets))
+    node.classification_input_token_budget = input_budget
+    return node
+
+
+def files(count: int, name: str = "module_{}.py") -> list:
+    return [{"file_id": i, "file_name": name.format(i)} for i in range(count)]
+
+
+def answer_tokens(file: dict) -> int:
+    return estimate_tokens(json.dumps({"file_id": file["file_id"], "file_name": file["file_name"], "classification": "configuration_file"}))
+
+
+def test_batches_are_filled_up_to_the_output_budget_of_their_model():
+    node = classifier()
+    batches = node.pack_batches(files(20))
+
+    assert [file for _, batch in batches for file in batch] == files(20)
+    assert [model for model, _ in batches] == [i % 3 for i in range(len(batches))]
+    for model, batch in batches:
+        assert sum(answer_tokens(file) for file in batch) <= node.classification_token_budgets[model]
+    # Full batches: one more file would have gone over the budget
+    for (model, batch), (_, following) in zip(batches, batches[1:]):
+        assert sum(answer_tokens(file) for file in batch + following[:1]) > node.classification_token_budgets[model]
+
+
+def test_each_model_gets_batches_sized_for_its_own_budget():
+    batches = classifier(output_budgets=(40, 200, 40)).pack_batches(files(30))
+
+    sizes = {model: len(batch) for model, batch in batches[:3]}
+    assert sizes[1] > sizes[0]
+    assert sizes[1] > sizes[2]
+
+
+def test_input_budget_also_closes_a_batch():
+    batches = classifier(output_budgets=(10000,) * 3, input_budget=50).pack_batches(files(10))
+
+    assert len(batches) > 1
+    for _, batch in batches:
+        assert len(batch) == 1 or sum(estimate_tokens(str(file)) for file in batch) <= 50
+
+
+def test_a_file_over_the_budget_gets_a_batch_of_its_own():
+    oversized = {"file_id": 1, "file_name": "x" * 2000 + ".cfg"}
+    small = files(1)[0]
+
+    batches = classifier().pack_batches([small, oversized, {**small, "file_id": 2}])
+
+    assert [batch for _, batch in batches] == [[small], [oversized], [{**small, "file_id": 2}]]
+
+
+def test_no_files_no_batches():
+    assert classifier().pack_batches([]) == []
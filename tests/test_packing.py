@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("instructor")
+pytest.importorskip("google.generativeai")
+pytest.importorskip("langfuse")
+pytest.importorskip("dotenv")
+
+from indexer.service import SUMMARY_PACK_MAX_FILE_TOKENS, InformationCompressorNode
+from indexer.summary_cache import SummaryCache
+
+
+class PackedAnswers:
+    """Stands for process_batch: answers a pack with the summaries of the given keys."""
+
+    def __init__(self, keys, model_name="m1"):
+        self.keys = keys
+        self.model_name = model_name
+        self.contents = []
+
+    async def __call__(self, label, *args, content=None, answered_by=None, **kwargs):
+        self.contents.append(content)
+        answered_by.append(self.model_name)
+        summaries = [{"file_key": key, "summary": {"brief": f"summary {key}"}} for key in self.keys]
+        return {"summaries": summaries}, label
+
+
+@pytest.fixture
+def compressor(tmp_path):
+    node = object.__new__(InformationCompressorNode)
+    node.docstring_mode = "hybrid"
+    node.summary_cache = SummaryCache(cache_dir=tmp_path / "cache")
+    node.packed_cache_namespaces = {"config": "packed-config"}
+    node.prompts_config = {"system_configuration": "system", "system_packed": "packed", "user_configuration": "user"}
+    return node
+
+
+@pytest.fixture
+def pack(tmp_path):
+    pack = []
+    for i in range(3):
+        path = tmp_path / f"settings_{i}.yaml"
+        path.write_text(f"key_{i}: {i}\n")
+        pack.append(({"file_id": i, "file_name": path.name, "file_paths": str(path)}, "config"))
+    return pack
+
+
+def run_pack(node, pack):
+    return asyncio.run(node.process_pack(pack, None, "m0", [0], None, [None], ["m1"]))
+
+
+def test_answers_are_unpacked_to_their_files(compressor, pack):
+    compressor.process_batch = PackedAnswers(["0", "2", "7", "not a key"])
+
+    results = run_pack(compressor, pack)
+
+    assert results == {
+        pack[0][0]["file_paths"]: {"brief": "summary 0"},
+        pack[2][0]["file_paths"]: {"brief": "summary 2"},
+    }
+    # The file left out of the answer is not there, it is summarized on its own
+    assert pack[1][0]["file_paths"] not in results
+
+
+def test_files_are_sent_in_one_request_with_their_key_and_name(compressor, pack):
+    compressor.process_batch = PackedAnswers(["0", "1", "2"])
+
+    run_pack(compressor, pack)
+
+    [content] = compressor.process_batch.contents
+    for key, (file, _) in enumerate(pack):
+        assert f'<file key="{key}" name="{file["file_name"]}">\nkey_{key}: {key}\n\n</file>' in content
+
+
+def test_unpacked_answers_are_cached_per_file(compressor, pack):
+    compressor.process_batch = PackedAnswers(["0", "1", "2"], model_name="m1")
+    first = run_pack(compressor, pack)
+
+    compressor.process_batch = PackedAnswers([])
+    second = run_pack(compressor, pack)
+
+    assert second == first
+    assert compressor.process_batch.contents == []
+
+
+def test_a_single_file_left_is_not_packed(compressor, pack):
+    compressor.process_batch = PackedAnswers(["0", "1"])
+    run_pack(compressor, pack[:2])
+
+    compressor.process_batch = PackedAnswers(["0"])
+    results = run_pack(compressor, pack)
+
+    assert set(results) == {pack[0][0]["file_paths"], pack[1][0]["file_paths"]}
+    assert compressor.process_batch.contents == []
+
+
+def test_only_small_files_are_packable(compressor):
+    config = {"file_paths": "settings.yaml"}
+    python_file = {"file_paths": "module.py"}
+
+    assert compressor.is_packable(config, "config", SUMMARY_PACK_MAX_FILE_TOKENS)
+    assert not compressor.is_packable(config, "config", SUMMARY_PACK_MAX_FILE_TOKENS + 1)
+    # Described from their AST skeleton in the hybrid mode
+    assert not compressor.is_packable(python_file, "docstring", 10)
+    compressor.docstring_mode = "llm"
+    assert compressor.is_packable(python_file, "docstring", 10)
@@ -0,0 +1,52 @@
+import threading
+
+import pytest
+
+pytest.importorskip("google.generativeai")
+pytest.importorskip("requests")
+pytest.importorskip("dotenv")
+
+from src.core import init_repo
+from src.core.init_repo import has_usable_index, index_repository
+
+
+def test_stale_partial_index_is_not_usable(tmp_path):
+    documentation_path = tmp_path / "repo.json"
+    assert not has_usable_index(documentation_path)
+
+    documentation_path.write_text('{"documentation": []}')
+    assert has_usable_index(documentation_path)
+
+    (tmp_path / "repo.json.partial").touch()
+    assert not has_usable_index(documentation_path)
+
+
+def test_completion_is_reported_after_the_complete_index_is_saved(tmp_path, monkeypatch):
+    documentation_path = tmp_path / "repo.json"
+    marker = tmp_path / "repo.json.partial"
+    proceed = threading.Event()
+    finished = threading.Event()
+    saved = []
+    completed = []
+
+    def fake_indexer(folder_path, gemini_api_key, on_partial=None, **kwargs):
+        on_partial({"documentation": ["partial"]})
+        proceed.wait(5)
+        return {"documentation": ["partial", "rest"]}
+
+    def on_complete():
+        completed.append((list(saved), marker.exists()))
+        finished.set()
+
+    monkeypatch.setattr(init_repo, "INDEXER_EARLY_PUBLICATION", "on")
+    monkeypatch.setattr(init_repo, "call_indexer_service", fake_indexer)
+
+    first = index_repository(tmp_path, "key", lambda index: saved.append(index["documentation"]), documentation_path, on_complete)
+
+    assert first == {"documentation": ["partial"]}
+    assert marker.exists()
+    assert completed == []
+
+    proceed.set()
+    assert finished.wait(5)
+    assert completed == [([["partial"], ["partial", "rest"]], False)]
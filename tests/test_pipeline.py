@@ -0,0 +1,39 @@
+import asyncio
+
+from indexer.pipeline import END_OF_STREAM, PipelineProgress, TieredQueue
+
+
+def test_tiered_queue_hands_out_lower_tiers_first_then_in_arrival_order():
+    async def drain():
+        queue = TieredQueue(tier_of=lambda item: item[0])
+        for item in [(2, "a"), END_OF_STREAM, (0, "b"), (1, "c"), (0, "d")]:
+            await queue.put(item)
+        return [await queue.get() for _ in range(5)]
+
+    assert asyncio.run(drain()) == [(0, "b"), (0, "d"), (1, "c"), (2, "a"), END_OF_STREAM]
+
+
+def test_progress_tracks_queue_depth_and_outcomes():
+    progress = PipelineProgress()
+    progress.queued("summarization", 3)
+    progress.started("summarization")
+    progress.started("summarization")
+    progress.finished("summarization")
+    progress.finished("summarization", success=False)
+
+    counters = progress.snapshot()["stages"]["summarization"]
+
+    assert counters == {"queued": 1, "in_flight": 0, "done": 1, "failed": 1, "max_queue_depth": 3}
+
+
+def test_eta_extrapolates_the_summarization_throughput():
+    progress = PipelineProgress()
+    progress.count("listed", 10)
+    progress.count("classified", 5)
+    progress.queued("summarization", 5)
+    for _ in range(4):
+        progress.started("summarization")
+        progress.finished("summarization")
+
+    assert progress.snapshot()["eta_seconds"] is not None
+    assert progress._eta_seconds(4.0) == (1 + 5) * 4.0 / 4
@@ -0,0 +1,62 @@
+from indexer.priority import CORE_TIER, OTHER_TIER, OVERVIEW_TIER, TESTS_TIER, PriorityTiers
+
+FILES = {
+    "README.md": "# Project\n",
+    "main.py": "from core.models import Model\n",
+    "core/__init__.py": "",
+    "core/models.py": "class Model: pass\n",
+    "api/views.py": "from core.models import Model\n",
+    "cli/commands.py": "import core.models\n",
+    "misc/helpers.py": "x = 1\n",
+    "tests/test_models.py": "from core.models import Model\n",
+    "misc/helpers_test.py": "",
+}
+
+
+def tiers(tmp_path) -> PriorityTiers:
+    for relative_path, content in FILES.items():
+        path = tmp_path / relative_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+    return PriorityTiers(str(tmp_path), [str(tmp_path / relative_path) for relative_path in FILES])
+
+
+def test_files_are_sorted_into_tiers(tmp_path):
+    priority = tiers(tmp_path)
+
+    def tier(relative_path):
+        return priority.tier(str(tmp_path / relative_path))
+
+    assert priority.core_directories == {"core"}
+    assert tier("README.md") == tier("main.py") == OVERVIEW_TIER
+    assert tier("core/models.py") == tier("core/__init__.py") == CORE_TIER
+    assert tier("api/views.py") == tier("misc/helpers.py") == OTHER_TIER
+    assert tier("tests/test_models.py") == tier("misc/helpers_test.py") == TESTS_TIER
+    assert tier("not/listed.py") == TESTS_TIER
+
+
+def test_a_partial_index_is_due_as_leading_tiers_complete(tmp_path):
+    priority = tiers(tmp_path)
+    by_tier = {}
+    for relative_path in FILES:
+        by_tier.setdefault(priority.tier(str(tmp_path / relative_path)), []).append(str(tmp_path / relative_path))
+
+    # Completing a later tier first publishes nothing
+    for full_path in by_tier[CORE_TIER]:
+        priority.done(full_path)
+    assert priority.take_publication() is None
+
+    for full_path in by_tier[OVERVIEW_TIER]:
+        priority.done(full_path)
+    assert priority.take_publication() == 2
+    assert priority.take_publication() is None
+
+    for full_path in by_tier[OTHER_TIER]:
+        priority.done(full_path)
+    assert priority.take_publication() == 3
+
+    # The complete index is the result of the run, not a partial one
+    for full_path in by_tier[TESTS_TIER]:
+        priority.done(full_path)
+    assert priority.completed_tiers() == 4
+    assert priority.take_publication() is None
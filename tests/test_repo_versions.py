@@ -0,0 +1,46 @@
+import os
+
+from src.core.repo_versions import collect_versions, current_version, publish_version, versions_root
+
+
+def make_tree(root, files: dict):
+    for relative_path, content in files.items():
+        path = root / relative_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+    return root
+
+
+def test_publish_adopts_then_swaps_versions(tmp_path):
+    repo = make_tree(tmp_path / "repository_folder" / "repo", {"kept.py": "kept\n", "old.py": "old\n"})
+    new_tree = make_tree(tmp_path / "clone", {"kept.py": "kept\n", "src/new.py": "new\n"})
+
+    version = publish_version(repo, new_tree, unchanged_files=["kept.py"])
+
+    assert repo.is_symlink()
+    assert current_version(repo) == version.resolve()
+    assert sorted(p.relative_to(repo).as_posix() for p in repo.rglob("*") if p.is_file()) == ["kept.py", "src/new.py"]
+    assert versions_root(repo).is_dir()
+
+
+def test_unchanged_files_are_hardlinked_not_copied(tmp_path):
+    repo = make_tree(tmp_path / "repository_folder" / "repo", {"kept.py": "kept\n", "edited.py": "v1\n"})
+    first = publish_version(repo, make_tree(tmp_path / "v1", {"kept.py": "kept\n", "edited.py": "v1\n"}))
+
+    second = publish_version(repo, make_tree(tmp_path / "v2", {"kept.py": "kept\n", "edited.py": "v2\n"}), ["kept.py"])
+
+    assert os.path.samefile(first / "kept.py", second / "kept.py")
+    assert not os.path.samefile(first / "edited.py", second / "edited.py")
+    assert (repo / "edited.py").read_text() == "v2\n"
+
+
+def test_replaced_versions_are_collected_after_the_grace_period(tmp_path):
+    repo = make_tree(tmp_path / "repository_folder" / "repo", {"a.py": "a\n"})
+    first = publish_version(repo, make_tree(tmp_path / "v1", {"a.py": "1\n"}))
+    publish_version(repo, make_tree(tmp_path / "v2", {"a.py": "2\n"}))
+
+    assert collect_versions(repo, grace_seconds=3600) == 0
+    assert first.exists()
+    assert collect_versions(repo, grace_seconds=0) >= 1
+    assert not first.exists()
+    assert (repo / "a.py").read_text() == "2\n"
@@ -0,0 +1,85 @@
+from indexer.skeleton import extract_python_skeleton, fill_descriptions, missing_description_keys
+
+SOURCE = '''\
+"""Storage of the records.
+
+Longer explanation that stays out of the summary.
+"""
+
+
+def load(path):
+    """Load the records of a file.
+
+    Args:
+        path: File to read
+    """
+
+
+async def save(path):
+    pass
+
+
+class Store:
+    """Keeps the records in memory."""
+
+    limit = 10
+    name: str = "store"
+
+    def __init__(self):
+        self.records = []
+        self.count += 1
+
+    def add(self, record):
+        def inner():
+            pass
+        self.records.append(record)
+'''
+
+
+def skeleton(tmp_path) -> dict:
+    path = tmp_path / "store.py"
+    path.write_text(SOURCE)
+    return extract_python_skeleton(str(path))
+
+
+def test_skeleton_follows_the_code_structure(tmp_path):
+    result = skeleton(tmp_path)
+
+    assert result["global_code_description"] == "Storage of the records."
+    assert result["functions_out_class"] == [
+        {"function_name": "load", "function_description": "Load the records of a file."},
+        {"function_name": "save", "function_description": ""},
+    ]
+    [store] = result["classes"]
+    assert store["class_description"] == "Keeps the records in memory."
+    assert [a["attribute_name"] for a in store["attributes"]] == ["limit", "name", "records", "count"]
+    # Nested functions are not methods
+    assert [m["function_name"] for m in store["functions_in_class"]] == ["__init__", "add"]
+
+
+def test_missing_descriptions_are_asked_and_filled(tmp_path):
+    result = skeleton(tmp_path)
+    keys = missing_description_keys(result)
+
+    assert keys == [
+        "function save",
+        "attribute Store.limit",
+        "attribute Store.name",
+        "attribute Store.records",
+        "attribute Store.count",
+        "method Store.__init__",
+        "method Store.add",
+    ]
+
+    fill_descriptions(result, {key: f"Described {key}" for key in keys})
+
+    assert missing_description_keys(result) == []
+    assert result["functions_out_class"][0]["function_description"] == "Load the records of a file."
+    assert result["functions_out_class"][1]["function_description"] == "Described function save"
+
+
+def test_unparsable_file_has_no_skeleton(tmp_path):
+    path = tmp_path / "broken.py"
+    path.write_text("def broken(:\n")
+
+    assert extract_python_skeleton(str(path)) is None
@@ -0,0 +1,70 @@
+import base64
+import os
+
+import pytest
+
+from indexer.sniffer import placeholder_structure, sniff_file
+
+
+@pytest.fixture
+def write(tmp_path):
+    def make(name: str, content) -> str:
+        path = tmp_path / name
+        if isinstance(content, bytes):
+            path.write_bytes(content)
+        else:
+            path.write_text(content)
+        return str(path)
+
+    return make
+
+
+def test_hand_written_code_is_summarized(write):
+    assert sniff_file(write("app.py", "def main():\n    return 1\n" * 20)) is None
+
+
+def test_binary_file(write):
+    assert sniff_file(write("image.png", b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR")) == "binary"
+
+
+def test_generated_code(write):
+    path = write("api_pb2.py", "# Generated by the protocol buffer compiler.  DO NOT EDIT!\nx = 1\n")
+
+    assert sniff_file(path) == "generated"
+
+
+def test_generated_markers_do_not_apply_to_docs_and_configs(write):
+    changelog = write("CHANGELOG.md", "# Changelog\nThis file is generated by release tooling, do not edit.\n\n## 1.0\n")
+    config = write("values.yaml", "# Code generated by helm. DO NOT EDIT.\nreplicas: 3\n")
+
+    assert sniff_file(changelog, is_code=False) is None
+    assert sniff_file(config, is_code=False) is None
+
+
+def test_minified_code(write):
+    assert sniff_file(write("bundle.min.js", "var a=1;function b(c){return c+a}" * 100 + "\n")) == "minified"
+
+
+def test_encoded_blob(write):
+    blob = base64.b64encode(os.urandom(3000)).decode()
+
+    assert sniff_file(write("data.js", f"const data = '{blob}';\n")) == "encoded"
+
+
+def test_oversized_file(write):
+    path = write("big.py", "value = compute(argument)\n" * 100)
+
+    assert sniff_file(path, max_file_bytes=1000) == "oversized"
+
+
+def test_empty_and_missing_files_are_not_judged(write, tmp_path):
+    assert sniff_file(write("empty.py", "")) is None
+    assert sniff_file(str(tmp_path / "missing.py")) is None
+
+
+def test_placeholder_structure():
+    assert placeholder_structure("minified") == {
+        "global_code_description": "Minified file, not summarized.",
+        "functions_out_class": [],
+        "classes": [],
+    }
@@ -0,0 +1,63 @@
+from indexer.summary_cache import SummaryCache, build_cache_namespace
+
+
+def test_key_depends_on_content_and_namespace():
+    namespace = build_cache_namespace("docstring", "system prompt", "user prompt", "{}", "model")
+    key = SummaryCache.make_key("def f(): pass", namespace)
+
+    assert key == SummaryCache.make_key("def f(): pass", namespace)
+    assert key != SummaryCache.make_key("def g(): pass", namespace)
+    assert key != SummaryCache.make_key("def f(): pass", build_cache_namespace("docstring", "other prompt", "user prompt", "{}", "model"))
+
+
+def test_namespace_parts_are_delimited():
+    assert build_cache_namespace("ab", "c") != build_cache_namespace("a", "bc")
+
+
+def test_round_trip_survives_a_new_instance(tmp_path):
+    cache = SummaryCache(cache_dir=str(tmp_path))
+    key = SummaryCache.make_key("content", "namespace")
+    summary = {"global_code_description": "Does things", "functions_out_class": [], "classes": []}
+
+    assert cache.get(key) is None
+    cache.put(key, summary, "model")
+    assert cache.get(key) == summary
+
+    reopened = SummaryCache(cache_dir=str(tmp_path))
+    assert reopened.get(key) == summary
+    assert reopened.stats()["entries"] == 1
+
+
+def test_unreadable_entry_is_a_miss(tmp_path):
+    cache = SummaryCache(cache_dir=str(tmp_path))
+    key = SummaryCache.make_key("content", "namespace")
+    cache.put(key, {"a": 1})
+    cache._entry_path(key).write_text("{not json")
+
+    assert cache.get(key) is None
+    assert not cache._entry_path(key).exists()
+
+
+def test_eviction_keeps_the_cache_under_its_limit(tmp_path):
+    cache = SummaryCache(cache_dir=str(tmp_path), max_bytes=1000)
+    for i in range(20):
+        cache.put(SummaryCache.make_key(str(i), "namespace"), {"text": "x" * 100})
+
+    stats = cache.stats()
+    assert stats["evictions"] > 0
+    assert stats["size_bytes"] <= 1000
+
+
+def test_stats_since_an_earlier_snapshot_count_only_the_later_lookups(tmp_path):
+    cache = SummaryCache(cache_dir=tmp_path)
+    key = cache.make_key("content", "namespace")
+    cache.get(key)
+    cache.put(key, {"summary": "s"})
+    start = cache.stats()
+
+    cache.get(key)
+    cache.get(cache.make_key("other", "namespace"))
+    stats = cache.stats(since=start)
+
+    assert (stats["hits"], stats["misses"], stats["writes"], stats["hit_rate"]) == (1, 1, 0, 0.5)
+    assert stats["entries"] == 1